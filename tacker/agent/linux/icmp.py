@@ -0,0 +1,222 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Batched ICMP echo prober.
+
+Echo requests for every target are multiplexed over a single ICMP socket
+per address family and the replies are matched back to their targets by
+sequence number, so checking a whole set of addresses costs one pass
+instead of one ``ping`` process per address.
+"""
+
+import random
+import select
+import socket
+import struct
+import time
+
+import netaddr
+from oslo_log import log as logging
+
+
+LOG = logging.getLogger(__name__)
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+ICMPV6_ECHO_REQUEST = 128
+ICMPV6_ECHO_REPLY = 129
+
+_ECHO_HEADER = struct.Struct('!BBHHH')
+_ECHO_PAYLOAD = b'tacker-monitor'
+_MAX_SEQUENCE = 0xffff
+_RECV_SIZE = 1024
+
+
+def _checksum(data):
+    if len(data) % 2:
+        data += b'\x00'
+    total = sum(struct.unpack('!%dH' % (len(data) // 2), data))
+    total = (total >> 16) + (total & 0xffff)
+    total += total >> 16
+    return ~total & 0xffff
+
+
+def _normalize(address):
+    try:
+        ip = netaddr.IPAddress(address)
+    except (netaddr.AddrFormatError, ValueError, TypeError):
+        return None, None
+    family = socket.AF_INET6 if ip.version == 6 else socket.AF_INET
+    return family, str(ip)
+
+
+class _EchoSocket(object):
+    """ICMP echo socket of one address family.
+
+    An unprivileged datagram socket is used when the kernel allows it
+    (see ``net.ipv4.ping_group_range``), otherwise a raw socket which
+    requires CAP_NET_RAW.
+    """
+
+    def __init__(self, family):
+        self.family = family
+        if family == socket.AF_INET6:
+            proto = socket.IPPROTO_ICMPV6
+            self.request_type = ICMPV6_ECHO_REQUEST
+            self.reply_type = ICMPV6_ECHO_REPLY
+        else:
+            proto = socket.IPPROTO_ICMP
+            self.request_type = ICMP_ECHO_REQUEST
+            self.reply_type = ICMP_ECHO_REPLY
+        try:
+            self.sock = socket.socket(family, socket.SOCK_DGRAM, proto)
+            self.raw = False
+        except socket.error:
+            self.sock = socket.socket(family, socket.SOCK_RAW, proto)
+            self.raw = True
+
+    def close(self):
+        self.sock.close()
+
+    def send(self, address, identifier, sequence):
+        checksum = 0
+        if self.family == socket.AF_INET:
+            # the kernel fills in the checksum of ICMPv6 messages
+            checksum = _checksum(_ECHO_HEADER.pack(
+                self.request_type, 0, 0, identifier, sequence) +
+                _ECHO_PAYLOAD)
+        packet = _ECHO_HEADER.pack(self.request_type, 0, checksum,
+                                   identifier, sequence) + _ECHO_PAYLOAD
+        self.sock.sendto(packet, (address, 0))
+
+    def recv(self):
+        """Read one message and return (address, id, sequence) of a reply.
+
+        :returns: None if the message is not an echo reply
+        """
+        data, addr = self.sock.recvfrom(_RECV_SIZE)
+        if self.raw and self.family == socket.AF_INET:
+            # raw IPv4 sockets hand over the IP header as well
+            data = data[(ord(data[0:1]) & 0x0f) * 4:]
+        if len(data) < _ECHO_HEADER.size:
+            return None
+        type_, code, checksum, identifier, sequence = _ECHO_HEADER.unpack(
+            data[:_ECHO_HEADER.size])
+        if type_ != self.reply_type:
+            return None
+        return _normalize(addr[0])[1], identifier, sequence
+
+
+class ICMPProber(object):
+    """Check reachability of many addresses over shared ICMP sockets."""
+
+    def probe(self, addresses, count=1, timeout=1, interval=1):
+        """Send echo requests to all addresses and wait for the replies.
+
+        Every address gets up to ``count`` echo requests ``interval``
+        seconds apart, an address which already answered is not probed
+        again. After the last round replies are awaited for ``timeout``
+        seconds.
+
+        :param addresses: iterable of IPv4 or IPv6 address strings
+        :param count: maximum number of echo requests per address
+        :param timeout: seconds to wait for replies after the last request
+        :param interval: seconds to wait between two rounds of requests
+        :returns: dict mapping each address to its best round trip time in
+                  seconds, or None when it did not answer
+        """
+        results = dict((address, None) for address in addresses)
+        targets = []
+        for address in results:
+            family, normalized = _normalize(address)
+            if family is None:
+                LOG.warning('Cannot ping %s: not an IP address', address)
+                continue
+            targets.append((address, family, normalized))
+
+        count = max(int(count), 1)
+        chunk_size = max(_MAX_SEQUENCE // count, 1)
+        for start in range(0, len(targets), chunk_size):
+            self._probe(targets[start:start + chunk_size], count,
+                        float(timeout), float(interval), results)
+        return results
+
+    def _probe(self, targets, count, timeout, interval, results):
+        identifier = random.randint(0, 0xffff)
+        sockets = {}
+        # (family, sequence) => (target, normalized address, sent at)
+        pending = {}
+        remaining = set(target[0] for target in targets)
+        try:
+            for address, family, normalized in targets:
+                if family not in sockets:
+                    sockets[family] = _EchoSocket(family)
+
+            for attempt in range(count):
+                for index, (address, family, normalized) in enumerate(
+                        targets):
+                    if address not in remaining:
+                        continue
+                    sequence = (attempt * len(targets) + index) & 0xffff
+                    try:
+                        sockets[family].send(normalized, identifier,
+                                             sequence)
+                    except socket.error as e:
+                        LOG.debug('Cannot send echo request to %(ip)s: '
+                                  '%(error)s', {'ip': address, 'error': e})
+                        continue
+                    pending[(family, sequence)] = (address, normalized,
+                                                   time.time())
+
+                wait = interval if attempt < count - 1 else timeout
+                self._collect(sockets, identifier, pending, remaining,
+                              results, time.time() + wait)
+                if not remaining:
+                    break
+        finally:
+            for echo_socket in sockets.values():
+                echo_socket.close()
+
+    @staticmethod
+    def _collect(sockets, identifier, pending, remaining, results,
+                 deadline):
+        by_sock = dict((echo_socket.sock, echo_socket)
+                       for echo_socket in sockets.values())
+        now = time.time()
+        while remaining and now < deadline:
+            readable, _w, _x = select.select(list(by_sock), [], [],
+                                             deadline - now)
+            for sock in readable:
+                echo_socket = by_sock[sock]
+                try:
+                    reply = echo_socket.recv()
+                except socket.error:
+                    continue
+                if reply is None:
+                    continue
+                source, reply_id, sequence = reply
+                # the kernel rewrites the identifier of datagram sockets
+                # and only delivers our own replies to them
+                if echo_socket.raw and reply_id != identifier:
+                    continue
+                key = (echo_socket.family, sequence)
+                sent = pending.get(key)
+                if sent is None or sent[1] != source:
+                    continue
+                del pending[key]
+                address, normalized, sent_at = sent
+                rtt = time.time() - sent_at
+                if results[address] is None or rtt < results[address]:
+                    results[address] = rtt
+                remaining.discard(address)
+            now = time.time()
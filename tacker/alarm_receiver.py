@@ -14,13 +14,24 @@
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
+import six
 from six.moves.urllib import parse as urlparse
-from tacker.vnfm.monitor_drivers.token import Token
+import webob
+import webob.dec
+import webob.exc
+
+from tacker.api.v1 import base
+from tacker.common import exceptions
+from tacker import manager
+from tacker.plugins.common import constants
+from tacker.vnfm.monitor_drivers.token import CachedToken
 from tacker import wsgi
 # check alarm url with db --> move to plugin
 
 LOG = logging.getLogger(__name__)
 
+API_VERSION = 'v1.0'
+
 OPTS = [
     cfg.StrOpt('username', default='tacker',
         help=_('User name for alarm monitoring')),
@@ -30,9 +41,14 @@ OPTS = [
         help=_('project name for alarm monitoring')),
     cfg.StrOpt('url', default='http://localhost:35357/v3',
         help=_('url for alarm monitoring')),
+    cfg.IntOpt('token_refresh_margin', default=300,
+        help=_('Seconds before its expiry at which the token used to '
+               'forward alarms stops being reused')),
 ]
 
 cfg.CONF.register_opts(OPTS, 'alarm_auth')
+cfg.CONF.import_opt('alarm_async_ingestion', 'tacker.vnfm.monitor',
+                    group='tacker')
 
 
 def config_opts():
@@ -40,42 +56,149 @@ def config_opts():
 
 
 class AlarmReceiver(wsgi.Middleware):
+    def __init__(self, application):
+        super(AlarmReceiver, self).__init__(application)
+        self.token = CachedToken(
+            username=cfg.CONF.alarm_auth.username,
+            password=cfg.CONF.alarm_auth.password,
+            project_name=cfg.CONF.alarm_auth.project_name,
+            auth_url=cfg.CONF.alarm_auth.url,
+            user_domain_name='default',
+            project_domain_name='default',
+            refresh_margin=cfg.CONF.alarm_auth.token_refresh_margin)
+
     def process_request(self, req):
         LOG.debug(_('Process request: %s'), req)
         if req.method != 'POST':
             return
         url = req.url
+        if self.handle_bulk_url(url):
+            return self._process_bulk(req)
         if not self.handle_url(url):
             return
         prefix, info, params = self.handle_url(req.url)
-        token = Token(username=cfg.CONF.alarm_auth.username,
-                      password=cfg.CONF.alarm_auth.password,
-                      project_name=cfg.CONF.alarm_auth.project_name,
-                      auth_url=cfg.CONF.alarm_auth.url,
-                      user_domain_name='default',
-                      project_domain_name='default')
-
-        token_identity = token.create_token()
+        if cfg.CONF.tacker.alarm_async_ingestion:
+            return self._enqueue(req, info)
+        token_identity = self.token.create_token()
         req.headers['X_AUTH_TOKEN'] = token_identity
+        req.environ['tacker.alarm_token'] = token_identity
         # Change the body request
-        if req.body:
-            body_dict = dict()
-            body_dict['trigger'] = {}
-            body_dict['trigger'].setdefault('params', {})
-            # Update params in the body request
-            body_info = jsonutils.loads(req.body)
-            body_dict['trigger']['params']['data'] = body_info
-            body_dict['trigger']['params']['credential'] = info[6]
-            # Update policy and action
-            body_dict['trigger']['policy_name'] = info[4]
-            body_dict['trigger']['action_name'] = info[5]
-            req.body = jsonutils.dumps(body_dict)
-            LOG.debug('Body alarm: %s', req.body)
+        body_dict = self._make_trigger(
+            info, jsonutils.loads(req.body) if req.body else {})
+        req.body = jsonutils.dump_as_bytes(body_dict)
+        LOG.debug('Body alarm: %s', req.body)
         # Need to change url because of mandatory
         req.environ['PATH_INFO'] = prefix + 'triggers'
         req.environ['QUERY_STRING'] = ''
         LOG.debug('alarm url in receiver: %s', req.url)
 
+    @webob.dec.wsgify
+    def __call__(self, req):
+        response = super(AlarmReceiver, self).__call__(req)
+        # the cached token was rejected, e.g. revoked, get a new one for
+        # the next alarm instead of failing until it expires
+        token_identity = req.environ.get('tacker.alarm_token')
+        if token_identity and response.status_int == 401:
+            LOG.warning(_('Token used to forward alarms was rejected'))
+            self.token.invalidate(token_identity)
+        return response
+
+    def _make_trigger(self, info, body_info):
+        body_dict = dict()
+        body_dict['trigger'] = {}
+        body_dict['trigger'].setdefault('params', {})
+        # Update params in the body request
+        body_dict['trigger']['params']['data'] = body_info
+        body_dict['trigger']['params']['credential'] = info[6]
+        # Update policy and action
+        body_dict['trigger']['policy_name'] = info[4]
+        body_dict['trigger']['action_name'] = info[5]
+        return body_dict
+
+    def _enqueue(self, req, info):
+        try:
+            body_info = jsonutils.loads(req.body) if req.body else {}
+        except ValueError:
+            body_info = None
+        if not isinstance(body_info, dict):
+            return webob.exc.HTTPBadRequest(
+                _('Alarm body must be a JSON object'))
+        body_dict = self._make_trigger(info, body_info)
+        plugin = manager.TackerManager.get_service_plugins()[constants.VNFM]
+        if not plugin.enqueue_vnf_trigger(info[3], body_dict):
+            return webob.exc.HTTPServiceUnavailable(_('Alarm queue full'))
+        LOG.debug('Alarm queued: %s', body_dict)
+        return webob.Response(
+            request=req, status=202, content_type='application/json',
+            body=wsgi.JSONDictSerializer().serialize(body_dict))
+
+    def _process_bulk(self, req):
+        try:
+            alarms = jsonutils.loads(req.body)['alarms']
+        except (ValueError, KeyError, TypeError):
+            alarms = None
+        if not isinstance(alarms, list):
+            return webob.exc.HTTPBadRequest(
+                _('Alarm batch body must be {"alarms": [...]}'))
+        if len(alarms) > cfg.CONF.tacker.alarm_batch_size:
+            return webob.exc.HTTPRequestEntityTooLarge(
+                _('More than %d alarms in the batch') %
+                cfg.CONF.tacker.alarm_batch_size)
+
+        # validate the whole batch before dispatching any alarm
+        results = []
+        triggers = []
+        for alarm in alarms:
+            handled = (isinstance(alarm, dict) and
+                       isinstance(alarm.get('data'), dict) and
+                       self.handle_url(alarm.get('alarm_url', '')))
+            if not handled:
+                results.append({'status': 400,
+                                'error': _('Alarm needs an alarm_url and a '
+                                           'data object')})
+                continue
+            prefix, info, params = handled
+            results.append(None)
+            triggers.append((len(results) - 1, info[3],
+                             self._make_trigger(info, alarm['data'])))
+
+        plugin = manager.TackerManager.get_service_plugins()[constants.VNFM]
+        if cfg.CONF.tacker.alarm_async_ingestion:
+            status = 202
+            for index, vnf_id, trigger in triggers:
+                if plugin.enqueue_vnf_trigger(vnf_id, trigger):
+                    results[index] = {'status': 202}
+                else:
+                    results[index] = {'status': 503,
+                                      'error': _('Alarm queue full')}
+        else:
+            status = 200
+            errors = plugin.create_vnf_triggers(
+                [(vnf_id, trigger) for index, vnf_id, trigger in triggers])
+            for (index, vnf_id, trigger), error in zip(triggers, errors):
+                results[index] = self._make_result(error)
+        LOG.debug('Alarm batch processed: %s', results)
+        return webob.Response(
+            request=req, status=status, content_type='application/json',
+            body=wsgi.JSONDictSerializer().serialize({'alarms': results}))
+
+    @staticmethod
+    def _make_result(error):
+        if error is None:
+            return {'status': 201}
+        if isinstance(error, exceptions.TackerException):
+            for fault, http_exc in base.FAULT_MAP.items():
+                if isinstance(error, fault):
+                    return {'status': http_exc.code,
+                            'error': six.text_type(error)}
+        return {'status': 500, 'error': _('internal server error')}
+
+    def handle_bulk_url(self, url):
+        # bulk_url = 'http://host:port/v1.0/alarms'
+        p = urlparse.urlparse(url).path.rstrip('/').split('/')
+        return (len(p) == 3 and p[0] == '' and p[1] == API_VERSION and
+                p[2] == 'alarms')
+
     def handle_url(self, url):
         # alarm_url = 'http://host:port/v1.0/vnfs/vnf-uuid/mon-policy-name/action-name/8ef785' # noqa
         parts = urlparse.urlparse(url)
@@ -83,7 +206,7 @@ class AlarmReceiver(wsgi.Middleware):
         if len(p) != 7:
             return None
 
-        if any((p[0] != '', p[2] != 'vnfs')):
+        if any((p[0] != '', p[1] != API_VERSION, p[2] != 'vnfs')):
             return None
         qs = urlparse.parse_qs(parts.query)
         params = dict((k, v[0]) for k, v in qs.items())
@@ -10,20 +10,74 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import hashlib
+
 from heatclient import client as heatclient
+from neutronclient.v2_0 import client as neutron_client
+from oslo_config import cfg
+
+from tacker.common import cache
 from tacker.vnfm import keystone
 
+CONF = cfg.CONF
+
+OPTS = [
+    cfg.IntOpt('client_pool_size',
+               default=64,
+               help=_("Number of authenticated OpenStack clients reused "
+                      "across VIM operations, 0 authenticates every time")),
+]
+CONF.register_opts(OPTS, group='openstack_vim')
+
+
+def config_opts():
+    return [('openstack_vim', OPTS)]
+
 
 class OpenstackClients(object):
+    # (vim, credentials digest, region_name, service) => client, sharing
+    # the keystone session of the credentials, which authenticates again
+    # before its token expires
+    _pool = None
 
-    def __init__(self, auth_attr, region_name=None):
+    def __init__(self, auth_attr, region_name=None, vim_id=None):
         super(OpenstackClients, self).__init__()
         self.keystone_plugin = keystone.Keystone()
         self.heat_client = None
         self.mistral_client = None
         self.keystone_client = None
+        self.neutron_client = None
         self.region_name = region_name
         self.auth_attr = auth_attr
+        self.vim_id = vim_id
+
+    @classmethod
+    def _get_pool(cls):
+        if cls._pool is None:
+            cls._pool = cache.LRUCache(CONF.openstack_vim.client_pool_size)
+        return cls._pool
+
+    @classmethod
+    def invalidate(cls, vim_id):
+        """Forget the clients of a VIM."""
+        pool = cls._get_pool()
+        for key in pool.keys():
+            if key[0] == vim_id:
+                pool.pop(key)
+
+    def _pooled(self, service, region_name, factory):
+        # a token can not be renewed, the clients using one are not shared
+        if 'token' in self.auth_attr:
+            return factory()
+        credentials = hashlib.sha256(repr(sorted(
+            self.auth_attr.items())).encode('utf-8')).hexdigest()
+        key = (self.vim_id, credentials, region_name, service)
+        pool = self._get_pool()
+        client = pool.get(key)
+        if client is None:
+            client = factory()
+            pool.put(key, client)
+        return client
 
     def _keystone_client(self):
         version = self.auth_attr['auth_url'].rpartition('/')[2]
@@ -36,6 +90,10 @@ class OpenstackClients(object):
         return heatclient.Client('1', endpoint=endpoint,
                                  session=self.keystone_session)
 
+    def _neutron_client(self):
+        return neutron_client.Client(session=self.keystone_session,
+                                     region_name=self.region_name)
+
     @property
     def keystone_session(self):
         return self.keystone.session
@@ -43,11 +101,20 @@ class OpenstackClients(object):
     @property
     def keystone(self):
         if not self.keystone_client:
-            self.keystone_client = self._keystone_client()
+            self.keystone_client = self._pooled(
+                'identity', None, self._keystone_client)
         return self.keystone_client
 
     @property
     def heat(self):
         if not self.heat_client:
-            self.heat_client = self._heat_client()
+            self.heat_client = self._pooled(
+                'orchestration', self.region_name, self._heat_client)
         return self.heat_client
+
+    @property
+    def neutron(self):
+        if not self.neutron_client:
+            self.neutron_client = self._pooled(
+                'network', self.region_name, self._neutron_client)
+        return self.neutron_client
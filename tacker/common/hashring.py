@@ -0,0 +1,46 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import bisect
+import hashlib
+
+import six
+
+
+class HashRing(object):
+    """Assign keys to members with consistent hashing.
+
+    Every member is placed on the ring at `replicas` points, so the keys are
+    spread evenly over the members and only the keys of a joining or
+    leaving member change their owner.
+    """
+
+    def __init__(self, members, replicas=64):
+        self.members = frozenset(members)
+        ring = sorted((self._hash('%s-%d' % (member, index)), member)
+                      for member in self.members
+                      for index in range(replicas))
+        self._points = [point for point, member in ring]
+        self._owners = [member for point, member in ring]
+
+    @staticmethod
+    def _hash(key):
+        digest = hashlib.md5(six.text_type(key).encode('utf-8')).hexdigest()
+        return int(digest[:8], 16)
+
+    def get_member(self, key):
+        """Return the member owning `key`, None if the ring is empty."""
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, self._hash(key))
+        return self._owners[index % len(self._owners)]
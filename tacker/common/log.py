@@ -15,22 +15,45 @@
 
 """Log helper functions."""
 
+import functools
+import time
+
 from oslo_log import log as logging
 from oslo_utils import strutils
 
+from tacker.common import tracing
+
 LOG = logging.getLogger(__name__)
 
 
 def log(method):
-    """Decorator helping to log method calls."""
+    """Decorator helping to log and trace method calls.
+
+    The arguments are only formatted when debug logging is enabled.
+    """
+    # spans are named after the function itself, module level functions
+    # have no instance to take a class name from
+    span_name = '%s.%s' % (method.__module__,
+                           getattr(method, '__qualname__', method.__name__))
+
+    @functools.wraps(method)
     def wrapper(*args, **kwargs):
-        instance = args[0]
-        data = {"class_name": (instance.__class__.__module__ + '.'
-                               + instance.__class__.__name__),
-                "method_name": method.__name__,
-                "args": strutils.mask_password(args[1:]),
-                "kwargs": strutils.mask_password(kwargs)}
-        LOG.debug(_('%(class_name)s method %(method_name)s'
-                    ' called with arguments %(args)s %(kwargs)s'), data)
-        return method(*args, **kwargs)
+        if LOG.isEnabledFor(logging.DEBUG):
+            instance = args[0]
+            data = {"class_name": (instance.__class__.__module__ + '.'
+                                   + instance.__class__.__name__),
+                    "method_name": method.__name__,
+                    "args": strutils.mask_password(args[1:]),
+                    "kwargs": strutils.mask_password(kwargs)}
+            LOG.debug(_('%(class_name)s method %(method_name)s'
+                        ' called with arguments %(args)s %(kwargs)s'), data)
+        rate = tracing.sample_rate()
+        if rate <= 0 or not tracing.TRACER.sampled(rate):
+            return method(*args, **kwargs)
+        started_at = time.time()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            tracing.TRACER.record(span_name, started_at,
+                                  time.time() - started_at)
     return wrapper
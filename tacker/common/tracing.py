@@ -0,0 +1,145 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Spans of the methods decorated by tacker.common.log.log.
+
+A span is the duration of one call, recorded with the id of the request
+it served. The calls of a sampled fraction of the requests are traced,
+and the slowest spans are kept to be queried with slowest(). Every
+[trace] report_interval seconds, the slowest spans are logged at INFO
+level by the process which traced them.
+"""
+
+import heapq
+import itertools
+import random
+import threading
+import time
+import zlib
+
+from oslo_config import cfg
+from oslo_context import context
+from oslo_log import log as logging
+
+LOG = logging.getLogger(__name__)
+CONF = cfg.CONF
+
+OPTS = [
+    cfg.FloatOpt('sample_rate',
+                 default=0.0,
+                 help=_("Fraction of the requests whose method calls are "
+                        "traced, 0 disables tracing")),
+    cfg.IntOpt('slowest_spans',
+               default=100,
+               help=_("Number of the slowest traced calls kept")),
+    cfg.IntOpt('report_interval',
+               default=300,
+               help=_("Seconds between the logs of the slowest traced "
+                      "calls, 0 disables them")),
+]
+CONF.register_opts(OPTS, 'trace')
+
+
+def config_opts():
+    return [('trace', OPTS)]
+
+
+_sample_rate = None
+
+
+def sample_rate():
+    """Return [trace] sample_rate, read from the configuration once."""
+    global _sample_rate
+    if _sample_rate is None:
+        _sample_rate = CONF.trace.sample_rate
+    return _sample_rate
+
+
+def _request_id():
+    ctx = context.get_current()
+    return ctx.request_id if ctx is not None else None
+
+
+class Tracer(object):
+    """Keep the slowest spans of the sampled calls."""
+
+    # number of spans in a report
+    REPORT_SPANS = 10
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # min heap of (duration, sequence, span)
+        self._slowest = []
+        self._sequence = itertools.count()
+        self._reported_at = time.time()
+
+    def sampled(self, rate):
+        """Whether the calls of the current request are traced."""
+        if rate >= 1:
+            return True
+        request_id = _request_id()
+        if request_id is None:
+            return random.random() < rate
+        # every call of a request gets the same answer
+        return (zlib.crc32(request_id.encode('utf-8')) & 0xffff) < (
+            rate * 0x10000)
+
+    def record(self, name, started_at, duration):
+        span = {'name': name,
+                'request_id': _request_id(),
+                'started_at': started_at,
+                'duration': duration}
+        if LOG.isEnabledFor(logging.DEBUG):
+            LOG.debug('%(name)s took %(duration).3f seconds for request '
+                      '%(request_id)s', span)
+        size = CONF.trace.slowest_spans
+        entry = (duration, next(self._sequence), span)
+        with self._lock:
+            if len(self._slowest) < size:
+                heapq.heappush(self._slowest, entry)
+            elif self._slowest and duration > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+            interval = CONF.trace.report_interval
+            report = (interval > 0 and
+                      time.time() - self._reported_at >= interval)
+            if report:
+                self._reported_at = time.time()
+        if report:
+            self.report()
+
+    def report(self):
+        """Log the slowest spans at INFO level."""
+        spans = self.slowest(self.REPORT_SPANS)
+        if not spans:
+            return
+        LOG.info(_('Slowest traced calls:\n%s'), '\n'.join(
+            '%(duration).3fs %(name)s request %(request_id)s' % span
+            for span in spans))
+
+    def slowest(self, limit=None):
+        """Return the slowest spans, the slowest first."""
+        with self._lock:
+            entries = heapq.nlargest(limit or len(self._slowest),
+                                     self._slowest)
+        return [dict(span) for duration, sequence, span in entries]
+
+    def clear(self):
+        with self._lock:
+            del self._slowest[:]
+
+
+TRACER = Tracer()
+
+
+def slowest(limit=None):
+    return TRACER.slowest(limit)
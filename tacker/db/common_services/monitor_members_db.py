@@ -0,0 +1,63 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+
+from oslo_utils import timeutils
+import sqlalchemy as sa
+
+from tacker.db import model_base
+
+
+class MonitorMember(model_base.BASE):
+    """A tacker-server process sharing the VNF and VIM monitoring."""
+
+    __tablename__ = 'monitor_members'
+    id = sa.Column(sa.String(255), primary_key=True, nullable=False)
+    host = sa.Column(sa.String(255), nullable=False)
+    heartbeat_at = sa.Column(sa.DateTime, nullable=False)
+
+
+class MonitorMembersDb(object):
+    """Heartbeat rows of the monitor members."""
+
+    def heartbeat(self, context, member_id, host):
+        with context.session.begin(subtransactions=True):
+            updated = (context.session.query(MonitorMember).
+                       filter(MonitorMember.id == member_id).
+                       update({'heartbeat_at': timeutils.utcnow()}))
+            if not updated:
+                context.session.add(MonitorMember(
+                    id=member_id, host=host,
+                    heartbeat_at=timeutils.utcnow()))
+
+    def get_live_members(self, context, timeout):
+        """Return the ids of the members seen within `timeout` seconds."""
+        since = timeutils.utcnow() - datetime.timedelta(seconds=timeout)
+        query = (context.session.query(MonitorMember.id).
+                 filter(MonitorMember.heartbeat_at >= since))
+        return sorted(member_id for member_id, in query)
+
+    def delete_member(self, context, member_id):
+        with context.session.begin(subtransactions=True):
+            (context.session.query(MonitorMember).
+             filter(MonitorMember.id == member_id).
+             delete())
+
+    def purge_members(self, context, older_than):
+        """Delete the rows of members gone for `older_than` seconds."""
+        before = timeutils.utcnow() - datetime.timedelta(seconds=older_than)
+        with context.session.begin(subtransactions=True):
+            (context.session.query(MonitorMember).
+             filter(MonitorMember.heartbeat_at < before).
+             delete(synchronize_session=False))
@@ -0,0 +1,38 @@
+# Copyright 2017 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""add vnfd compiled
+
+Revision ID: 68456180a077
+Revises: 8f7145914cb0
+Create Date: 2017-03-28 11:02:19.647213
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '68456180a077'
+down_revision = '8f7145914cb0'
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+def upgrade(active_plugins=None, options=None):
+    op.add_column('vnfd',
+                  sa.Column('compiled',
+                            sa.Text().with_variant(mysql.MEDIUMTEXT(),
+                                                   'mysql'),
+                            nullable=True))
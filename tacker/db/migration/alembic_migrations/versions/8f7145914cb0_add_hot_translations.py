@@ -0,0 +1,46 @@
+# Copyright 2017 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""add hot translations
+
+Revision ID: 8f7145914cb0
+Revises: 5d490546290c
+Create Date: 2017-03-24 15:40:27.218409
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '8f7145914cb0'
+down_revision = '5d490546290c'
+
+from alembic import op
+import sqlalchemy as sa
+
+from tacker.db import types
+
+
+def upgrade(active_plugins=None, options=None):
+    op.create_table('hot_translations',
+        sa.Column('id', sa.String(length=64), nullable=False),
+        sa.Column('vnfd_id', types.Uuid(length=36), nullable=True),
+        sa.Column('heat_template', sa.TEXT(length=65535), nullable=False),
+        sa.Column('monitoring_policy', sa.TEXT(length=65535), nullable=True),
+        sa.Column('vdu_metadata', sa.TEXT(length=65535), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        mysql_engine='InnoDB'
+    )
+    op.create_index('ix_hot_translations_vnfd_id', 'hot_translations',
+                    ['vnfd_id'])
@@ -21,10 +21,12 @@ Based on this comparison database can be healed with healing migration.
 
 """
 
+from tacker.db.common_services import monitor_members_db  # noqa
 from tacker.db import model_base
 from tacker.db.nfvo import nfvo_db  # noqa
 from tacker.db.nfvo import ns_db  # noqa
 from tacker.db.nfvo import vnffg_db  # noqa
+from tacker.db.vnfm import hot_translations_db  # noqa
 from tacker.db.vnfm import vnfm_db  # noqa
 
 
@@ -0,0 +1,84 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oslo_db import exception as db_exc
+from oslo_utils import timeutils
+import sqlalchemy as sa
+
+from tacker.db import model_base
+from tacker.db import types
+
+
+class HotTranslation(model_base.BASE):
+    """HOT template translated from a VNFD, shared by the tacker servers."""
+
+    __tablename__ = 'hot_translations'
+    # hash of the translation inputs
+    id = sa.Column(sa.String(64), primary_key=True, nullable=False)
+    # VNFD the template was first translated for
+    vnfd_id = sa.Column(types.Uuid, index=True)
+    heat_template = sa.Column(sa.TEXT(65535), nullable=False)
+    monitoring_policy = sa.Column(sa.TEXT(65535))
+    vdu_metadata = sa.Column(sa.TEXT(65535))
+    created_at = sa.Column(sa.DateTime, nullable=False)
+
+
+class HotTranslationsDb(object):
+    """Rows of the translated HOT templates."""
+
+    def get_translation(self, context, translation_id):
+        query = (context.session.query(HotTranslation).
+                 filter(HotTranslation.id == translation_id))
+        row = query.first()
+        if row is None:
+            return None
+        return row.heat_template, row.monitoring_policy, row.vdu_metadata
+
+    def add_translation(self, context, translation_id, heat_template,
+                        monitoring_policy, vdu_metadata, vnfd_id=None,
+                        max_rows=0):
+        """Store a translation and keep the `max_rows` newest ones.
+
+        `max_rows` 0 keeps every translation.
+        """
+        try:
+            with context.session.begin(subtransactions=True):
+                context.session.add(HotTranslation(
+                    id=translation_id, vnfd_id=vnfd_id,
+                    heat_template=heat_template,
+                    monitoring_policy=monitoring_policy,
+                    vdu_metadata=vdu_metadata,
+                    created_at=timeutils.utcnow()))
+        except db_exc.DBDuplicateEntry:
+            # another server stored the same translation meanwhile
+            return
+        if max_rows > 0:
+            self.purge_translations(context, max_rows)
+
+    def purge_translations(self, context, max_rows):
+        """Delete the oldest translations beyond the `max_rows` newest."""
+        with context.session.begin(subtransactions=True):
+            oldest_kept = (context.session.query(HotTranslation.created_at).
+                           order_by(HotTranslation.created_at.desc()).
+                           offset(max_rows - 1).first())
+            if oldest_kept is None:
+                return
+            (context.session.query(HotTranslation).
+             filter(HotTranslation.created_at < oldest_kept[0]).
+             delete(synchronize_session=False))
+
+    def delete_vnfd_translations(self, context, vnfd_id):
+        with context.session.begin(subtransactions=True):
+            (context.session.query(HotTranslation).
+             filter(HotTranslation.vnfd_id == vnfd_id).
+             delete(synchronize_session=False))
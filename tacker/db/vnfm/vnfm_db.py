@@ -22,6 +22,7 @@ from oslo_utils import timeutils
 from oslo_utils import uuidutils
 
 import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
 from sqlalchemy import orm
 from sqlalchemy.orm import exc as orm_exc
 from sqlalchemy import schema
@@ -34,6 +35,7 @@ from tacker.db import db_base
 from tacker.db import model_base
 from tacker.db import models_v1
 from tacker.db import types
+from tacker.db.vnfm import hot_translations_db
 from tacker.extensions import vnfm
 from tacker import manager
 from tacker.plugins.common import constants
@@ -73,6 +75,10 @@ class VNFD(model_base.BASE, models_v1.HasId, models_v1.HasTenant,
     # vnfd template source - inline or onboarded
     template_source = sa.Column(sa.String(255), server_default='onboarded')
 
+    # JSON of the vnfd compiled when it was onboarded
+    compiled = sa.Column(sa.Text().with_variant(mysql.MEDIUMTEXT(), 'mysql'),
+                         nullable=True)
+
     __table_args__ = (
         schema.UniqueConstraint(
             "tenant_id",
@@ -203,9 +209,11 @@ class VNFMPluginDb(vnfm.VNFMPluginBase, db_base.CommonDbMixin):
             'service_types': self._make_service_types_list(
                 vnfd.service_types)
         }
+        # compiled is not part of the API resource and is stripped from
+        # its views
         key_list = ('id', 'tenant_id', 'name', 'description',
                     'mgmt_driver', 'created_at', 'updated_at',
-                    'template_source')
+                    'template_source', 'compiled')
         res.update((key, vnfd[key]) for key in key_list)
         return self._fields(res, fields)
 
@@ -255,7 +263,8 @@ class VNFMPluginDb(vnfm.VNFMPluginBase, db_base.CommonDbMixin):
                     name=vnfd.get('name'),
                     description=vnfd.get('description'),
                     mgmt_driver=mgmt_driver,
-                    template_source=template_source)
+                    template_source=template_source,
+                    compiled=vnfd.get('compiled'))
                 context.session.add(vnfd_db)
                 for (key, value) in vnfd.get('attributes', {}).items():
                     attribute_db = VNFDAttribute(
@@ -318,6 +327,8 @@ class VNFMPluginDb(vnfm.VNFMPluginBase, db_base.CommonDbMixin):
                 raise vnfm.VNFDInUse(vnfd_id=vnfd_id)
             vnfd_db = self._get_resource(context, VNFD,
                                          vnfd_id)
+            hot_translations_db.HotTranslationsDb().delete_vnfd_translations(
+                context, vnfd_id)
             if soft_delete:
                 vnfd_db.update({'deleted_at': timeutils.utcnow()})
                 self._cos_db_plg.create_event(
@@ -632,6 +643,57 @@ class VNFMPluginDb(vnfm.VNFMPluginBase, db_base.CommonDbMixin):
         return self._get_collection(context, VNF, self._make_vnf_dict,
                                     filters=filters, fields=fields)
 
+    def _monitored_vnf_query(self, context):
+        return (self._model_query(context, VNF).
+                filter(VNF.mgmt_url.isnot(None)).
+                filter(VNF.attributes.any(
+                    VNFAttribute.key == 'monitoring_policy')))
+
+    def _get_monitored_vnf_ids(self, context, statuses):
+        """Return the ids of the monitored vnfs in one of `statuses`."""
+        query = (self._monitored_vnf_query(context).
+                 filter(VNF.status.in_(statuses)).
+                 with_entities(VNF.id))
+        return [vnf_id for vnf_id, in query]
+
+    def _get_monitored_vnfs(self, context, batch_size=1000, vnf_ids=None):
+        """Yield the ACTIVE vnfs which have a monitoring policy.
+
+        The vnfs are read in batches of `batch_size` ordered by id, and
+        their attributes, vnfd and vim are loaded with one query per
+        relation and batch instead of one query per vnf. If `vnf_ids` is
+        given only those vnfs are read.
+
+        :returns: generator of (vnf dict, vim type) tuples
+        """
+        query = self._monitored_vnf_query(context)
+        if vnf_ids is not None:
+            query = query.filter(VNF.id.in_(list(vnf_ids)))
+        query = (query.
+                 filter(VNF.status == constants.ACTIVE).
+                 options(orm.joinedload(VNF.vim),
+                         orm.subqueryload(VNF.attributes),
+                         orm.subqueryload(VNF.vnfd).
+                         subqueryload(VNFD.attributes),
+                         orm.subqueryload(VNF.vnfd).
+                         subqueryload(VNFD.service_types)).
+                 order_by(VNF.id))
+        last_id = None
+        while True:
+            batch_query = query
+            if last_id is not None:
+                batch_query = batch_query.filter(VNF.id > last_id)
+            vnf_dbs = batch_query.limit(batch_size).all()
+            vnfs = [(self._make_vnf_dict(vnf_db), vnf_db.vim.type)
+                    for vnf_db in vnf_dbs]
+            # keep the session from holding every vnf ever loaded
+            context.session.expunge_all()
+            for vnf in vnfs:
+                yield vnf
+            if len(vnf_dbs) < batch_size:
+                return
+            last_id = vnf_dbs[-1].id
+
     def set_vnf_error_status_reason(self, context, vnf_id, new_reason):
         with context.session.begin(subtransactions=True):
             (self._model_query(context, VNF).
@@ -16,10 +16,10 @@
 
 import os
 import six
+import socket
 import yaml
 
 from keystoneauth1 import exceptions
-from keystoneauth1 import identity
 from keystoneauth1.identity import v2
 from keystoneauth1.identity import v3
 from keystoneauth1 import session
@@ -30,7 +30,9 @@ from oslo_config import cfg
 from oslo_log import log as logging
 
 from tacker._i18n import _
+from tacker.agent.linux import icmp
 from tacker.agent.linux import utils as linux_utils
+from tacker.common import clients
 from tacker.common import log
 from tacker.extensions import nfvo
 from tacker.nfvo.drivers.vim import abstract_vim_driver
@@ -52,7 +54,12 @@ OPENSTACK_OPTS = [
     cfg.StrOpt('timeout', default='1',
                help=_('number of seconds to wait for a response')),
     cfg.StrOpt('interval', default='1',
-               help=_('number of seconds to wait between packets'))
+               help=_('number of seconds to wait between packets')),
+    cfg.StrOpt('probe_mode', default='subprocess',
+               choices=['subprocess', 'socket'],
+               help=_('"subprocess" runs a ping command to check the VIM, '
+                      '"socket" sends the echo requests over an ICMP '
+                      'socket'))
 ]
 cfg.CONF.register_opts(OPTS, 'vim_keys')
 cfg.CONF.register_opts(OPENSTACK_OPTS, 'vim_monitor')
@@ -244,6 +251,28 @@ class OpenStack_Driver(abstract_vim_driver.VimAbstractDriver,
     def vim_status(self, auth_url):
         """Checks the VIM health status"""
         vim_ip = auth_url.split("//")[-1].split(":")[0].split("/")[0]
+        if cfg.CONF.vim_monitor.probe_mode == 'socket':
+            try:
+                # the prober only takes ip addresses, auth_url mostly
+                # holds a host name
+                vim_addr = socket.getaddrinfo(vim_ip, None)[0][4][0]
+                rtt = icmp.ICMPProber().probe(
+                    [vim_addr], count=cfg.CONF.vim_monitor.count,
+                    timeout=cfg.CONF.vim_monitor.timeout,
+                    interval=cfg.CONF.vim_monitor.interval)[vim_addr]
+            except socket.gaierror as e:
+                LOG.warning("Cannot resolve %(host)s, falling back to ping "
+                            "subprocess: %(error)s",
+                            {'host': vim_ip, 'error': e})
+            except socket.error as e:
+                LOG.warning("Cannot open ICMP socket, falling back to ping "
+                            "subprocess: %s", e)
+            else:
+                if rtt is None:
+                    LOG.warning("Cannot ping ip address: %s", vim_ip)
+                    return False
+                return True
+
         ping_cmd = ['ping',
                     '-c', cfg.CONF.vim_monitor.count,
                     '-W', cfg.CONF.vim_monitor.timeout,
@@ -529,9 +558,7 @@ class NeutronClient(object):
     """Neutron Client class for networking-sfc driver"""
 
     def __init__(self, auth_attr):
-        auth = identity.Password(**auth_attr)
-        sess = session.Session(auth=auth)
-        self.client = neutron_client.Client(session=sess)
+        self.client = clients.OpenstackClients(auth_attr).neutron
 
     def flow_classifier_create(self, fc_dict):
         LOG.debug(_("fc_dict passed is {fc_dict}").format(fc_dict=fc_dict))
@@ -31,6 +31,7 @@ from tempfile import mkstemp
 from toscaparser.tosca_template import ToscaTemplate
 
 from tacker._i18n import _
+from tacker.common import clients
 from tacker.common import driver_manager
 from tacker.common import exceptions
 from tacker.common import log
@@ -43,6 +44,8 @@ from tacker.extensions import common_services as cs
 from tacker.extensions import nfvo
 from tacker import manager
 from tacker.plugins.common import constants
+from tacker.vnfm.infra_drivers.openstack import heat_client as hc
+from tacker.vnfm import monitor
 from tacker.vnfm import vim_client
 
 from tacker.tosca import utils as toscautils
@@ -93,14 +96,32 @@ class NfvoPlugin(nfvo_db.NfvoPluginDb, vnffg_db.VnffgPluginDbMixin,
         for vim in vims:
             self._created_vims[vim["id"]] = vim
         self._monitor_interval = cfg.CONF.nfvo_vim.monitor_interval
+        self._membership = None
+        if cfg.CONF.monitor.sharding:
+            self._membership = monitor.MonitorMembership.get_instance()
         threading.Thread(target=self.__run__).start()
 
     def __run__(self):
         while(1):
             time.sleep(self._monitor_interval)
-            for created_vim in self._created_vims.values():
+            if self._membership:
+                self._reload_created_vims()
+            for created_vim in list(self._created_vims.values()):
+                if (self._membership and
+                        not self._membership.owns(created_vim['id'])):
+                    continue
                 self.monitor_vim(created_vim)
 
+    def _reload_created_vims(self):
+        """Pick up the VIMs registered through other tacker servers."""
+        try:
+            vims = self.get_vims(t_context.get_admin_context())
+        except Exception:
+            LOG.exception(_('Failed to load the VIMs to monitor'))
+            return
+        with self._lock:
+            self._created_vims = dict((vim['id'], vim) for vim in vims)
+
     def get_auth_dict(self, context):
         auth = CONF.keystone_authtoken
         return {
@@ -145,6 +166,9 @@ class NfvoPlugin(nfvo_db.NfvoPluginDb, vnffg_db.VnffgPluginDbMixin,
         vim_type = vim_obj['type']
         try:
             self._vim_drivers.invoke(vim_type, 'register_vim', vim_obj=vim_obj)
+            # the VIM may now point to another or an upgraded Heat
+            hc.HeatClient.invalidate_resource_types(vim_id)
+            clients.OpenstackClients.invalidate(vim_id)
             return super(NfvoPlugin, self).update_vim(context, vim_id, vim_obj)
         except Exception:
             with excutils.save_and_reraise_exception():
@@ -158,6 +182,8 @@ class NfvoPlugin(nfvo_db.NfvoPluginDb, vnffg_db.VnffgPluginDbMixin,
                                  vim_id=vim_id)
         with self._lock:
             self._created_vims.pop(vim_id, None)
+        hc.HeatClient.invalidate_resource_types(vim_id)
+        clients.OpenstackClients.invalidate(vim_id)
         super(NfvoPlugin, self).delete_vim(context, vim_id)
 
     @log.log
@@ -195,8 +221,9 @@ class NfvoPlugin(nfvo_db.NfvoPluginDb, vnffg_db.VnffgPluginDbMixin,
         toscautils.updateimports(template)
 
         try:
-            tosca_template.ToscaTemplate(
-                a_file=False, yaml_dict_tpl=template)
+            with toscautils.type_definitions():
+                tosca_template.ToscaTemplate(
+                    a_file=False, yaml_dict_tpl=template)
         except Exception as e:
             LOG.exception(_("tosca-parser error: %s"), str(e))
             raise nfvo.ToscaParserFailed(error_msg_details=str(e))
@@ -461,9 +488,8 @@ class NfvoPlugin(nfvo_db.NfvoPluginDb, vnffg_db.VnffgPluginDbMixin,
         for vnfd_name in vnfd_imports:
             vnfd = vnfm_plugin.get_vnfd(context, vnfd_name)
             # Copy VNF types and VNF names
-            sm_dict = yaml.safe_load(vnfd['attributes']['vnfd'])[
-                'topology_template'][
-                'substitution_mappings']
+            sm_dict = toscautils.load_compiled_vnfd(
+                vnfd)['substitution_mappings']
             nsd['vnfds'][sm_dict['node_type']] = vnfd['name']
             # Ugly Hack to validate the child templates
             # TODO(tbh): add support in tosca-parser to pass child
@@ -479,8 +505,9 @@ class NfvoPlugin(nfvo_db.NfvoPluginDb, vnffg_db.VnffgPluginDbMixin,
         toscautils.updateimports(inner_nsd_dict)
 
         try:
-            ToscaTemplate(a_file=False,
-                    yaml_dict_tpl=inner_nsd_dict)
+            with toscautils.type_definitions():
+                ToscaTemplate(a_file=False,
+                        yaml_dict_tpl=inner_nsd_dict)
         except Exception as e:
             LOG.exception(_("tosca-parser error: %s"), str(e))
             raise nfvo.ToscaParserFailed(error_msg_details=str(e))
@@ -531,9 +558,10 @@ class NfvoPlugin(nfvo_db.NfvoPluginDb, vnffg_db.VnffgPluginDbMixin,
 
         # Step-1
         param_values = ns['ns']['attributes'].get('param_values', {})
-        if 'get_input' in str(nsd_dict):
+        inputs = toscautils.find_get_inputs(nsd_dict['topology_template'])
+        if inputs:
             self._process_parameterized_input(ns['ns']['attributes'],
-                    nsd_dict)
+                    inputs)
         # Step-2
         vnfds = nsd['vnfds']
         # vnfd_dict is used while generating workflow
@@ -637,28 +665,10 @@ class NfvoPlugin(nfvo_db.NfvoPluginDb, vnffg_db.VnffgPluginDbMixin,
         return ns_dict
 
     @log.log
-    def _update_params(self, original, paramvalues):
-        for key, value in iteritems(original):
-            if not isinstance(value, dict) or 'get_input' not in str(value):
-                pass
-            elif isinstance(value, dict):
-                if 'get_input' in value:
-                    if value['get_input'] in paramvalues:
-                        original[key] = paramvalues[value['get_input']]
-                    else:
-                        LOG.debug('Key missing Value: %s', key)
-                        raise cs.InputValuesMissing(key=key)
-                else:
-                    self._update_params(value, paramvalues)
-
-    @log.log
-    def _process_parameterized_input(self, attrs, nsd_dict):
+    def _process_parameterized_input(self, attrs, inputs):
         param_vattrs_dict = attrs.pop('param_values', None)
         if param_vattrs_dict:
-            for node in \
-                    nsd_dict['topology_template']['node_templates'].values():
-                if 'get_input' in str(node):
-                    self._update_params(node, param_vattrs_dict['nsd'])
+            toscautils.substitute_inputs(inputs, param_vattrs_dict['nsd'])
         else:
             raise cs.ParamYAMLInputMissing()
 
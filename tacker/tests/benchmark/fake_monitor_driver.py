@@ -0,0 +1,81 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Monitor driver answering with synthetic latencies and failures.
+
+The behaviour of a probe is driven by its monitoring_params:
+
+* latency: mean answer time in seconds, 0 by default
+* latency_distribution: constant, uniform or exponential
+* failure_rate: probability of a spurious 'failure'
+* batch: answer the probes of a sweep in a single monitor_call_batch
+
+Management IPs listed in DOWN always fail, which lets a benchmark inject
+outages and measure how long the monitor takes to detect them.
+"""
+
+import random
+
+import eventlet
+
+from tacker.vnfm.monitor_drivers import abstract_driver
+
+
+# mgmt_ip => time the outage was injected
+DOWN = {}
+
+
+def _latency(kwargs):
+    mean = float(kwargs.get('latency', 0))
+    distribution = kwargs.get('latency_distribution', 'constant')
+    if mean <= 0:
+        return 0
+    if distribution == 'exponential':
+        return random.expovariate(1.0 / mean)
+    if distribution == 'uniform':
+        return random.uniform(0, 2 * mean)
+    return mean
+
+
+def _result(kwargs):
+    if kwargs.get('mgmt_ip') in DOWN:
+        return 'failure'
+    if random.random() < float(kwargs.get('failure_rate', 0)):
+        return 'failure'
+    return True
+
+
+class VNFMonitorFake(abstract_driver.VNFMonitorAbstractDriver):
+    def get_type(self):
+        return 'fake'
+
+    def get_name(self):
+        return 'fake'
+
+    def get_description(self):
+        return 'Tacker VNFMonitor Fake Driver'
+
+    def monitor_url(self, plugin, context, vnf):
+        return vnf.get('monitor_url', '')
+
+    def monitor_call(self, vnf, kwargs):
+        eventlet.sleep(_latency(kwargs))
+        return _result(kwargs)
+
+    def monitor_call_batch(self, probes):
+        if not probes or not probes[0][1].get('batch'):
+            return None
+        latencies = [_latency(kwargs) for vnf, kwargs in probes]
+        eventlet.sleep(max(latencies))
+        return [(_result(kwargs), latency)
+                for (vnf, kwargs), latency in zip(probes, latencies)]
@@ -0,0 +1,229 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark of the VNF monitor with synthetic hosting VNFs.
+
+For every VNF count the monitor is loaded with that many hosting VNFs
+probed by the fake monitor driver, and the benchmark reports:
+
+* memory: memory allocated for the monitor records of the VNFs
+* sweep: mean time of a sweep probing every VNF once
+* throughput: probes per second of a sweep
+* detection: latency between injecting an outage and its action being
+  run, for a sample of VNFs, while the monitor scheduler is running
+
+The fake driver is looked up through the tacker.tacker.monitor.drivers
+entry point, so tacker must be installed, e.g. with ``pip install -e .``::
+
+    python -m tacker.tests.benchmark.monitor_benchmark \\
+        --counts 100,1000,10000,50000 --latency 0.005
+"""
+
+from __future__ import print_function
+
+import eventlet
+eventlet.monkey_patch()
+
+import argparse  # noqa
+import gc  # noqa
+import json  # noqa
+import logging  # noqa
+import random  # noqa
+import resource  # noqa
+import sys  # noqa
+import time  # noqa
+
+from oslo_config import cfg  # noqa
+
+from tacker.tests.benchmark import fake_monitor_driver  # noqa
+from tacker.vnfm import monitor  # noqa
+
+try:
+    import tracemalloc
+except ImportError:
+    # python 2 only offers the peak resident set size
+    tracemalloc = None
+
+
+class MonitorBenchmark(object):
+
+    def __init__(self, args):
+        self.args = args
+        self.detected = {}
+        self.vnf_monitor = monitor.VNFMonitor(boot_wait=0,
+                                              check_intvl=args.interval)
+
+    def _action_cb(self, hosting_vnf, action):
+        self.detected.setdefault(hosting_vnf.id, time.time())
+
+    def _make_vnf_dict(self, index, interval):
+        params = {
+            'monitoring_delay': 0,
+            'monitoring_interval': interval,
+            'latency': self.args.latency,
+            'latency_distribution': self.args.latency_distribution,
+            'failure_rate': self.args.failure_rate,
+        }
+        if self.args.batch:
+            params['batch'] = True
+        policy = {'vdus': {'VDU1': {'fake': {
+            'monitoring_params': params,
+            'actions': {'failure': 'log'}}}}}
+        return {
+            'id': 'bench-%08d' % index,
+            'tenant_id': 'bench',
+            'name': 'bench-%d' % index,
+            'mgmt_url': json.dumps(
+                {'VDU1': '10.%d.%d.%d' % (index >> 16 & 0xff,
+                                          index >> 8 & 0xff,
+                                          index & 0xff)}),
+            'attributes': {'monitoring_policy': json.dumps(policy)},
+            'status': 'ACTIVE',
+        }
+
+    def _load(self, count, interval):
+        hosting_vnfs = [
+            self.vnf_monitor.to_hosting_vnf(
+                self._make_vnf_dict(index, interval), self._action_cb,
+                'fake')
+            for index in range(count)]
+        self.vnf_monitor.restore_hosting_vnfs(hosting_vnfs, spread=interval)
+        return hosting_vnfs
+
+    def _unload(self, hosting_vnfs):
+        for hosting_vnf in hosting_vnfs:
+            self.vnf_monitor.delete_hosting_vnf(hosting_vnf.id)
+        with self.vnf_monitor._lock:
+            del self.vnf_monitor._schedule[:]
+        self.vnf_monitor._executor.wait()
+        fake_monitor_driver.DOWN.clear()
+        self.detected.clear()
+        gc.collect()
+
+    def measure_memory_and_sweeps(self, count):
+        gc.collect()
+        if tracemalloc:
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+        else:
+            before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        # the scheduler is kept idle so that only the explicit sweeps run
+        hosting_vnfs = self._load(count, 24 * 3600)
+        if tracemalloc:
+            memory = tracemalloc.get_traced_memory()[0] - before
+            tracemalloc.stop()
+        else:
+            memory = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss *
+                      1024 - before)
+
+        durations = []
+        for sweep in range(self.args.sweeps):
+            self.vnf_monitor.run_sweep()
+            durations.append(self.vnf_monitor.last_sweep_duration)
+        self._unload(hosting_vnfs)
+        return memory, sum(durations) / len(durations)
+
+    def measure_detection(self, count):
+        interval = self.args.interval
+        hosting_vnfs = self._load(count, interval)
+        # let the first probes, spread over one interval, go out
+        eventlet.sleep(interval)
+
+        sample = random.sample(hosting_vnfs,
+                               max(1, int(count * self.args.down)))
+        self.detected.clear()
+        injected_at = time.time()
+        for hosting_vnf in sample:
+            for ip in hosting_vnf.management_ip_addresses.values():
+                fake_monitor_driver.DOWN[ip] = injected_at
+
+        deadline = injected_at + interval * 3 + self.args.latency * 10 + 5
+        while time.time() < deadline:
+            if all(hosting_vnf.id in self.detected
+                   for hosting_vnf in sample):
+                break
+            eventlet.sleep(0.05)
+        latencies = sorted(self.detected[hosting_vnf.id] - injected_at
+                           for hosting_vnf in sample
+                           if hosting_vnf.id in self.detected)
+        missed = len(sample) - len(latencies)
+        self._unload(hosting_vnfs)
+        return latencies, missed
+
+    def run(self):
+        print('%8s %12s %10s %14s %10s %10s %10s %7s' % (
+            'vnfs', 'memory(KiB)', 'sweep(s)', 'probes/s', 'det p50',
+            'det p95', 'det max', 'missed'))
+        for count in self.args.counts:
+            memory, sweep = self.measure_memory_and_sweeps(count)
+            latencies, missed = self.measure_detection(count)
+
+            def _percentile(percent):
+                if not latencies:
+                    return float('nan')
+                index = min(int(len(latencies) * percent / 100.0),
+                            len(latencies) - 1)
+                return latencies[index]
+
+            print('%8d %12d %10.3f %14.1f %10.3f %10.3f %10.3f %7d' % (
+                count, memory // 1024, sweep, count / sweep if sweep else 0,
+                _percentile(50), _percentile(95), _percentile(100),
+                missed))
+            sys.stdout.flush()
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description='Benchmark the VNF monitor with synthetic VNFs.')
+    parser.add_argument(
+        '--counts', default='100,1000,10000,50000',
+        type=lambda value: [int(count) for count in value.split(',')],
+        help='comma separated numbers of VNFs to monitor')
+    parser.add_argument('--latency', type=float, default=0.005,
+                        help='mean probe latency in seconds')
+    parser.add_argument('--latency-distribution', default='exponential',
+                        choices=['constant', 'uniform', 'exponential'])
+    parser.add_argument('--failure-rate', type=float, default=0,
+                        help='probability of a spurious probe failure')
+    parser.add_argument('--batch', action='store_true',
+                        help='answer the probes through monitor_call_batch')
+    parser.add_argument('--interval', type=int, default=2,
+                        help='monitoring interval in seconds')
+    parser.add_argument('--down', type=float, default=0.01,
+                        help='fraction of the VNFs to take down when '
+                             'measuring the detection latency')
+    parser.add_argument('--sweeps', type=int, default=3,
+                        help='number of sweeps to average')
+    parser.add_argument('--concurrency', type=int,
+                        help='[monitor] max_concurrency to use')
+    parser.add_argument('--verbose', action='store_true',
+                        help='show the warnings logged by the monitor')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    if not args.verbose:
+        # overrunning sweeps are expected when sizing the monitor
+        logging.getLogger('tacker').setLevel(logging.ERROR)
+    cfg.CONF([], project='tacker', default_config_files=[])
+    cfg.CONF.set_override('monitor_driver', ['fake'], 'tacker')
+    cfg.CONF.set_override('rehydrate_on_start', False, 'monitor')
+    if args.concurrency:
+        cfg.CONF.set_override('max_concurrency', args.concurrency,
+                              'monitor')
+    MonitorBenchmark(args).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import socket
+
 from keystoneauth1 import exceptions
 import mock
 from oslo_config import cfg
@@ -187,3 +189,31 @@ class TestOpenstack_Driver(base.TestCase):
         self.assertRaises(nfvo.VimGetResourceNotFoundException,
                           self.openstack_driver.get_vim_resource_id,
                           self.vim_obj, resource_type, resource_name)
+
+    @mock.patch('socket.getaddrinfo')
+    @mock.patch('tacker.agent.linux.icmp.ICMPProber')
+    def test_vim_status_resolves_host_name(self, mock_prober,
+                                           mock_getaddrinfo):
+        self.config_fixture.config(group='vim_monitor', probe_mode='socket')
+        mock_getaddrinfo.return_value = [
+            (2, 1, 6, '', ('192.168.120.10', 0))]
+        mock_prober.return_value.probe.return_value = {
+            '192.168.120.10': 0.001}
+        self.assertTrue(self.openstack_driver.vim_status(
+            'http://keystone.example.com:5000/v3'))
+        mock_getaddrinfo.assert_called_once_with('keystone.example.com',
+                                                 None)
+        mock_prober.return_value.probe.assert_called_once_with(
+            ['192.168.120.10'], count=mock.ANY, timeout=mock.ANY,
+            interval=mock.ANY)
+
+    @mock.patch('tacker.agent.linux.utils.execute')
+    @mock.patch('socket.getaddrinfo')
+    def test_vim_status_unresolved_host_name(self, mock_getaddrinfo,
+                                             mock_execute):
+        self.config_fixture.config(group='vim_monitor', probe_mode='socket')
+        mock_getaddrinfo.side_effect = socket.gaierror(-2, 'unknown')
+        self.assertTrue(self.openstack_driver.vim_status(
+            'http://keystone.example.com:5000/v3'))
+        ping_cmd = mock_execute.call_args[0][0]
+        self.assertEqual('keystone.example.com', ping_cmd[-1])
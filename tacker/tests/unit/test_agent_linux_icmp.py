@@ -0,0 +1,78 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import socket
+
+import mock
+import testtools
+
+from tacker.agent.linux import icmp
+
+
+class FakeEchoSocket(object):
+    """Echo socket answering for a fixed set of addresses."""
+
+    def __init__(self, family, reachable):
+        self.family = family
+        self.raw = False
+        self.sock = mock.sentinel.sock
+        self.reachable = reachable
+        self.replies = []
+        self.sent = []
+
+    def send(self, address, identifier, sequence):
+        self.sent.append(address)
+        if address in self.reachable:
+            self.replies.append((address, identifier, sequence))
+
+    def recv(self):
+        return self.replies.pop(0)
+
+    def close(self):
+        pass
+
+
+class TestICMPProber(testtools.TestCase):
+
+    def setUp(self):
+        super(TestICMPProber, self).setUp()
+        self.prober = icmp.ICMPProber()
+
+    def test_checksum(self):
+        packet = icmp._ECHO_HEADER.pack(icmp.ICMP_ECHO_REQUEST, 0, 0, 1, 1)
+        checksum = icmp._checksum(packet)
+        packet = icmp._ECHO_HEADER.pack(icmp.ICMP_ECHO_REQUEST, 0, checksum,
+                                        1, 1)
+        self.assertEqual(0, icmp._checksum(packet))
+
+    def test_probe_invalid_address(self):
+        self.assertEqual({'not-an-ip': None},
+                         self.prober.probe(['not-an-ip']))
+
+    @mock.patch('select.select')
+    @mock.patch('tacker.agent.linux.icmp._EchoSocket')
+    def test_probe_batch(self, mock_echo_socket, mock_select):
+        fake_socket = FakeEchoSocket(socket.AF_INET, ['10.0.0.1'])
+        mock_echo_socket.return_value = fake_socket
+        mock_select.side_effect = (
+            lambda rlist, wlist, xlist, timeout:
+            (rlist if fake_socket.replies else [], [], []))
+
+        results = self.prober.probe(['10.0.0.1', '10.0.0.2'], count=2,
+                                    timeout=0.01, interval=0.01)
+        self.assertIsNotNone(results['10.0.0.1'])
+        self.assertIsNone(results['10.0.0.2'])
+        mock_echo_socket.assert_called_once_with(socket.AF_INET)
+        # the reachable address is not probed a second time
+        self.assertEqual(['10.0.0.1', '10.0.0.2', '10.0.0.2'],
+                         fake_socket.sent)
@@ -14,9 +14,11 @@
 #    under the License.
 
 import mock
+from oslo_serialization import jsonutils
 from webob import Request
 
 from tacker.alarm_receiver import AlarmReceiver
+from tacker.common import exceptions
 from tacker.tests.unit import base
 
 
@@ -51,10 +53,153 @@ class TestAlarmReceiver(base.TestCase):
         self.assertEqual(self.alarm_url['03_monitoring_policy_name'], p[4])
         self.assertEqual(self.alarm_url['04_action_name'], p[5])
 
-    @mock.patch('tacker.vnfm.monitor_drivers.token.Token.create_token')
+    def test_handle_url_wrong_version(self):
+        self.assertIsNone(self.alarmrc.handle_url(
+            self.ordered_url.replace('/v1.0/', '/v2.0/')))
+
+    @mock.patch('tacker.vnfm.monitor_drivers.token.CachedToken.create_token')
     def test_process_request(self, mock_token):
         req = Request.blank(self.ordered_url)
         req.method = 'POST'
         self.alarmrc.process_request(req)
         self.assertIsNotNone(req.body)
         self.assertIn('triggers', req.environ['PATH_INFO'])
+        self.assertEqual({'trigger': {'policy_name': 'mon-policy-name',
+                                      'action_name': 'action-name',
+                                      'params': {'credential': '8ef785',
+                                                 'data': {}}}},
+                         jsonutils.loads(req.body))
+
+    @mock.patch('tacker.vnfm.monitor_drivers.token.CachedToken.invalidate')
+    @mock.patch('tacker.vnfm.monitor_drivers.token.CachedToken.create_token')
+    def test_rejected_token_invalidated(self, mock_token, mock_invalidate):
+        mock_token.return_value = 'token-id'
+        app = mock.Mock(return_value=[])
+        self.alarmrc.application = app
+
+        def _respond(status):
+            def _app(environ, start_response):
+                start_response(status, [])
+                return []
+            app.side_effect = _app
+            req = Request.blank(self.ordered_url)
+            req.method = 'POST'
+            return req.get_response(self.alarmrc)
+
+        self.assertEqual(201, _respond('201 Created').status_int)
+        self.assertFalse(mock_invalidate.called)
+        self.assertEqual(401, _respond('401 Unauthorized').status_int)
+        mock_invalidate.assert_called_once_with('token-id')
+
+    @mock.patch('tacker.manager.TackerManager.get_service_plugins')
+    def test_process_request_async(self, mock_get_plugins):
+        self.config_fixture.config(alarm_async_ingestion=True,
+                                   group='tacker')
+        plugin = mock_get_plugins.return_value['VNFM']
+        plugin.enqueue_vnf_trigger.return_value = True
+        req = Request.blank(self.ordered_url)
+        req.method = 'POST'
+        req.body = b'{"alarm_id": "alarm-uuid", "current": "alarm"}'
+        res = self.alarmrc.process_request(req)
+        self.assertEqual(202, res.status_int)
+        plugin.enqueue_vnf_trigger.assert_called_once_with(
+            'vnf-uuid',
+            {'trigger': {'policy_name': 'mon-policy-name',
+                         'action_name': 'action-name',
+                         'params': {'credential': '8ef785',
+                                    'data': {'alarm_id': 'alarm-uuid',
+                                             'current': 'alarm'}}}})
+
+    @mock.patch('tacker.manager.TackerManager.get_service_plugins')
+    def test_process_request_async_queue_full(self, mock_get_plugins):
+        self.config_fixture.config(alarm_async_ingestion=True,
+                                   group='tacker')
+        plugin = mock_get_plugins.return_value['VNFM']
+        plugin.enqueue_vnf_trigger.return_value = False
+        req = Request.blank(self.ordered_url)
+        req.method = 'POST'
+        req.body = b'{"alarm_id": "alarm-uuid", "current": "alarm"}'
+        res = self.alarmrc.process_request(req)
+        self.assertEqual(503, res.status_int)
+
+    @mock.patch('tacker.manager.TackerManager.get_service_plugins')
+    def test_process_request_async_empty_body(self, mock_get_plugins):
+        self.config_fixture.config(alarm_async_ingestion=True,
+                                   group='tacker')
+        plugin = mock_get_plugins.return_value['VNFM']
+        plugin.enqueue_vnf_trigger.return_value = True
+        req = Request.blank(self.ordered_url)
+        req.method = 'POST'
+        res = self.alarmrc.process_request(req)
+        self.assertEqual(202, res.status_int)
+        plugin.enqueue_vnf_trigger.assert_called_once_with(
+            'vnf-uuid',
+            {'trigger': {'policy_name': 'mon-policy-name',
+                         'action_name': 'action-name',
+                         'params': {'credential': '8ef785', 'data': {}}}})
+
+    def test_process_request_async_bad_body(self):
+        self.config_fixture.config(alarm_async_ingestion=True,
+                                   group='tacker')
+        req = Request.blank(self.ordered_url)
+        req.method = 'POST'
+        req.body = b'not json'
+        res = self.alarmrc.process_request(req)
+        self.assertEqual(400, res.status_int)
+
+    def test_handle_bulk_url(self):
+        self.assertTrue(self.alarmrc.handle_bulk_url(
+            'http://tacker:9890/v1.0/alarms'))
+        self.assertFalse(self.alarmrc.handle_bulk_url(self.ordered_url))
+        self.assertFalse(self.alarmrc.handle_bulk_url(
+            'http://tacker:9890/v2.0/alarms'))
+
+    @mock.patch('tacker.manager.TackerManager.get_service_plugins')
+    def test_process_bulk_request(self, mock_get_plugins):
+        plugin = mock_get_plugins.return_value['VNFM']
+        plugin.create_vnf_triggers.return_value = [
+            None, exceptions.TriggerNotFound(trigger_name='mon-policy-name',
+                                             vnf_id='vnf-uuid')]
+        alarm = {'alarm_url': self.ordered_url,
+                 'data': {'alarm_id': 'alarm-uuid', 'current': 'alarm'}}
+        req = Request.blank('http://tacker:9890/v1.0/alarms')
+        req.method = 'POST'
+        req.body = jsonutils.dump_as_bytes(
+            {'alarms': [alarm, {'alarm_url': 'http://tacker:9890/v1.0'},
+                        alarm]})
+        res = self.alarmrc.process_request(req)
+        self.assertEqual(200, res.status_int)
+        self.assertEqual([201, 400, 404],
+                         [result['status'] for result in
+                          jsonutils.loads(res.body)['alarms']])
+        trigger = {'trigger': {'policy_name': 'mon-policy-name',
+                               'action_name': 'action-name',
+                               'params': {'credential': '8ef785',
+                                          'data': alarm['data']}}}
+        plugin.create_vnf_triggers.assert_called_once_with(
+            [('vnf-uuid', trigger), ('vnf-uuid', trigger)])
+
+    @mock.patch('tacker.manager.TackerManager.get_service_plugins')
+    def test_process_bulk_request_async(self, mock_get_plugins):
+        self.config_fixture.config(alarm_async_ingestion=True,
+                                   group='tacker')
+        plugin = mock_get_plugins.return_value['VNFM']
+        plugin.enqueue_vnf_trigger.side_effect = [True, False]
+        alarm = {'alarm_url': self.ordered_url,
+                 'data': {'alarm_id': 'alarm-uuid', 'current': 'alarm'}}
+        req = Request.blank('http://tacker:9890/v1.0/alarms')
+        req.method = 'POST'
+        req.body = jsonutils.dump_as_bytes({'alarms': [alarm, alarm]})
+        res = self.alarmrc.process_request(req)
+        self.assertEqual(202, res.status_int)
+        self.assertEqual([202, 503],
+                         [result['status'] for result in
+                          jsonutils.loads(res.body)['alarms']])
+
+    def test_process_bulk_request_too_large(self):
+        self.config_fixture.config(alarm_batch_size=1, group='tacker')
+        req = Request.blank('http://tacker:9890/v1.0/alarms')
+        req.method = 'POST'
+        req.body = jsonutils.dump_as_bytes({'alarms': [{}, {}]})
+        res = self.alarmrc.process_request(req)
+        self.assertEqual(413, res.status_int)
@@ -0,0 +1,52 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import testtools
+
+from tacker.common import cache
+
+
+class TestLRUCache(testtools.TestCase):
+
+    def test_get_put(self):
+        lru = cache.LRUCache(2)
+        self.assertIsNone(lru.get('a'))
+        lru.put('a', 1)
+        self.assertEqual(1, lru.get('a'))
+        self.assertEqual(1, lru.hits)
+        self.assertEqual(1, lru.misses)
+
+    def test_least_recently_used_evicted(self):
+        lru = cache.LRUCache(2)
+        lru.put('a', 1)
+        lru.put('b', 2)
+        lru.get('a')
+        lru.put('c', 3)
+        self.assertIn('a', lru)
+        self.assertNotIn('b', lru)
+        self.assertIn('c', lru)
+        self.assertEqual(2, len(lru))
+
+    def test_pop_and_clear(self):
+        lru = cache.LRUCache(2)
+        lru.put('a', 1)
+        lru.put('b', 2)
+        self.assertEqual(1, lru.pop('a'))
+        self.assertIsNone(lru.pop('a'))
+        lru.clear()
+        self.assertEqual(0, len(lru))
+
+    def test_disabled(self):
+        lru = cache.LRUCache(0)
+        lru.put('a', 1)
+        self.assertIsNone(lru.get('a'))
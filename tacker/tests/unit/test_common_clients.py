@@ -0,0 +1,80 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from tacker.common import clients
+from tacker.tests.unit import base
+
+
+class TestOpenstackClients(base.TestCase):
+
+    def setUp(self):
+        super(TestOpenstackClients, self).setUp()
+        self.addCleanup(setattr, clients.OpenstackClients, '_pool', None)
+        clients.OpenstackClients._pool = None
+        self.auth_attr = {'auth_url': 'http://keystone/v3',
+                          'username': 'admin', 'password': 'devstack',
+                          'project_name': 'admin'}
+        patcher = mock.patch('tacker.vnfm.keystone.Keystone.'
+                             'initialize_client')
+        self.mock_keystone = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mock_keystone.side_effect = lambda *args, **kwargs: mock.Mock()
+        patcher = mock.patch('heatclient.client.Client')
+        self.mock_heat = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mock_heat.side_effect = lambda *args, **kwargs: mock.Mock()
+
+    def _heat(self, auth_attr=None, region_name='RegionOne',
+              vim_id='vim-1'):
+        return clients.OpenstackClients(auth_attr or self.auth_attr,
+                                        region_name, vim_id=vim_id).heat
+
+    def test_clients_reused(self):
+        heat = self._heat()
+        self.assertIs(heat, self._heat())
+        self.assertEqual(1, self.mock_keystone.call_count)
+        self.assertEqual(1, self.mock_heat.call_count)
+
+    def test_session_shared_between_regions(self):
+        self.assertIsNot(self._heat(), self._heat(region_name='RegionTwo'))
+        self.assertEqual(1, self.mock_keystone.call_count)
+        self.assertEqual(2, self.mock_heat.call_count)
+
+    def test_credentials_changed(self):
+        self._heat()
+        auth_attr = dict(self.auth_attr, password='changed')
+        self._heat(auth_attr=auth_attr)
+        self.assertEqual(2, self.mock_keystone.call_count)
+
+    def test_token_not_pooled(self):
+        auth_attr = dict(self.auth_attr, token='token-id')
+        self._heat(auth_attr=auth_attr)
+        self._heat(auth_attr=auth_attr)
+        self.assertEqual(2, self.mock_keystone.call_count)
+
+    def test_invalidate(self):
+        self._heat()
+        self._heat(vim_id='vim-2')
+        clients.OpenstackClients.invalidate('vim-1')
+        self._heat()
+        self._heat(vim_id='vim-2')
+        self.assertEqual(3, self.mock_keystone.call_count)
+
+    def test_pool_disabled(self):
+        self.config_fixture.config(client_pool_size=0,
+                                   group='openstack_vim')
+        self._heat()
+        self._heat()
+        self.assertEqual(2, self.mock_keystone.call_count)
@@ -0,0 +1,49 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import testtools
+
+from tacker.common import hashring
+
+
+class TestHashRing(testtools.TestCase):
+
+    def setUp(self):
+        super(TestHashRing, self).setUp()
+        self.keys = ['key%d' % index for index in range(2000)]
+
+    def _assign(self, ring):
+        return dict((key, ring.get_member(key)) for key in self.keys)
+
+    def test_empty_ring(self):
+        self.assertIsNone(hashring.HashRing([]).get_member('key'))
+
+    def test_stable_assignment(self):
+        members = ['a', 'b', 'c']
+        self.assertEqual(self._assign(hashring.HashRing(members)),
+                         self._assign(hashring.HashRing(reversed(members))))
+
+    def test_balanced_assignment(self):
+        assignment = self._assign(hashring.HashRing(['a', 'b', 'c', 'd']))
+        for member in 'abcd':
+            count = list(assignment.values()).count(member)
+            self.assertTrue(250 < count < 750, count)
+
+    def test_member_leaving_moves_only_its_keys(self):
+        before = self._assign(hashring.HashRing(['a', 'b', 'c']))
+        after = self._assign(hashring.HashRing(['a', 'b']))
+        for key in self.keys:
+            if before[key] != 'c':
+                self.assertEqual(before[key], after[key])
+            else:
+                self.assertIn(after[key], ('a', 'b'))
@@ -0,0 +1,127 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+from oslo_config import cfg
+
+from tacker.common import log as call_log
+from tacker.common import tracing
+from tacker.tests.unit import base
+
+
+class TargetKlass(object):
+
+    @call_log.log
+    def test_method(self, arg1):
+        return arg1
+
+
+@call_log.log
+def target_function(template):
+    return template
+
+
+class TestTracer(base.TestCase):
+
+    def setUp(self):
+        super(TestTracer, self).setUp()
+        self.tracer = tracing.Tracer()
+
+    def test_slowest(self):
+        cfg.CONF.set_override('slowest_spans', 2, 'trace')
+        for duration in (0.3, 0.1, 0.5, 0.2):
+            self.tracer.record('op-%s' % duration, 0, duration)
+        self.assertEqual(['op-0.5', 'op-0.3'],
+                         [span['name'] for span in self.tracer.slowest()])
+        self.assertEqual(['op-0.5'],
+                         [span['name'] for span in self.tracer.slowest(1)])
+
+    @mock.patch.object(tracing, '_request_id', return_value='req-1')
+    def test_record_request_id(self, mock_request_id):
+        self.tracer.record('op', 10, 0.1)
+        self.assertEqual([{'name': 'op', 'request_id': 'req-1',
+                           'started_at': 10, 'duration': 0.1}],
+                         self.tracer.slowest())
+
+    @mock.patch.object(tracing, '_request_id')
+    def test_sampled_per_request(self, mock_request_id):
+        mock_request_id.return_value = 'req-1'
+        sampled = self.tracer.sampled(0.5)
+        self.assertEqual([sampled] * 10,
+                         [self.tracer.sampled(0.5) for i in range(10)])
+        self.assertTrue(self.tracer.sampled(1))
+        self.assertFalse(self.tracer.sampled(0))
+
+    @mock.patch.object(tracing.time, 'time')
+    @mock.patch.object(tracing.LOG, 'info')
+    def test_report(self, mock_info, mock_time):
+        self.config_fixture.config(report_interval=60, group='trace')
+        mock_time.return_value = 1000
+        self.tracer = tracing.Tracer()
+        self.tracer.record('op-1', 1000, 0.1)
+        self.assertFalse(mock_info.called)
+        mock_time.return_value = 1060
+        self.tracer.record('op-2', 1060, 0.2)
+        self.assertEqual(1, mock_info.call_count)
+        self.assertIn('0.200s op-2', mock_info.call_args[0][1])
+        self.tracer.record('op-3', 1060, 0.3)
+        self.assertEqual(1, mock_info.call_count)
+        self.config_fixture.config(report_interval=0, group='trace')
+        mock_time.return_value = 2000
+        self.tracer.record('op-4', 2000, 0.4)
+        self.assertEqual(1, mock_info.call_count)
+
+
+class TestTracedCall(base.TestCase):
+
+    def setUp(self):
+        super(TestTracedCall, self).setUp()
+        self.klass = TargetKlass()
+        patcher = mock.patch.object(tracing, 'TRACER')
+        self.mock_tracer = patcher.start()
+        self.addCleanup(patcher.stop)
+        # the sample rate is read again from the configuration
+        rate_patcher = mock.patch.object(tracing, '_sample_rate', None)
+        rate_patcher.start()
+        self.addCleanup(rate_patcher.stop)
+
+    @mock.patch.object(call_log.strutils, 'mask_password')
+    def test_arguments_not_formatted_without_debug(self, mock_mask):
+        with mock.patch.object(call_log.LOG, 'isEnabledFor',
+                               return_value=False):
+            self.assertEqual(10, self.klass.test_method(10))
+        self.assertFalse(mock_mask.called)
+
+    def test_not_traced_by_default(self):
+        self.klass.test_method(10)
+        self.assertFalse(self.mock_tracer.record.called)
+
+    def test_traced(self):
+        cfg.CONF.set_override('sample_rate', 1.0, 'trace')
+        self.mock_tracer.sampled.return_value = True
+        self.assertEqual(10, self.klass.test_method(10))
+        self.mock_tracer.record.assert_called_once_with(
+            __name__ + '.TargetKlass.test_method', mock.ANY, mock.ANY)
+
+    def test_traced_function(self):
+        cfg.CONF.set_override('sample_rate', 1.0, 'trace')
+        self.mock_tracer.sampled.return_value = True
+        self.assertEqual({}, target_function({}))
+        self.mock_tracer.record.assert_called_once_with(
+            __name__ + '.target_function', mock.ANY, mock.ANY)
+
+    def test_sample_rate_read_once(self):
+        cfg.CONF.set_override('sample_rate', 1.0, 'trace')
+        self.assertEqual(1.0, tracing.sample_rate())
+        cfg.CONF.set_override('sample_rate', 0.5, 'trace')
+        self.assertEqual(1.0, tracing.sample_rate())
@@ -0,0 +1,71 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+from oslo_config import cfg
+
+from tacker.tests.unit import base
+from tacker.vnfm.infra_drivers.openstack import heat_client as hc
+
+
+class TestResourceTypesCache(base.TestCase):
+
+    def setUp(self):
+        super(TestResourceTypesCache, self).setUp()
+        self.addCleanup(hc.HeatClient._resource_types.clear)
+        hc.HeatClient._resource_types.clear()
+        patcher = mock.patch('tacker.common.clients.OpenstackClients')
+        self.mock_clients = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.resource_types = (self.mock_clients.return_value.heat.
+                               resource_types)
+        self.resource_types.get.return_value = {
+            'attributes': {'networks': {}, 'show': {}}}
+
+    def _client(self, vim_id='vim-1', region_name='RegionOne'):
+        return hc.HeatClient({'auth_url': 'http://keystone/v3'},
+                             region_name, vim_id=vim_id)
+
+    def test_resource_attr_support_probed_once(self):
+        self.assertTrue(self._client().resource_attr_support(
+            'OS::Nova::Server', 'networks'))
+        self.assertFalse(self._client().resource_attr_support(
+            'OS::Nova::Server', 'console_urls'))
+        self.resource_types.get.assert_called_once_with('OS::Nova::Server')
+
+    def test_resource_attr_support_per_vim_and_region(self):
+        self._client().resource_attr_support('OS::Nova::Server', 'networks')
+        self._client(vim_id='vim-2').resource_attr_support(
+            'OS::Nova::Server', 'networks')
+        self._client(region_name='RegionTwo').resource_attr_support(
+            'OS::Nova::Server', 'networks')
+        self.assertEqual(3, self.resource_types.get.call_count)
+
+    def test_resource_attr_support_expired(self):
+        cfg.CONF.set_override('resource_types_cache_ttl', 0,
+                              group='openstack_vim')
+        self.addCleanup(cfg.CONF.clear_override, 'resource_types_cache_ttl',
+                        group='openstack_vim')
+        self._client().resource_attr_support('OS::Nova::Server', 'networks')
+        self._client().resource_attr_support('OS::Nova::Server', 'networks')
+        self.assertEqual(2, self.resource_types.get.call_count)
+
+    def test_invalidate_resource_types(self):
+        self._client().resource_attr_support('OS::Nova::Server', 'networks')
+        self._client(vim_id='vim-2').resource_attr_support(
+            'OS::Nova::Server', 'networks')
+        hc.HeatClient.invalidate_resource_types('vim-1')
+        self._client().resource_attr_support('OS::Nova::Server', 'networks')
+        self._client(vim_id='vim-2').resource_attr_support(
+            'OS::Nova::Server', 'networks')
+        self.assertEqual(3, self.resource_types.get.call_count)
@@ -31,6 +31,46 @@ class TestOpenStack(base.TestCase):
                           openstack_driver.create_wait,
                           None, None, {}, 'vnf_id', None)
 
+    def _create_wait_polled(self, polled_status, stacks):
+        heatclient = mock.Mock()
+        heatclient.get.side_effect = stacks
+        openstack_driver = openstack.OpenStack()
+        openstack_driver.STACK_RETRY_WAIT = 0
+        vnf_dict = {'attributes': {}}
+        with mock.patch("tacker.vnfm.infra_drivers.openstack.heat_client."
+                        "HeatClient", return_value=heatclient), \
+                mock.patch.object(openstack_driver, '_wait_stack',
+                                  return_value=polled_status):
+            openstack_driver.create_wait(None, None, vnf_dict, 'vnf_id',
+                                         None)
+        return vnf_dict, heatclient
+
+    def test_create_wait_retries_stack_details(self):
+        in_progress = mock.Mock(stack_status='CREATE_IN_PROGRESS')
+        complete = mock.Mock(stack_status='CREATE_COMPLETE', outputs=[
+            {'output_key': 'mgmt_ip-VDU1', 'output_value': '10.0.0.1'}])
+        vnf_dict, heatclient = self._create_wait_polled(
+            'CREATE_COMPLETE', [in_progress, Exception("any stuff"),
+                                complete])
+        self.assertEqual('{"VDU1": "10.0.0.1"}', vnf_dict['mgmt_url'])
+        self.assertEqual(3, heatclient.get.call_count)
+
+    def test_create_wait_stack_details_unavailable(self):
+        in_progress = mock.Mock(stack_status='CREATE_IN_PROGRESS')
+        e = self.assertRaises(vnfm.VNFCreateWaitFailed,
+                              self._create_wait_polled, 'CREATE_COMPLETE',
+                              [in_progress] + [Exception("any stuff")] *
+                              openstack.STACK_GET_RETRIES)
+        self.assertIn('Heat API request failed', str(e))
+
+    def test_create_wait_failed_uses_polled_status(self):
+        in_progress = mock.Mock(stack_status='CREATE_IN_PROGRESS')
+        e = self.assertRaises(vnfm.VNFCreateWaitFailed,
+                              self._create_wait_polled, 'CREATE_FAILED',
+                              [in_progress] + [Exception("any stuff")] *
+                              openstack.STACK_GET_RETRIES)
+        self.assertIn('CREATE_FAILED', str(e))
+
     @mock.patch("tacker.vnfm.infra_drivers.openstack.heat_client.HeatClient")
     def test_delete_wait_with_heat_connection_exception(self, mocked_hc):
         stack = {"stack_status", "DELETE_IN_PROGRESS"}
@@ -39,3 +79,93 @@ class TestOpenStack(base.TestCase):
         self.assertRaises(vnfm.VNFDeleteWaitFailed,
                           openstack_driver.delete_wait,
                           None, None, 'vnf_id', None, None)
+
+    @mock.patch("tacker.vnfm.infra_drivers.openstack.heat_client.HeatClient")
+    def test_stack_clients_keyed_by_vim(self, mocked_hc):
+        mocked_hc.return_value.get.return_value = mock.Mock(
+            stack_status='DELETE_COMPLETE')
+        openstack_driver = openstack.OpenStack()
+        openstack_driver.update_wait(None, None, 'vnf_id', 'auth',
+                                     'region', vim_id='vim_id')
+        openstack_driver.delete(None, None, 'vnf_id', 'auth', 'region',
+                                vim_id='vim_id')
+        openstack_driver.delete_wait(None, None, 'vnf_id', 'auth', 'region',
+                                     vim_id='vim_id')
+        self.assertEqual([mock.call('auth', 'region', vim_id='vim_id')] * 3,
+                         mocked_hc.call_args_list)
+
+
+class TestFindMgmtIpsFromGroups(base.TestCase):
+
+    def setUp(self):
+        super(TestFindMgmtIpsFromGroups, self).setUp()
+        self.addCleanup(setattr, openstack.OpenStack, '_scaling_groups', None)
+        openstack.OpenStack._scaling_groups = None
+        self.members = []
+        self.heat_client = mock.Mock()
+        self.heat_client.resource_get.side_effect = self._resource_get
+        self.heat_client.resource_get_list.side_effect = self._resource_list
+
+    def _add_member(self, ip):
+        name = 'member-%d' % len(self.members)
+        self.members.append((name, ip))
+
+    def _member(self, name, ip, with_detail):
+        rsc = mock.Mock(resource_name=name, physical_resource_id=name + '-id',
+                        resource_status='CREATE_COMPLETE')
+        rsc.attributes = {'mgmt_ip-VDU1': ip} if with_detail else None
+        return rsc
+
+    def _resource_get(self, stack_id, rsc_name):
+        if stack_id == 'instance-id':
+            return mock.Mock(physical_resource_id='group-id')
+        return self._member(rsc_name, dict(self.members)[rsc_name], True)
+
+    def _resource_list(self, stack_id, with_detail=False):
+        return [self._member(name, ip, with_detail)
+                for name, ip in self.members]
+
+    def _find_mgmt_ips(self):
+        return openstack.OpenStack._find_mgmt_ips_from_groups(
+            self.heat_client, 'instance-id', ['G1'])
+
+    def test_members_listed_with_attributes(self):
+        self._add_member('10.0.0.1')
+        self._add_member('10.0.0.2')
+        self.assertEqual({'VDU1': ['10.0.0.1', '10.0.0.2']},
+                         self._find_mgmt_ips())
+        self.heat_client.resource_get_list.assert_called_once_with(
+            'group-id', with_detail=True)
+        self.heat_client.resource_get.assert_called_once_with(
+            'instance-id', 'G1')
+
+    def test_scale_out_fetches_new_members(self):
+        self._add_member('10.0.0.1')
+        self._add_member('10.0.0.2')
+        self._find_mgmt_ips()
+        self.heat_client.reset_mock()
+        self._add_member('10.0.0.3')
+        self.assertEqual({'VDU1': ['10.0.0.1', '10.0.0.2', '10.0.0.3']},
+                         self._find_mgmt_ips())
+        self.heat_client.resource_get_list.assert_called_once_with(
+            'group-id', with_detail=False)
+        self.heat_client.resource_get.assert_has_calls(
+            [mock.call('instance-id', 'G1'),
+             mock.call('group-id', 'member-2')])
+        self.assertEqual(2, self.heat_client.resource_get.call_count)
+
+    def test_scale_in_drops_members(self):
+        self._add_member('10.0.0.1')
+        self._add_member('10.0.0.2')
+        self._find_mgmt_ips()
+        del self.members[0]
+        self.assertEqual({'VDU1': ['10.0.0.2']}, self._find_mgmt_ips())
+
+    def test_attributes_not_listed(self):
+        self._add_member('10.0.0.1')
+        self._add_member('10.0.0.2')
+        self.heat_client.resource_get_list.side_effect = (
+            lambda stack_id, with_detail: self._resource_list(stack_id))
+        self.assertEqual({'VDU1': ['10.0.0.1', '10.0.0.2']},
+                         self._find_mgmt_ips())
+        self.assertEqual(3, self.heat_client.resource_get.call_count)
@@ -0,0 +1,101 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import eventlet
+import mock
+
+from tacker.tests.unit import base
+from tacker.vnfm.infra_drivers.openstack import stack_poller
+
+
+class FakeStack(object):
+
+    def __init__(self, stack_id, stack_status):
+        self.id = stack_id
+        self.stack_status = stack_status
+
+
+class TestStackPoller(base.TestCase):
+
+    def setUp(self):
+        super(TestStackPoller, self).setUp()
+        self.addCleanup(stack_poller.StackPoller._pollers.clear)
+        self.statuses = {}
+        self.heatclient = mock.Mock(_cache_key=('vim-1', 'RegionOne'))
+        self.heatclient.stacks.list.side_effect = self._list
+        self.poller = stack_poller.StackPoller.get_poller(
+            self.heatclient, 0.01, 0.04)
+
+    def _list(self, filters, show_deleted):
+        return [FakeStack(stack_id, self.statuses[stack_id])
+                for stack_id in filters['id'] if stack_id in self.statuses]
+
+    def _set_status(self, stack_id, status, after):
+        def _set():
+            eventlet.sleep(after)
+            self.statuses[stack_id] = status
+        eventlet.spawn(_set)
+
+    def test_get_poller_per_vim_and_region(self):
+        self.assertIs(self.poller, stack_poller.StackPoller.get_poller(
+            mock.Mock(_cache_key=('vim-1', 'RegionOne')), 0.01, 0.04))
+        self.assertIsNot(self.poller, stack_poller.StackPoller.get_poller(
+            mock.Mock(_cache_key=('vim-1', 'RegionTwo')), 0.01, 0.04))
+
+    def test_wait_status_changed(self):
+        self.statuses['stack-1'] = 'CREATE_IN_PROGRESS'
+        self._set_status('stack-1', 'CREATE_COMPLETE', 0.05)
+        stack = self.poller.wait('stack-1', 'CREATE_IN_PROGRESS', 5)
+        self.assertEqual('CREATE_COMPLETE', stack.stack_status)
+
+    def test_wait_stack_gone(self):
+        self.assertIsNone(self.poller.wait('stack-1', 'DELETE_IN_PROGRESS',
+                                           5))
+
+    def test_wait_timeout(self):
+        self.statuses['stack-1'] = 'CREATE_IN_PROGRESS'
+        self.assertFalse(self.poller.wait('stack-1', 'CREATE_IN_PROGRESS',
+                                          0.05))
+        self.assertEqual({}, self.poller._waiters)
+
+    def test_wait_stacks_listed_together(self):
+        results = {}
+
+        def _wait(stack_id):
+            results[stack_id] = self.poller.wait(stack_id,
+                                                 'CREATE_IN_PROGRESS', 5)
+
+        for i in range(3):
+            self.statuses['stack-%d' % i] = 'CREATE_IN_PROGRESS'
+        threads = [eventlet.spawn(_wait, 'stack-%d' % i) for i in range(3)]
+        eventlet.sleep(0)
+        for i in range(3):
+            self.statuses['stack-%d' % i] = 'CREATE_COMPLETE'
+        for thread in threads:
+            thread.wait()
+        self.assertEqual(['CREATE_COMPLETE'] * 3,
+                         [results['stack-%d' % i].stack_status
+                          for i in range(3)])
+        self.heatclient.stacks.list.assert_called_once_with(
+            filters={'id': mock.ANY}, show_deleted=True)
+        self.assertEqual(
+            ['stack-0', 'stack-1', 'stack-2'],
+            sorted(self.heatclient.stacks.list.call_args[1]['filters']['id']))
+
+    def test_wait_heat_failure(self):
+        self.statuses['stack-1'] = 'CREATE_IN_PROGRESS'
+        self.heatclient.stacks.list.side_effect = iter(
+            [Exception('down'), [FakeStack('stack-1', 'CREATE_FAILED')]])
+        stack = self.poller.wait('stack-1', 'CREATE_IN_PROGRESS', 5)
+        self.assertEqual('CREATE_FAILED', stack.stack_status)
+        self.assertEqual(2, self.heatclient.stacks.list.call_count)
@@ -0,0 +1,91 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from tacker.tests.unit import base
+from tacker.vnfm.infra_drivers.openstack import translate_template
+
+
+class TestTranslationCache(base.TestCase):
+
+    def setUp(self):
+        super(TestTranslationCache, self).setUp()
+        self.addCleanup(setattr, translate_template.TOSCAToHOT,
+                        '_translations', None)
+        translate_template.TOSCAToHOT._translations = None
+        patcher = mock.patch.object(translate_template.TOSCAToHOT,
+                                    '_translate_tosca', autospec=True,
+                                    side_effect=self._translate)
+        self.mock_translate = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def _translate(tth, vnfd_dict, dev_attrs):
+        tth.heat_template_yaml = 'heat_template_version: 2013-05-23\n'
+        tth.monitoring_dict = {'vdus': {'VDU1': {}}}
+        tth.metadata = {'vdus': {}}
+
+    def _generate(self, vnfd_yaml='vnfd', param_values=''):
+        tth = translate_template.TOSCAToHOT({'vnfd_id': 'vnfd-id'},
+                                            mock.Mock())
+        tth.vnfd_yaml = vnfd_yaml
+        tth._generate_hot_from_tosca({}, {'param_values': param_values})
+        return tth
+
+    def test_identical_inputs_translated_once(self):
+        first = self._generate()
+        second = self._generate()
+        self.assertEqual(1, self.mock_translate.call_count)
+        self.assertEqual(first.heat_template_yaml, second.heat_template_yaml)
+        self.assertEqual(first.monitoring_dict, second.monitoring_dict)
+        self.assertEqual(first.metadata, second.metadata)
+        self.assertIsNot(first.monitoring_dict, second.monitoring_dict)
+
+    def test_memory_tier_disabled(self):
+        self.config_fixture.config(translation_cache_size=0,
+                                   group='openstack_vim')
+        self._generate()
+        self._generate()
+        self.assertEqual(2, self.mock_translate.call_count)
+
+    def test_different_inputs_translated(self):
+        self._generate()
+        self._generate(param_values='image: cirros')
+        self._generate(vnfd_yaml='other vnfd')
+        self.assertEqual(3, self.mock_translate.call_count)
+
+    @mock.patch('tacker.db.vnfm.hot_translations_db.HotTranslationsDb')
+    def test_database_tier(self, mock_db):
+        self.config_fixture.config(translation_cache_db=True,
+                                   group='openstack_vim')
+        mock_db.return_value.get_translation.return_value = (
+            'heat_template_version: 2013-05-23\n', 'null', '{}')
+        with mock.patch('tacker.context.get_admin_context'):
+            tth = self._generate()
+        self.assertEqual(0, self.mock_translate.call_count)
+        self.assertIsNone(tth.monitoring_dict)
+        self.assertEqual({}, tth.metadata)
+
+    @mock.patch('tacker.db.vnfm.hot_translations_db.HotTranslationsDb')
+    def test_database_tier_stored(self, mock_db):
+        self.config_fixture.config(translation_cache_db=True,
+                                   group='openstack_vim')
+        mock_db.return_value.get_translation.return_value = None
+        with mock.patch('tacker.context.get_admin_context'):
+            self._generate()
+        mock_db.return_value.add_translation.assert_called_once_with(
+            mock.ANY, mock.ANY, 'heat_template_version: 2013-05-23\n',
+            '{"vdus": {"VDU1": {}}}', '{"vdus": {}}', vnfd_id='vnfd-id',
+            max_rows=1000)
+
@@ -12,7 +12,11 @@
 #    under the License.
 #
 
+import socket
+
+from eventlet import event
 import mock
+from oslo_config import cfg
 import six.moves.urllib.error as urlerr
 import testtools
 
@@ -54,3 +58,98 @@ class TestVNFMonitorHTTPPing(testtools.TestCase):
                                                               mock.ANY,
                                                               test_device)
         self.assertEqual('a.b.c.d', test_monitor_url)
+
+
+class TestVNFMonitorHTTPPingKeepalive(testtools.TestCase):
+
+    def setUp(self):
+        super(TestVNFMonitorHTTPPingKeepalive, self).setUp()
+        cfg.CONF.set_override('probe_mode', 'keepalive', 'monitor_http_ping')
+        self.addCleanup(cfg.CONF.clear_override, 'probe_mode',
+                        'monitor_http_ping')
+        self.monitor_http_ping = http_ping.VNFMonitorHTTPPing()
+        p = mock.patch('tacker.vnfm.monitor_drivers.http_ping.http_ping.'
+                       'http_client.HTTPConnection')
+        self.mock_connection_cls = p.start()
+        self.addCleanup(p.stop)
+        self.mock_conn = self.mock_connection_cls.return_value
+        self.mock_response = self.mock_conn.getresponse.return_value
+        self.mock_response.status = 200
+        self.mock_response.will_close = False
+
+    def test_monitor_call_reuses_connection(self):
+        test_kwargs = {
+            'mgmt_ip': 'a.b.c.d',
+            'path': '/health',
+            'method': 'head'
+        }
+        self.assertTrue(self.monitor_http_ping.monitor_call({}, test_kwargs))
+        self.assertTrue(self.monitor_http_ping.monitor_call({}, test_kwargs))
+        self.mock_connection_cls.assert_called_once_with('a.b.c.d', 80,
+                                                         timeout=5.0)
+        self.mock_conn.request.assert_called_with('HEAD', '/health')
+        self.assertEqual(2, self.mock_conn.request.call_count)
+
+    def test_monitor_call_unexpected_status(self):
+        self.mock_response.status = 503
+        test_kwargs = {
+            'mgmt_ip': 'a.b.c.d',
+            'retry': 2
+        }
+        self.assertEqual('failure',
+                         self.monitor_http_ping.monitor_call({}, test_kwargs))
+        test_kwargs['expected_status'] = 503
+        self.assertTrue(self.monitor_http_ping.monitor_call({}, test_kwargs))
+
+    def test_monitor_call_reconnects_on_error(self):
+        self.mock_conn.request.side_effect = [socket.error(), None]
+        test_kwargs = {
+            'mgmt_ip': 'a.b.c.d'
+        }
+        self.assertTrue(self.monitor_http_ping.monitor_call({}, test_kwargs))
+        self.assertEqual(2, self.mock_connection_cls.call_count)
+        self.mock_conn.close.assert_called_once_with()
+
+    def test_monitor_call_batch(self):
+        self.mock_conn.request.side_effect = [None, socket.error()]
+        probes = [({}, {'mgmt_ip': 'a.b.c.d', 'retry': 1}),
+                  ({}, {'mgmt_ip': 'e.f.g.h', 'retry': 1}),
+                  ({}, {'mgmt_ip': ''})]
+        results = self.monitor_http_ping.monitor_call_batch(probes)
+        self.assertTrue(results[0][0])
+        self.assertIsNotNone(results[0][1])
+        self.assertEqual([('failure', None), (None, None)], results[1:])
+
+    def test_monitor_call_batch_deadline(self):
+        cfg.CONF.set_override('concurrency', 2, 'monitor_http_ping')
+        cfg.CONF.set_override('deadline', 1, 'monitor_http_ping')
+        self.addCleanup(cfg.CONF.clear_override, 'concurrency',
+                        'monitor_http_ping')
+        self.addCleanup(cfg.CONF.clear_override, 'deadline',
+                        'monitor_http_ping')
+        hung = event.Event()
+
+        def _connection(mgmt_ip, port, timeout):
+            conn = mock.Mock()
+            conn.getresponse.return_value = self.mock_response
+            if mgmt_ip == 'hung':
+                conn.request.side_effect = lambda *args: hung.wait()
+            return conn
+        self.mock_connection_cls.side_effect = _connection
+        probes = [({}, {'mgmt_ip': 'healthy', 'retry': 1}),
+                  ({}, {'mgmt_ip': 'hung', 'retry': 1}),
+                  ({}, {'mgmt_ip': 'healthy', 'retry': 1}),
+                  ({}, {'mgmt_ip': 'hung', 'retry': 1}),
+                  ({}, {'mgmt_ip': 'healthy', 'retry': 1})]
+        results = self.monitor_http_ping.monitor_call_batch(probes)
+        self.assertTrue(results[0][0])
+        self.assertTrue(results[2][0])
+        self.assertEqual([('failure', None), ('failure', None)],
+                         [results[1], results[3]])
+        # the hung probes held the pool, the last one never started
+        self.assertEqual((None, None), results[4])
+
+    def test_monitor_call_batch_urllib_mode(self):
+        cfg.CONF.set_override('probe_mode', 'urllib', 'monitor_http_ping')
+        self.assertIsNone(self.monitor_http_ping.monitor_call_batch(
+            [({}, {'mgmt_ip': 'a.b.c.d'})]))
@@ -13,6 +13,7 @@
 #
 
 import mock
+from oslo_config import cfg
 import testtools
 
 from tacker.vnfm.monitor_drivers.ping import ping
@@ -59,3 +60,24 @@ class TestVNFMonitorPing(testtools.TestCase):
                                                          mock.ANY,
                                                          test_device)
         self.assertEqual('a.b.c.d', test_monitor_url)
+
+    def test_monitor_call_batch_subprocess_mode(self):
+        self.assertIsNone(self.monitor_ping.monitor_call_batch(
+            [({}, {'mgmt_ip': 'a.b.c.d'})]))
+
+    def test_monitor_call_batch_socket_mode(self):
+        cfg.CONF.set_override('probe_mode', 'socket', 'monitor_ping')
+        self.addCleanup(cfg.CONF.clear_override, 'probe_mode',
+                        'monitor_ping')
+        probes = [({}, {'mgmt_ip': 'a.b.c.d'}),
+                  ({}, {'mgmt_ip': 'e.f.g.h'}),
+                  ({}, {'mgmt_ip': ''})]
+        with mock.patch.object(self.monitor_ping, '_ping_batch',
+                               return_value={'a.b.c.d': 0.001,
+                                             'e.f.g.h': None}
+                               ) as mock_ping_batch:
+            results = self.monitor_ping.monitor_call_batch(probes)
+        mock_ping_batch.assert_called_once_with(['a.b.c.d', 'e.f.g.h'],
+                                                5, 1, '0.2')
+        self.assertEqual([(True, 0.001), ('failure', None), (None, None)],
+                         results)
@@ -0,0 +1,119 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+import datetime
+
+import mock
+from oslo_utils import timeutils
+import testtools
+
+from tacker.vnfm.monitor_drivers import token
+
+
+def _access(token_id, lifetime):
+    return mock.Mock(auth_token=token_id,
+                     expires=timeutils.utcnow() +
+                     datetime.timedelta(seconds=lifetime))
+
+
+class TestCachedToken(testtools.TestCase):
+
+    def setUp(self):
+        super(TestCachedToken, self).setUp()
+        self.token = token.CachedToken(
+            username='tacker', password='secret', project_name='service',
+            auth_url='http://localhost:35357/v3', user_domain_name='default',
+            project_domain_name='default', refresh_margin=300)
+        session_patcher = mock.patch.object(token.CachedToken,
+                                            '_make_session')
+        self.mock_session = session_patcher.start().return_value
+        self.addCleanup(session_patcher.stop)
+        spawn_patcher = mock.patch('eventlet.spawn_after')
+        self.mock_spawn_after = spawn_patcher.start()
+        self.addCleanup(spawn_patcher.stop)
+
+    def test_token_is_reused(self):
+        self.mock_session.auth.get_access.return_value = _access('t1', 3600)
+        self.assertEqual('t1', self.token.create_token())
+        self.assertEqual('t1', self.token.create_token())
+        self.assertEqual(1, self.mock_session.auth.get_access.call_count)
+        self.assertEqual({'hits': 1, 'misses': 1, 'refreshes': 0,
+                          'failures': 0}, self.token.stats)
+        delay = self.mock_spawn_after.call_args[0][0]
+        self.assertTrue(1600 < delay <= 1650)
+
+    @mock.patch('time.time')
+    def test_token_close_to_expiry_is_not_reused(self, mock_time):
+        mock_time.return_value = 1000
+        self.mock_session.auth.get_access.side_effect = [
+            _access('t1', 3600), _access('t2', 3600)]
+        self.assertEqual('t1', self.token.create_token())
+        mock_time.return_value = 1000 + 3600 - 299
+        self.assertEqual('t2', self.token.create_token())
+        self.assertEqual(2, self.token.stats['misses'])
+
+    @mock.patch('time.time')
+    def test_short_lived_token(self, mock_time):
+        mock_time.return_value = 1000
+        self.mock_session.auth.get_access.side_effect = [
+            _access('t1', 200), _access('t2', 200)]
+        self.assertEqual('t1', self.token.create_token())
+        # the margin is clamped to half the lifetime
+        mock_time.return_value = 1099
+        self.assertEqual('t1', self.token.create_token())
+        delay = self.mock_spawn_after.call_args[0][0]
+        self.assertTrue(self.token.retry_interval <= delay <= 50)
+        mock_time.return_value = 1101
+        self.assertEqual('t2', self.token.create_token())
+
+    def test_refresh_delay_floor(self):
+        self.mock_session.auth.get_access.return_value = _access('t1', 10)
+        self.token.create_token()
+        self.mock_spawn_after.assert_called_with(
+            self.token.retry_interval, self.token._refresh)
+
+    def test_background_refresh(self):
+        self.mock_session.auth.get_access.side_effect = [
+            _access('t1', 3600), _access('t2', 3600)]
+        self.token.create_token()
+        self.token._refresh()
+        self.assertEqual('t2', self.token.create_token())
+        self.assertEqual(1, self.token.stats['refreshes'])
+        self.assertEqual(1, self.token.stats['hits'])
+
+    def test_background_refresh_failure_keeps_token(self):
+        self.mock_session.auth.get_access.side_effect = [
+            _access('t1', 3600), Exception('keystone down')]
+        self.token.create_token()
+        self.token._refresh()
+        self.assertEqual('t1', self.token.create_token())
+        self.assertEqual(1, self.token.stats['failures'])
+        self.mock_spawn_after.assert_called_with(
+            self.token.retry_interval, self.token._refresh)
+
+    def test_invalidate(self):
+        self.mock_session.auth.get_access.side_effect = [
+            _access('t1', 3600), _access('t2', 3600)]
+        self.token.create_token()
+        self.token.invalidate()
+        self.assertEqual('t2', self.token.create_token())
+
+    def test_invalidate_other_token(self):
+        self.mock_session.auth.get_access.side_effect = [
+            _access('t1', 3600), _access('t2', 3600)]
+        self.token.create_token()
+        self.token.invalidate('t0')
+        self.assertEqual('t1', self.token.create_token())
+        self.token.invalidate('t1')
+        self.assertEqual('t2', self.token.create_token())
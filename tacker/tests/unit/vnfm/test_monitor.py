@@ -12,8 +12,12 @@
 #    under the License.
 #
 
+import datetime
 import json
+import time
 
+import eventlet
+from eventlet import event
 import mock
 from oslo_utils import timeutils
 import testtools
@@ -50,6 +54,21 @@ MOCK_VNF_DEVICE = {
 }
 
 
+def _make_hosting_vnf(vnf_id=MOCK_DEVICE_ID, monitoring_policy=None,
+                      action_cb=None):
+    vnf_dict = {
+        'id': vnf_id,
+        'mgmt_url': '{"vdu1": "a.b.c.d"}',
+        'attributes': {
+            'monitoring_policy': json.dumps(
+                monitoring_policy or MOCK_VNF_DEVICE['monitoring_policy'])
+        },
+        'status': 'ACTIVE'
+    }
+    return monitor.VNFMonitor.to_hosting_vnf(
+        vnf_dict, action_cb or mock.MagicMock())
+
+
 class TestVNFMonitor(testtools.TestCase):
 
     def setUp(self):
@@ -68,41 +87,36 @@ class TestVNFMonitor(testtools.TestCase):
             'mgmt_url': '{"vdu1": "a.b.c.d"}',
             'attributes': {
                 'monitoring_policy': json.dumps(
-                        MOCK_VNF_DEVICE['monitoring_policy'])
-            }
-        }
-        action_cb = mock.MagicMock()
-        expected_output = {
-            'id': MOCK_DEVICE_ID,
-            'action_cb': action_cb,
-            'management_ip_addresses': {
-                'vdu1': 'a.b.c.d'
+                        MOCK_VNF_DEVICE['monitoring_policy']),
+                'heat_template': 'a large template'
             },
-            'vnf': test_device_dict,
-            'monitoring_policy': MOCK_VNF_DEVICE['monitoring_policy']
+            'vnfd': {'attributes': {'vnfd': 'a large vnfd'}}
         }
-        output_dict = monitor.VNFMonitor.to_hosting_vnf(test_device_dict,
-                                                action_cb)
-        self.assertEqual(expected_output, output_dict)
+        action_cb = mock.MagicMock()
+        hosting_vnf = monitor.VNFMonitor.to_hosting_vnf(test_device_dict,
+                                                        action_cb)
+        self.assertEqual(MOCK_DEVICE_ID, hosting_vnf.id)
+        self.assertEqual(action_cb, hosting_vnf.action_cb)
+        self.assertEqual({'vdu1': 'a.b.c.d'},
+                         hosting_vnf.management_ip_addresses)
+        self.assertEqual(MOCK_VNF_DEVICE['monitoring_policy'],
+                         hosting_vnf.monitoring_policy)
+        # only a summary of the vnf is kept
+        self.assertEqual(MOCK_DEVICE_ID, hosting_vnf.vnf['id'])
+        self.assertNotIn('vnfd', hosting_vnf.vnf)
+        self.assertNotIn('attributes', hosting_vnf.vnf)
+        self.assertFalse(hasattr(hosting_vnf, '__dict__'))
 
     @mock.patch('tacker.vnfm.monitor.VNFMonitor.__run__')
     def test_add_hosting_vnf(self, mock_monitor_run):
-        test_device_dict = {
-            'id': MOCK_DEVICE_ID,
-            'mgmt_url': '{"vdu1": "a.b.c.d"}',
-            'attributes': {
-                'monitoring_policy': json.dumps(
-                        MOCK_VNF_DEVICE['monitoring_policy'])
-            },
-            'status': 'ACTIVE'
-        }
-        action_cb = mock.MagicMock()
         test_boot_wait = 30
         test_vnfmonitor = monitor.VNFMonitor(test_boot_wait)
-        new_dict = test_vnfmonitor.to_hosting_vnf(test_device_dict, action_cb)
-        test_vnfmonitor.add_hosting_vnf(new_dict)
+        new_vnf = _make_hosting_vnf()
+        test_vnfmonitor.add_hosting_vnf(new_vnf)
         test_device_id = list(test_vnfmonitor._hosting_vnfs.keys())[0]
         self.assertEqual(MOCK_DEVICE_ID, test_device_id)
+        self.assertIsNone(new_vnf.monitoring_policy)
+        self.assertEqual(1, len(new_vnf.probes))
         self._cos_db_plugin.create_event.assert_called_with(
             mock.ANY, res_id=mock.ANY, res_type=constants.RES_TYPE_VNF,
             res_state=mock.ANY, evt_type=constants.RES_EVT_MONITOR,
@@ -110,8 +124,8 @@ class TestVNFMonitor(testtools.TestCase):
 
     @mock.patch('tacker.vnfm.monitor.VNFMonitor.__run__')
     def test_run_monitor(self, mock_monitor_run):
-        test_hosting_vnf = MOCK_VNF_DEVICE
-        test_hosting_vnf['vnf'] = {}
+        test_hosting_vnf = _make_hosting_vnf()
+        test_hosting_vnf.boot_at = timeutils.utcnow()
         test_boot_wait = 30
         mock_kwargs = {
             'count': 1,
@@ -125,5 +139,444 @@ class TestVNFMonitor(testtools.TestCase):
         test_vnfmonitor._monitor_manager = self.mock_monitor_manager
         test_vnfmonitor.run_monitor(test_hosting_vnf)
         self.mock_monitor_manager\
-            .invoke.assert_called_once_with('ping', 'monitor_call', vnf={},
+            .invoke.assert_called_once_with('ping', 'monitor_call',
+                                            vnf=test_hosting_vnf.vnf,
                                             kwargs=mock_kwargs)
+
+    @mock.patch('tacker.vnfm.monitor.VNFMonitor.__run__')
+    def test_run_sweep_skips_dead_vnf(self, mock_monitor_run):
+        test_boot_wait = 30
+        alive_vnf = _make_hosting_vnf('alive-vnf')
+        dead_vnf = _make_hosting_vnf('dead-vnf')
+        dead_vnf.dead = True
+        alive_probe = monitor.Probe(alive_vnf, 'vdu1', 'ping', {}, {}, 0,
+                                    10)
+        test_vnfmonitor = monitor.VNFMonitor(test_boot_wait)
+        hosting_vnfs = {'alive-vnf': alive_vnf, 'dead-vnf': dead_vnf}
+        self.mock_monitor_manager.invoke = mock.MagicMock(return_value=None)
+        test_vnfmonitor._monitor_manager = self.mock_monitor_manager
+        with mock.patch.object(test_vnfmonitor, '_hosting_vnfs',
+                               hosting_vnfs), \
+                mock.patch.object(test_vnfmonitor, '_get_probes',
+                                  return_value=[alive_probe]), \
+                mock.patch.object(test_vnfmonitor,
+                                  'run_probe') as mock_run_probe:
+            test_vnfmonitor.run_sweep()
+        mock_run_probe.assert_called_once_with(alive_probe)
+        self.assertGreaterEqual(test_vnfmonitor.last_sweep_duration, 0)
+
+    @mock.patch('tacker.vnfm.monitor.VNFMonitor.__run__')
+    def test_run_sweep_with_batch_driver(self, mock_monitor_run):
+        test_boot_wait = 30
+        action_cb = mock.MagicMock()
+        hosting_vnf = _make_hosting_vnf('vnf', action_cb=action_cb)
+        probes = [monitor.Probe(hosting_vnf, 'vdu1', 'ping',
+                                {'mgmt_ip': 'a.b.c.d'},
+                                {'failure': 'respawn'}, 0, 10)]
+        test_vnfmonitor = monitor.VNFMonitor(test_boot_wait)
+        self.mock_monitor_manager.invoke = mock.MagicMock(
+            return_value=[('failure', 0.5)])
+        test_vnfmonitor._monitor_manager = self.mock_monitor_manager
+        with mock.patch.object(test_vnfmonitor, '_hosting_vnfs',
+                               {'vnf': hosting_vnf}), \
+                mock.patch.object(test_vnfmonitor, '_get_probes',
+                                  return_value=probes):
+            test_vnfmonitor.run_sweep()
+        self.mock_monitor_manager.invoke.assert_called_once_with(
+            'ping', 'monitor_call_batch',
+            probes=[(hosting_vnf.vnf, {'mgmt_ip': 'a.b.c.d'})])
+        test_vnfmonitor._executor.wait()
+        action_cb.assert_called_once_with(hosting_vnf, 'respawn')
+        self.assertEqual(0.5, probes[0].rtt)
+
+    @mock.patch('tacker.vnfm.monitor.VNFMonitor.__run__')
+    def test_monitor_call_with_deadline(self, mock_monitor_run):
+        test_boot_wait = 30
+        test_vnfmonitor = monitor.VNFMonitor(test_boot_wait)
+        test_vnfmonitor._probe_timeout = 0.01
+
+        def _slow_monitor_call(*args, **kwargs):
+            eventlet.sleep(1)
+            return True
+
+        self.mock_monitor_manager.invoke = mock.MagicMock(
+            side_effect=_slow_monitor_call)
+        test_vnfmonitor._monitor_manager = self.mock_monitor_manager
+        driver_return = test_vnfmonitor._monitor_call_with_deadline(
+            'ping', {}, {'mgmt_ip': 'a.b.c.d'})
+        self.assertEqual('failure', driver_return)
+
+    @mock.patch('tacker.vnfm.monitor.VNFMonitor.__run__')
+    def test_make_probes(self, mock_monitor_run):
+        test_boot_wait = 30
+        test_vnfmonitor = monitor.VNFMonitor(test_boot_wait, check_intvl=10)
+        hosting_vnf = _make_hosting_vnf(monitoring_policy={
+            'vdus': {'vdu1': {'ping': {
+                'actions': {'failure': 'respawn'},
+                'monitoring_params': {'monitoring_interval': 2}}}}})
+        probes = test_vnfmonitor._make_probes(hosting_vnf)
+        self.assertEqual(1, len(probes))
+        self.assertEqual('ping', probes[0].driver)
+        self.assertEqual('a.b.c.d', probes[0].params['mgmt_ip'])
+        self.assertEqual(test_boot_wait, probes[0].delay)
+        self.assertEqual(2, probes[0].interval)
+        self.assertEqual({'failure': 'respawn'}, probes[0].actions)
+
+    @mock.patch('tacker.vnfm.monitor.VNFMonitor.__run__')
+    def test_pop_due_probes(self, mock_monitor_run):
+        test_boot_wait = 30
+        test_vnfmonitor = monitor.VNFMonitor(test_boot_wait)
+        hosting_vnf = _make_hosting_vnf('vnf')
+        stale_vnf = _make_hosting_vnf('vnf')
+        dead_vnf = _make_hosting_vnf('dead-vnf')
+        dead_vnf.dead = True
+
+        def _probe(hosting_vnf):
+            return monitor.Probe(hosting_vnf, 'vdu1', 'ping', {}, {}, 0, 10)
+
+        due_probe = _probe(hosting_vnf)
+        with mock.patch.object(test_vnfmonitor, '_hosting_vnfs',
+                               {'vnf': hosting_vnf, 'dead-vnf': dead_vnf}), \
+                mock.patch.object(test_vnfmonitor, '_schedule', []):
+            now = time.time()
+            test_vnfmonitor._schedule_probe(due_probe, now - 1)
+            test_vnfmonitor._schedule_probe(_probe(stale_vnf), now - 1)
+            test_vnfmonitor._schedule_probe(_probe(dead_vnf), now - 1)
+            test_vnfmonitor._schedule_probe(_probe(hosting_vnf), now + 60)
+            self.assertEqual([due_probe], test_vnfmonitor._pop_due_probes())
+            self.assertEqual(1, len(test_vnfmonitor._schedule))
+            self.assertGreater(test_vnfmonitor._time_to_next_probe(), 0)
+
+    @mock.patch('tacker.vnfm.monitor.VNFMonitor.__run__')
+    def test_run_scheduled_probes_reschedules(self, mock_monitor_run):
+        test_boot_wait = 30
+        test_vnfmonitor = monitor.VNFMonitor(test_boot_wait)
+        probe = monitor.Probe(_make_hosting_vnf('vnf'), 'vdu1', 'ping', {},
+                              {}, 0, 5)
+        with mock.patch.object(test_vnfmonitor, '_schedule', []), \
+                mock.patch.object(test_vnfmonitor,
+                                  'run_sweep') as mock_run_sweep:
+            start = time.time()
+            test_vnfmonitor._run_scheduled_probes([probe])
+            mock_run_sweep.assert_called_once_with([probe],
+                                                   on_done=mock.ANY)
+            due, sequence, scheduled_probe = test_vnfmonitor._schedule[0]
+            self.assertIs(probe, scheduled_probe)
+            self.assertGreaterEqual(due, start + 5)
+
+    @mock.patch('tacker.vnfm.monitor.VNFMonitor.__run__')
+    def test_slow_probe_does_not_hold_back_fast_probe(self,
+                                                      mock_monitor_run):
+        test_boot_wait = 30
+        test_vnfmonitor = monitor.VNFMonitor(test_boot_wait)
+        hosting_vnf = _make_hosting_vnf('vnf')
+        slow_probe = monitor.Probe(hosting_vnf, 'vdu1', 'http_ping', {}, {},
+                                   0, 60)
+        fast_probe = monitor.Probe(hosting_vnf, 'vdu1', 'ping', {}, {}, 0, 2)
+        other_fast_probe = monitor.Probe(hosting_vnf, 'vdu2', 'ping', {},
+                                         {}, 0, 2)
+        slow_done = event.Event()
+
+        def _run_probe(probe):
+            if probe is slow_probe:
+                slow_done.wait()
+
+        def _scheduled():
+            return [entry[2] for entry in test_vnfmonitor._schedule]
+
+        with mock.patch.object(test_vnfmonitor, '_schedule', []), \
+                mock.patch.object(test_vnfmonitor, 'monitor_call_batch',
+                                  return_value=None), \
+                mock.patch.object(test_vnfmonitor, 'run_probe',
+                                  side_effect=_run_probe):
+            start = time.time()
+            slow_sweep = eventlet.spawn(
+                test_vnfmonitor._run_scheduled_probes,
+                [slow_probe, fast_probe])
+            # a concurrent sweep returns without waiting for the slow probe
+            test_vnfmonitor._run_scheduled_probes([other_fast_probe])
+            eventlet.sleep(0)
+            self.assertEqual([fast_probe, other_fast_probe],
+                             sorted(_scheduled(), key=lambda p: p.vdu))
+            for due, sequence, probe in test_vnfmonitor._schedule:
+                self.assertGreaterEqual(due, start + 2)
+                self.assertLess(due, start + 60)
+
+            slow_done.send()
+            slow_sweep.wait()
+            self.assertIn(slow_probe, _scheduled())
+            self.assertEqual(3, len(test_vnfmonitor._schedule))
+
+    @mock.patch('tacker.vnfm.monitor.VNFMonitor.__run__')
+    def test_restore_hosting_vnfs(self, mock_monitor_run):
+        test_boot_wait = 30
+        test_vnfmonitor = monitor.VNFMonitor(test_boot_wait, check_intvl=10)
+        monitoring_policy = {'vdus': {'vdu1': {'ping': {
+            'actions': {'failure': 'respawn'}}}}}
+        existing_vnf = _make_hosting_vnf('vnf0')
+        hosting_vnfs = [_make_hosting_vnf('vnf%d' % index, monitoring_policy)
+                        for index in range(4)]
+        with mock.patch.object(test_vnfmonitor, '_hosting_vnfs',
+                               {'vnf0': existing_vnf}), \
+                mock.patch.object(test_vnfmonitor, '_schedule', []):
+            start = time.time()
+            restored = test_vnfmonitor.restore_hosting_vnfs(hosting_vnfs)
+            self.assertEqual(3, restored)
+            self.assertIs(existing_vnf, test_vnfmonitor._hosting_vnfs['vnf0'])
+            dues = sorted(entry[0] for entry in test_vnfmonitor._schedule)
+            self.assertEqual(3, len(dues))
+            # first probes are spread over the check interval
+            self.assertGreaterEqual(dues[0], start + 2.5)
+            self.assertLess(dues[-1], start + 10)
+            for hosting_vnf in hosting_vnfs[1:]:
+                self.assertEqual(hosting_vnf.probes,
+                                 test_vnfmonitor._get_probes(hosting_vnf))
+
+    @mock.patch('tacker.vnfm.monitor.VNFMonitor.__run__')
+    def test_restore_hosting_vnfs_keeps_monitoring_delay(self,
+                                                         mock_monitor_run):
+        test_boot_wait = 30
+        test_vnfmonitor = monitor.VNFMonitor(test_boot_wait, check_intvl=10)
+        monitoring_policy = {'vdus': {'vdu1': {'ping': {
+            'actions': {'failure': 'respawn'},
+            'monitoring_params': {'monitoring_delay': 120}}}}}
+        booting_vnf = _make_hosting_vnf('booting-vnf', monitoring_policy)
+        booting_vnf.boot_at = timeutils.utcnow() - datetime.timedelta(
+            seconds=20)
+        booted_vnf = _make_hosting_vnf('booted-vnf', monitoring_policy)
+        booted_vnf.boot_at = timeutils.utcnow() - datetime.timedelta(
+            seconds=600)
+        with mock.patch.object(test_vnfmonitor, '_hosting_vnfs', {}), \
+                mock.patch.object(test_vnfmonitor, '_schedule', []):
+            start = time.time()
+            restored = test_vnfmonitor.restore_hosting_vnfs(
+                [booting_vnf, booted_vnf], startup=False)
+            self.assertEqual(2, restored)
+            dues = dict((entry[2].hosting_vnf.id, entry[0])
+                        for entry in test_vnfmonitor._schedule)
+            # the booting vnf is first probed once its delay has passed
+            self.assertGreaterEqual(dues['booting-vnf'], start + 99)
+            self.assertLess(dues['booting-vnf'], start + 101)
+            self.assertLess(dues['booted-vnf'], start + 10)
+            self.assertEqual(120, booting_vnf.probes[0].delay)
+            self.assertEqual([], test_vnfmonitor._get_probes(booting_vnf))
+            self.assertEqual(booted_vnf.probes,
+                             test_vnfmonitor._get_probes(booted_vnf))
+
+    def test_probe_failure_threshold(self):
+        probe = monitor.Probe(_make_hosting_vnf(), 'vdu1', 'ping', {},
+                              {'failure': 'respawn'}, 0, 10, threshold=2,
+                              window=3)
+        self.assertFalse(probe.record('failure'))
+        self.assertFalse(probe.record(None))
+        self.assertTrue(probe.record('failure'))
+        probe.reset()
+        self.assertFalse(probe.record('failure'))
+        self.assertFalse(probe.record(None))
+        self.assertFalse(probe.record(None))
+        # the first failure dropped out of the window
+        self.assertFalse(probe.record('failure'))
+
+    @mock.patch('tacker.vnfm.monitor.VNFMonitor.__run__')
+    def test_make_probes_failure_threshold(self, mock_monitor_run):
+        test_vnfmonitor = monitor.VNFMonitor(30)
+        hosting_vnf = _make_hosting_vnf(monitoring_policy={
+            'vdus': {'vdu1': {'ping': {
+                'actions': {'failure': 'respawn'},
+                'monitoring_params': {'failure_threshold': 3,
+                                      'failure_window': 5}}}}})
+        probe = test_vnfmonitor._make_probes(hosting_vnf)[0]
+        self.assertEqual(3, probe.threshold)
+        self.assertEqual(5, len(probe.outcomes))
+
+    @mock.patch('tacker.vnfm.monitor.VNFMonitor.__run__')
+    def test_action_hold_down(self, mock_monitor_run):
+        test_vnfmonitor = monitor.VNFMonitor(30)
+        test_vnfmonitor._hold_down = 10
+        test_vnfmonitor._max_hold_down = 25
+        probe = monitor.Probe(_make_hosting_vnf('vnf'), 'vdu1', 'ping', {},
+                              {'failure': 'respawn'}, 0, 10)
+        with mock.patch.object(test_vnfmonitor, '_hold_downs', {}), \
+                mock.patch('time.time') as mock_time:
+            mock_time.return_value = 100
+            self.assertEqual('respawn',
+                             test_vnfmonitor._damp(probe, 'failure'))
+            mock_time.return_value = 105
+            self.assertIsNone(test_vnfmonitor._damp(probe, 'failure'))
+            mock_time.return_value = 111
+            self.assertEqual('respawn',
+                             test_vnfmonitor._damp(probe, 'failure'))
+            # the hold-down doubled
+            self.assertEqual((131, 20),
+                             test_vnfmonitor._hold_downs['vnf'][
+                                 ('vdu1', 'ping')])
+            mock_time.return_value = 131
+            test_vnfmonitor._damp(probe, 'failure')
+            self.assertEqual((156, 25),
+                             test_vnfmonitor._hold_downs['vnf'][
+                                 ('vdu1', 'ping')])
+            # healthy for a whole hold-down after it ended
+            mock_time.return_value = 181
+            self.assertIsNone(test_vnfmonitor._damp(probe, True))
+            self.assertEqual({}, test_vnfmonitor._hold_downs)
+
+    @mock.patch('tacker.vnfm.monitor.VNFMonitor.__run__')
+    def test_add_hosting_vnf_owned_by_other_member(self, mock_monitor_run):
+        test_vnfmonitor = monitor.VNFMonitor(30)
+        membership = mock.Mock()
+        membership.owns.return_value = False
+        hosting_vnf = _make_hosting_vnf('vnf-other')
+        with mock.patch.object(test_vnfmonitor, '_membership', membership):
+            test_vnfmonitor.add_hosting_vnf(hosting_vnf)
+            self.assertEqual(0, test_vnfmonitor.restore_hosting_vnfs(
+                [hosting_vnf]))
+        self.assertNotIn('vnf-other', test_vnfmonitor._hosting_vnfs)
+        membership.owns.assert_called_with('vnf-other')
+
+
+class TestMonitorMembership(testtools.TestCase):
+
+    def setUp(self):
+        super(TestMonitorMembership, self).setUp()
+        mock.patch('tacker.context.get_admin_context').start()
+        self.mock_db = mock.patch(
+            'tacker.db.common_services.monitor_members_db.'
+            'MonitorMembersDb').start().return_value
+        self.addCleanup(mock.patch.stopall)
+        self.membership = monitor.MonitorMembership(member_id='member-a')
+
+    def test_owns_everything_alone(self):
+        self.mock_db.get_live_members.return_value = ['member-a']
+        self.assertFalse(self.membership.heartbeat())
+        self.mock_db.heartbeat.assert_called_once_with(
+            mock.ANY, 'member-a', self.membership.host)
+        self.assertTrue(all(self.membership.owns('vnf%d' % index)
+                            for index in range(100)))
+
+    def test_rebalance_on_join_and_leave(self):
+        vnf_ids = ['vnf%d' % index for index in range(1000)]
+        self.mock_db.get_live_members.return_value = ['member-a',
+                                                      'member-b']
+        self.assertTrue(self.membership.heartbeat())
+        owned = set(vnf_id for vnf_id in vnf_ids
+                    if self.membership.owns(vnf_id))
+        self.assertTrue(0 < len(owned) < len(vnf_ids))
+
+        other = monitor.MonitorMembership(member_id='member-b')
+        self.assertTrue(other.heartbeat())
+        other_owned = set(vnf_id for vnf_id in vnf_ids
+                          if other.owns(vnf_id))
+        self.assertEqual(set(vnf_ids), owned | other_owned)
+        self.assertFalse(owned & other_owned)
+
+        # a third member only takes over keys, they never move between
+        # the members which stay
+        self.mock_db.get_live_members.return_value = ['member-a',
+                                                      'member-b',
+                                                      'member-c']
+        self.assertTrue(self.membership.heartbeat())
+        self.assertTrue(set(vnf_id for vnf_id in vnf_ids
+                            if self.membership.owns(vnf_id)) <= owned)
+
+        self.mock_db.get_live_members.return_value = []
+        self.assertTrue(self.membership.heartbeat())
+        self.assertTrue(all(self.membership.owns(vnf_id)
+                            for vnf_id in vnf_ids))
+
+    def test_notify_listeners(self):
+        listener = mock.Mock(side_effect=[Exception, None])
+        second = mock.Mock()
+        self.membership.add_listener(listener)
+        self.membership.add_listener(second)
+        self.membership._notify()
+        self.membership._notify()
+        self.assertEqual(2, listener.call_count)
+        self.assertEqual(2, second.call_count)
+
+
+class TestActionExecutor(testtools.TestCase):
+
+    def test_serialized_per_vnf_and_deduplicated(self):
+        executor = monitor.ActionExecutor(4)
+        calls = []
+
+        def _action(action):
+            calls.append(('start', action))
+            eventlet.sleep(0.01)
+            calls.append(('end', action))
+
+        self.assertTrue(executor.submit('vnf1', 'respawn', _action))
+        self.assertFalse(executor.submit('vnf1', 'respawn', _action))
+        self.assertTrue(executor.submit('vnf1', 'log', _action))
+        self.assertEqual(['respawn', 'log'], executor.pending('vnf1'))
+        self.assertEqual(2, executor.queued())
+        executor.wait()
+        self.assertEqual([('start', 'respawn'), ('end', 'respawn'),
+                          ('start', 'log'), ('end', 'log')], calls)
+        self.assertEqual([], executor.pending('vnf1'))
+        self.assertEqual(0, executor.queued())
+        # the action can be queued again once it ran
+        self.assertTrue(executor.submit('vnf1', 'respawn', _action))
+        executor.wait()
+
+    def test_bounded_concurrency(self):
+        executor = monitor.ActionExecutor(2)
+        running = []
+        peak = []
+
+        def _action(action):
+            running.append(action)
+            peak.append(len(running))
+            eventlet.sleep(0.01)
+            running.remove(action)
+
+        for index in range(6):
+            executor.submit('vnf%d' % index, 'respawn', _action)
+        executor.wait()
+        self.assertEqual(6, len(peak))
+        self.assertEqual(2, max(peak))
+
+    def test_failed_action_does_not_stop_queue(self):
+        executor = monitor.ActionExecutor(1)
+        callback = mock.Mock(side_effect=[Exception, None])
+        executor.submit('vnf1', 'respawn', callback)
+        executor.submit('vnf1', 'log', callback)
+        executor.wait()
+        self.assertEqual([mock.call('respawn'), mock.call('log')],
+                         callback.call_args_list)
+
+
+class TestAlarmCoalescer(testtools.TestCase):
+
+    @mock.patch('time.time')
+    def test_duplicates_within_window_dropped(self, mock_time):
+        coalescer = monitor.AlarmCoalescer(30)
+        mock_time.return_value = 100
+        self.assertTrue(coalescer.admit('vnf1', 'alarm1', 'respawn'))
+        self.assertFalse(coalescer.admit('vnf1', 'alarm1', 'respawn'))
+        self.assertTrue(coalescer.admit('vnf1', 'alarm2', 'respawn'))
+        self.assertTrue(coalescer.admit('vnf2', 'alarm1', 'respawn'))
+        mock_time.return_value = 131
+        self.assertTrue(coalescer.admit('vnf1', 'alarm1', 'respawn'))
+
+    def test_release(self):
+        coalescer = monitor.AlarmCoalescer(30)
+        self.assertTrue(coalescer.admit('vnf1', 'alarm1', 'respawn'))
+        coalescer.release('vnf1', 'alarm1', 'respawn')
+        self.assertTrue(coalescer.admit('vnf1', 'alarm1', 'respawn'))
+
+    def test_window_disabled(self):
+        coalescer = monitor.AlarmCoalescer(0)
+        self.assertTrue(coalescer.admit('vnf1', 'alarm1', 'respawn'))
+        self.assertTrue(coalescer.admit('vnf1', 'alarm1', 'respawn'))
+
+    @mock.patch('time.time')
+    def test_cooldown_drops_all_policies(self, mock_time):
+        coalescer = monitor.AlarmCoalescer(0)
+        mock_time.return_value = 100
+        coalescer.cool_down('vnf1', 'SP1-out', 120)
+        self.assertFalse(coalescer.admit('vnf1', 'alarm1', 'SP1-out'))
+        self.assertFalse(coalescer.admit('vnf1', 'alarm2', 'SP1-out'))
+        self.assertTrue(coalescer.admit('vnf1', 'alarm1', 'SP1-in'))
+        mock_time.return_value = 221
+        self.assertTrue(coalescer.admit('vnf1', 'alarm1', 'SP1-out'))
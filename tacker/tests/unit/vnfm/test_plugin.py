@@ -13,15 +13,18 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import datetime
 import uuid
 
 import mock
 from mock import patch
+from oslo_config import cfg
 import yaml
 
 from tacker import context
 from tacker.db.common_services import common_services_db
 from tacker.db.nfvo import nfvo_db
+from tacker.db.vnfm import hot_translations_db
 from tacker.db.vnfm import vnfm_db
 from tacker.extensions import vnfm
 from tacker.plugins.common import constants
@@ -65,6 +68,9 @@ class TestVNFMPlugin(db_base.SqlTestCase):
         self._mock_vnf_alarm_monitor()
         self._mock_green_pool()
         self._insert_dummy_vim()
+        cfg.CONF.set_override('rehydrate_on_start', False, 'monitor')
+        self.addCleanup(cfg.CONF.clear_override, 'rehydrate_on_start',
+                        'monitor')
         self.vnfm_plugin = plugin.VNFMPlugin()
         mock.patch('tacker.db.common_services.common_services_db.'
                    'CommonServicesPluginDb.create_event'
@@ -167,6 +173,21 @@ class TestVNFMPlugin(db_base.SqlTestCase):
         session.flush()
         return device_db
 
+    def _insert_monitored_device(self):
+        device_db = self._insert_dummy_device()
+        device_db.mgmt_url = '{"vdu1": "a.b.c.d"}'
+        session = self.context.session
+        vnf_attributes = vnfm_db.VNFAttribute(
+            id='7800cb81-7ed1-4cf6-8387-746468522652',
+            vnf_id='6261579e-d6f3-49ad-8bc3-a9cb974778fe',
+            key='monitoring_policy',
+            value='{"vdus": {"vdu1": {"ping": {"actions": '
+                  '{"failure": "respawn"}}}}}'
+        )
+        session.add(vnf_attributes)
+        session.flush()
+        return device_db
+
     def _insert_scaling_attributes_vnf(self):
         session = self.context.session
         vnf_attributes = vnfm_db.VNFAttribute(
@@ -212,13 +233,15 @@ class TestVNFMPlugin(db_base.SqlTestCase):
         session.add(vim_auth_db)
         session.flush()
 
+    @mock.patch('tacker.vnfm.plugin.toscautils.compile_vnfd')
     @mock.patch('tacker.vnfm.plugin.toscautils.updateimports')
-    @mock.patch('tacker.vnfm.plugin.ToscaTemplate')
+    @mock.patch('tacker.vnfm.plugin.toscautils.ToscaTemplate')
     @mock.patch('tacker.vnfm.plugin.toscautils.get_mgmt_driver')
     def test_create_vnfd(self, mock_get_mgmt_driver, mock_tosca_template,
-                        mock_update_imports):
+                        mock_update_imports, mock_compile_vnfd):
         mock_get_mgmt_driver.return_value = 'dummy_mgmt_driver'
         mock_tosca_template.return_value = mock.ANY
+        mock_compile_vnfd.return_value = '{"version": 1}'
 
         vnfd_obj = utils.get_dummy_vnfd_obj()
         result = self.vnfm_plugin.create_vnfd(self.context, vnfd_obj)
@@ -237,6 +260,9 @@ class TestVNFMPlugin(db_base.SqlTestCase):
             a_file=False, yaml_dict_tpl=yaml_dict)
         mock_get_mgmt_driver.assert_called_once_with(mock.ANY)
         mock_update_imports.assert_called_once_with(yaml_dict)
+        mock_compile_vnfd.assert_called_once_with(mock.ANY, mock.ANY)
+        self.assertEqual('{"version": 1}', result['compiled'])
+        self.assertNotIn('vnfd_compiled', result['attributes'])
         self._cos_db_plugin.create_event.assert_called_once_with(
             self.context, evt_type=constants.RES_EVT_CREATE, res_id=mock.ANY,
             res_state=constants.RES_EVT_ONBOARDED,
@@ -318,6 +344,64 @@ class TestVNFMPlugin(db_base.SqlTestCase):
         self.assertIn('type', resources)
         self.assertIn('id', resources)
 
+    def test_rehydrate_vnf_monitor(self):
+        self._insert_dummy_device_template()
+        device_db = self._insert_monitored_device()
+        self.vnfm_plugin._rehydrate_vnf_monitor()
+        self._vnf_monitor.to_hosting_vnf.assert_called_once_with(
+            mock.ANY, self.vnfm_plugin._vnf_monitor_action, 'test_vim')
+        vnf_dict = self._vnf_monitor.to_hosting_vnf.call_args[0][0]
+        self.assertEqual(device_db['id'], vnf_dict['id'])
+        self.assertIn('monitoring_policy', vnf_dict['attributes'])
+        self.assertEqual('fake_template', vnf_dict['vnfd']['name'])
+        self._vnf_monitor.restore_hosting_vnfs.assert_called_once_with(
+            [mock.ANY], startup=True)
+
+    def test_resync_vnf_monitor(self):
+        self._insert_dummy_device_template()
+        device_db = self._insert_monitored_device()
+        self._vnf_monitor.owns.return_value = True
+        self._vnf_monitor.get_hosting_vnf_ids.return_value = ['gone']
+        with mock.patch.object(self.vnfm_plugin,
+                               '_rehydrate_vnf_monitor') as mock_rehydrate:
+            self.vnfm_plugin._resync_vnf_monitor()
+        self._vnf_monitor.delete_hosting_vnf.assert_called_once_with('gone')
+        mock_rehydrate.assert_called_once_with(set([device_db['id']]),
+                                               startup=False)
+
+    def test_delete_vnfd_deletes_translations(self):
+        self._insert_dummy_device_template()
+        translations_db = hot_translations_db.HotTranslationsDb()
+        translations_db.add_translation(
+            self.context, 'translation-id', 'heat_template', None, None,
+            vnfd_id='eb094833-995e-49f0-a047-dfb56aaf7c4e')
+        self.vnfm_plugin.delete_vnfd(self.context,
+                                     'eb094833-995e-49f0-a047-dfb56aaf7c4e')
+        self.assertIsNone(translations_db.get_translation(self.context,
+                                                          'translation-id'))
+
+    def test_translations_purged(self):
+        translations_db = hot_translations_db.HotTranslationsDb()
+        now = datetime.datetime.utcnow()
+        for index in range(3):
+            with mock.patch('oslo_utils.timeutils.utcnow',
+                            return_value=now + datetime.timedelta(
+                                seconds=index)):
+                translations_db.add_translation(
+                    self.context, 'translation-%d' % index, 'heat_template',
+                    None, None, max_rows=2)
+        self.assertIsNone(translations_db.get_translation(self.context,
+                                                          'translation-0'))
+        for index in (1, 2):
+            self.assertIsNotNone(translations_db.get_translation(
+                self.context, 'translation-%d' % index))
+
+    def test_get_monitored_vnfs_skips_unmonitored(self):
+        self._insert_dummy_device_template()
+        self._insert_dummy_device()
+        self.assertEqual(
+            [], list(self.vnfm_plugin._get_monitored_vnfs(self.context)))
+
     def test_delete_vnf(self):
         self._insert_dummy_device_template()
         dummy_device_obj = self._insert_dummy_device()
@@ -328,7 +412,8 @@ class TestVNFMPlugin(db_base.SqlTestCase):
                                                        context=mock.ANY,
                                                        vnf_id=mock.ANY,
                                                        auth_attr=mock.ANY,
-                                                       region_name=mock.ANY)
+                                                       region_name=mock.ANY,
+                                                       vim_id=mock.ANY)
         self._vnf_monitor.delete_hosting_vnf.assert_called_with(mock.ANY)
         self._pool.spawn_n.assert_called_once_with(mock.ANY, mock.ANY,
                                                    mock.ANY, mock.ANY,
@@ -433,6 +518,22 @@ class TestVNFMPlugin(db_base.SqlTestCase):
             self.context, vnf_id, trigger_request)
         self.assertEqual(expected_result, trigger_result)
 
+    @patch('tacker.db.vnfm.vnfm_db.VNFMPluginDb.get_vnf')
+    @patch('tacker.vnfm.monitor.ActionPolicy.get_policy')
+    def test_vnf_monitor_action_fetches_vnf(self, mock_get_policy,
+                                            mock_get_vnf):
+        dummy_vnf = self._get_dummy_active_vnf(
+            utils.vnfd_alarm_respawn_tosca_template)
+        mock_get_vnf.return_value = dummy_vnf
+        mock_action_class = mock.Mock()
+        mock_get_policy.return_value = mock_action_class
+        hosting_vnf = mock.Mock(id=dummy_vnf['id'], infra_driver='test_vim')
+        self.vnfm_plugin._vnf_monitor_action(hosting_vnf, 'respawn')
+        mock_get_policy.assert_called_once_with('respawn', 'test_vim')
+        mock_get_vnf.assert_called_once_with(mock.ANY, dummy_vnf['id'])
+        mock_action_class.execute_action.assert_called_once_with(
+            self.vnfm_plugin, dummy_vnf)
+
     @patch('tacker.db.vnfm.vnfm_db.VNFMPluginDb.get_vnf')
     @patch('tacker.vnfm.monitor.ActionPolicy.get_policy')
     def test_create_vnf_trigger_respawn(self, mock_get_policy, mock_get_vnf):
@@ -462,6 +563,65 @@ class TestVNFMPlugin(db_base.SqlTestCase):
         mock_action_class.execute_action.assert_called_once_with(
             self.vnfm_plugin, dummy_vnf, scale_body)
 
+    @patch('tacker.db.vnfm.vnfm_db.VNFMPluginDb.get_vnf')
+    @patch('tacker.vnfm.monitor.ActionPolicy.get_policy')
+    def test_create_vnf_trigger_coalesced(self, mock_get_policy,
+                                          mock_get_vnf):
+        dummy_vnf = self._get_dummy_active_vnf(
+            utils.vnfd_alarm_respawn_tosca_template)
+        mock_get_vnf.return_value = dummy_vnf
+        mock_action_class = mock.Mock()
+        mock_get_policy.return_value = mock_action_class
+        for i in range(3):
+            self._test_create_vnf_trigger(
+                policy_name="vdu_hcpu_usage_respawning",
+                action_value="respawn")
+        mock_action_class.execute_action.assert_called_once_with(
+            self.vnfm_plugin, dummy_vnf)
+
+    @patch('tacker.db.vnfm.vnfm_db.VNFMPluginDb.get_vnf')
+    @patch('tacker.vnfm.monitor.ActionPolicy.get_policy')
+    def test_create_vnf_trigger_skipped_not_coalesced(self, mock_get_policy,
+                                                      mock_get_vnf):
+        dummy_vnf = self._get_dummy_active_vnf(
+            utils.vnfd_alarm_scale_tosca_template)
+        dummy_vnf['status'] = constants.PENDING_SCALE_OUT
+        mock_get_vnf.return_value = dummy_vnf
+        mock_action_class = mock.Mock()
+        mock_get_policy.return_value = mock_action_class
+        self._test_create_vnf_trigger(policy_name="vdu_hcpu_usage_scaling_out",
+                                      action_value="SP1-out")
+        self.assertFalse(mock_action_class.execute_action.called)
+        dummy_vnf['status'] = constants.ACTIVE
+        self._test_create_vnf_trigger(policy_name="vdu_hcpu_usage_scaling_out",
+                                      action_value="SP1-out")
+        self.assertEqual(1, mock_action_class.execute_action.call_count)
+
+    @patch('tacker.vnfm.plugin.VNFMPlugin.create_vnf_trigger')
+    def test_enqueue_vnf_trigger(self, mock_create_vnf_trigger):
+        vnf_id = "6261579e-d6f3-49ad-8bc3-a9cb974778fe"
+        trigger = {"trigger": {"action_name": "respawn", "params": {},
+                               "policy_name": "vdu_hcpu_usage_respawning"}}
+        self.assertTrue(self.vnfm_plugin.enqueue_vnf_trigger(vnf_id,
+                                                             trigger))
+        self.vnfm_plugin._alarm_executor.wait()
+        mock_create_vnf_trigger.assert_called_once_with(mock.ANY, vnf_id,
+                                                        trigger)
+
+    @patch('tacker.vnfm.plugin.VNFMPlugin.create_vnf_trigger')
+    def test_create_vnf_triggers(self, mock_create_vnf_trigger):
+        error = vnfm.VNFNotFound(vnf_id='vnf2')
+        mock_create_vnf_trigger.side_effect = [None, None, error]
+        triggers = [('vnf1', {'trigger': 1}), ('vnf2', {'trigger': 2}),
+                    ('vnf1', {'trigger': 3})]
+        errors = self.vnfm_plugin.create_vnf_triggers(triggers)
+        self.assertEqual([None, error, None], errors)
+        self.assertEqual(
+            [mock.call(mock.ANY, 'vnf1', {'trigger': 1}),
+             mock.call(mock.ANY, 'vnf1', {'trigger': 3}),
+             mock.call(mock.ANY, 'vnf2', {'trigger': 2})],
+            mock_create_vnf_trigger.call_args_list)
+
     @patch('tacker.db.vnfm.vnfm_db.VNFMPluginDb.get_vnf')
     def test_get_vnf_policies(self, mock_get_vnf):
         vnf_id = "6261579e-d6f3-49ad-8bc3-a9cb974778fe"
@@ -471,3 +631,22 @@ class TestVNFMPlugin(db_base.SqlTestCase):
         policies = self.vnfm_plugin.get_vnf_policies(self.context, vnf_id,
             filters={'name': 'vdu1_cpu_usage_monitoring_policy'})
         self.assertEqual(1, len(policies))
+
+    @patch('tacker.db.vnfm.vnfm_db.VNFMPluginDb.get_vnf')
+    def test_get_vnf_policies_parsed_once(self, mock_get_vnf):
+        vnf_id = "6261579e-d6f3-49ad-8bc3-a9cb974778fe"
+        dummy_vnf = self._get_dummy_active_vnf(
+            utils.vnfd_alarm_respawn_tosca_template)
+        mock_get_vnf.return_value = dummy_vnf
+        with patch('yaml.safe_load', side_effect=yaml.safe_load) as mock_load:
+            for i in range(3):
+                policies = self.vnfm_plugin.get_vnf_policies(
+                    self.context, vnf_id,
+                    filters={'name': 'vdu1_cpu_usage_monitoring_policy'})
+                self.assertEqual(1, len(policies))
+            self.assertEqual(1, mock_load.call_count)
+            dummy_vnf['vnfd']['updated_at'] = datetime.datetime(2017, 1, 1)
+            self.vnfm_plugin.get_vnf_policies(
+                self.context, vnf_id,
+                filters={'name': 'vdu1_cpu_usage_monitoring_policy'})
+            self.assertEqual(2, mock_load.call_count)
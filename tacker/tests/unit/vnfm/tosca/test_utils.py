@@ -13,12 +13,18 @@
 
 import codecs
 import os
+import tempfile
 
+import mock
+from oslo_serialization import jsonutils
 import testtools
 import yaml
 
+from tacker.extensions import common_services as cs
 from tacker.tosca import utils as toscautils
+from toscaparser import imports as tosca_imports
 from toscaparser import tosca_template
+from toscaparser.utils import yamlparser
 from translator.hot import tosca_translator
 
 
@@ -48,6 +54,60 @@ class TestToscaUtils(testtools.TestCase):
         expected_imports = [file1, file2]
         self.assertEqual(expected_imports, self.vnfd_dict['imports'])
 
+    def test_type_definition_cache(self):
+        loader = mock.Mock(side_effect=lambda path, a_file: {'path': path})
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        cache = toscautils.TypeDefinitionCache(loader, paths=[path])
+        first = cache.load(path)
+        first['path'] = 'changed'
+        self.assertEqual({'path': path}, cache.load(path))
+        self.assertEqual(1, loader.call_count)
+        self.assertEqual(1, cache.hits)
+        os.utime(path, (0, 0))
+        cache.load(path)
+        self.assertEqual(2, loader.call_count)
+        cache.load('/other.yaml')
+        cache.load('/other.yaml')
+        self.assertEqual(4, loader.call_count)
+
+    def test_type_definition_cache_real_path(self):
+        loader = mock.Mock(side_effect=lambda path, a_file: {'path': path})
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        cache = toscautils.TypeDefinitionCache(loader, paths=[path])
+        cache.load(path)
+        dirname, filename = os.path.split(path)
+        cache.load(os.path.join(dirname, '.', filename))
+        cwd = os.getcwd()
+        self.addCleanup(os.chdir, cwd)
+        os.chdir(dirname)
+        cache.load(filename)
+        self.assertEqual(1, loader.call_count)
+        self.assertEqual(2, cache.hits)
+
+    def test_type_definitions_hook_restored(self):
+        loader = tosca_imports.YAML_LOADER
+        with toscautils.type_definitions():
+            self.assertEqual(toscautils.TYPE_DEFINITIONS.load,
+                             tosca_imports.YAML_LOADER)
+            with toscautils.type_definitions():
+                pass
+            self.assertEqual(toscautils.TYPE_DEFINITIONS.load,
+                             tosca_imports.YAML_LOADER)
+        self.assertIs(loader, tosca_imports.YAML_LOADER)
+
+    def test_type_definitions_loaded_once(self):
+        loads = toscautils.TYPE_DEFINITIONS.hits
+        vnfd_dict = yaml.safe_load(self.tosca_openwrt)
+        toscautils.updateimports(vnfd_dict)
+        with toscautils.type_definitions():
+            tosca_template.ToscaTemplate(parsed_params={}, a_file=False,
+                                         yaml_dict_tpl=vnfd_dict)
+        self.assertEqual(loads + 2, toscautils.TYPE_DEFINITIONS.hits)
+
     def test_get_mgmt_driver(self):
         expected_mgmt_driver = 'openwrt'
         mgmt_driver = toscautils.get_mgmt_driver(self.tosca)
@@ -65,6 +125,96 @@ class TestToscaUtils(testtools.TestCase):
         monitoring = toscautils.get_vdu_monitoring(self.tosca)
         self.assertEqual(expected_monitoring, monitoring)
 
+    def test_compile_vnfd(self):
+        compiled = jsonutils.loads(toscautils.compile_vnfd(
+            self.tosca_openwrt, self.tosca))
+        self.assertEqual(toscautils.COMPILED_VNFD_VERSION,
+                         compiled['version'])
+        self.assertEqual(yaml.safe_load(self.tosca_openwrt),
+                         compiled['template'])
+        self.assertEqual(['VDU1'], compiled['vdus'])
+        self.assertEqual(['CP1'], compiled['cps'])
+        self.assertEqual([], compiled['policies'])
+        self.assertEqual('openwrt', compiled['mgmt_driver'])
+
+    def test_load_compiled_vnfd(self):
+        vnfd = {
+            'attributes': {'vnfd': self.tosca_openwrt},
+            'compiled': toscautils.compile_vnfd(self.tosca_openwrt,
+                                                self.tosca)}
+        with mock.patch.object(yamlparser, 'simple_ordered_parse') as parse:
+            compiled = toscautils.load_compiled_vnfd(vnfd)
+        self.assertFalse(parse.called)
+        self.assertEqual('openwrt', compiled['mgmt_driver'])
+
+    def test_load_compiled_vnfd_memoized(self):
+        self.addCleanup(toscautils.COMPILED_VNFDS.clear)
+        vnfd = {
+            'id': 'vnfd-uuid', 'created_at': 'created', 'updated_at': None,
+            'attributes': {'vnfd': self.tosca_openwrt},
+            'compiled': toscautils.compile_vnfd(self.tosca_openwrt,
+                                                self.tosca)}
+        with mock.patch.object(jsonutils, 'loads',
+                               side_effect=jsonutils.loads) as loads:
+            compiled = toscautils.load_compiled_vnfd(vnfd)
+            self.assertIs(compiled, toscautils.load_compiled_vnfd(vnfd))
+            self.assertEqual(1, loads.call_count)
+            vnfd['updated_at'] = 'updated'
+            self.assertIsNot(compiled, toscautils.load_compiled_vnfd(vnfd))
+            self.assertEqual(2, loads.call_count)
+
+    def test_load_compiled_vnfd_not_compiled(self):
+        compiled = toscautils.load_compiled_vnfd(
+            {'attributes': {'vnfd': self.tosca_openwrt}, 'compiled': None})
+        self.assertEqual(yaml.safe_load(self.tosca_openwrt),
+                         compiled['template'])
+        self.assertEqual([], compiled['policies'])
+        self.assertIsNone(toscautils.load_compiled_vnfd({}))
+
+    def test_substitute_inputs(self):
+        template = {'VDU1': {'properties': {
+            'image': {'get_input': 'image'},
+            'flavor': {'get_input': 'flavor'},
+            'networks': [{'get_input': 'net'}]}}}
+        inputs = toscautils.find_get_inputs(template)
+        self.assertEqual(2, len(inputs))
+        toscautils.substitute_inputs(inputs, {'image': 'cirros',
+                                              'flavor': 'm1.tiny'})
+        self.assertEqual({'VDU1': {'properties': {
+            'image': 'cirros', 'flavor': 'm1.tiny',
+            'networks': [{'get_input': 'net'}]}}}, template)
+
+    def test_substitute_inputs_topology_template(self):
+        topology = {
+            'inputs': {'vl1_name': {'type': 'string'}},
+            'node_templates': {'VL1': {'properties': {
+                'network_name': {'get_input': 'vl1_name'}}}},
+            'groups': {'VNFFG1': {'properties': {
+                'vendor': {'get_input': 'vendor'}}}},
+            'outputs': {'vl1': {'value': {'get_input': 'vl1_name'}}}}
+        inputs = toscautils.find_get_inputs(topology)
+        self.assertEqual(3, len(inputs))
+        toscautils.substitute_inputs(inputs, {'vl1_name': 'net_mgmt',
+                                              'vendor': 'tacker'})
+        self.assertEqual('net_mgmt', topology['node_templates']['VL1'][
+            'properties']['network_name'])
+        self.assertEqual('tacker', topology['groups']['VNFFG1'][
+            'properties']['vendor'])
+        self.assertEqual('net_mgmt', topology['outputs']['vl1']['value'])
+
+    def test_substitute_inputs_missing(self):
+        template = {'VDU1': {'properties': {
+            'image': {'get_input': 'image'},
+            'flavor': {'get_input': 'flavor'},
+            'key_name': {'get_input': 'key_name'}}}}
+        inputs = toscautils.find_get_inputs(template)
+        error = self.assertRaises(cs.InputValuesMissing,
+                                  toscautils.substitute_inputs, inputs,
+                                  {'image': 'cirros'})
+        self.assertIn("'flavor, key_name'", str(error))
+        self.assertEqual({'get_input': 'image'},
+                         template['VDU1']['properties']['image'])
+
     def test_get_mgmt_ports(self):
         expected_mgmt_ports = {'mgmt_ip-VDU1': 'CP1'}
         mgmt_ports = toscautils.get_mgmt_ports(self.tosca)
@@ -0,0 +1,81 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+from oslo_config import cfg
+from oslo_serialization import jsonutils
+
+from tacker.extensions import vnfm
+from tacker.tests.unit import base
+from tacker.tosca import workers
+
+
+def _echo(*args):
+    return list(args)
+
+
+def _fail(error_msg_details):
+    raise vnfm.HeatTranslatorFailed(error_msg_details=error_msg_details)
+
+
+class TestToscaWorkers(base.TestCase):
+
+    def setUp(self):
+        super(TestToscaWorkers, self).setUp()
+        patcher = mock.patch.dict(workers.FUNCTIONS, {
+            'echo': __name__ + '._echo',
+            'fail': __name__ + '._fail'})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_call_in_process(self):
+        cfg.CONF.set_override('tosca_workers', 0, 'tacker')
+        self.addCleanup(cfg.CONF.clear_override, 'tosca_workers', 'tacker')
+        self.assertEqual([1, 'a'], workers.call('echo', 1, 'a'))
+
+    def test_run(self):
+        self.assertEqual({'result': [1, 'a']},
+                         workers._run({'function': 'echo', 'args': [1, 'a']}))
+
+    def test_run_error_raised_again(self):
+        response = workers._run({'function': 'fail', 'args': ['bad']})
+        error = workers._make_error(**response['error'])
+        self.assertIsInstance(error, vnfm.HeatTranslatorFailed)
+        self.assertEqual(str(vnfm.HeatTranslatorFailed(
+            error_msg_details='bad')), str(error))
+
+    def test_unknown_error_raised_as_tosca_parser_failed(self):
+        response = workers._run({'function': 'echo', 'args': None})
+        error = workers._make_error(**response['error'])
+        self.assertIsInstance(error, vnfm.ToscaParserFailed)
+
+    @mock.patch.object(workers, '_Worker')
+    def test_pool_reuses_workers(self, mock_worker):
+        mock_worker.return_value.call.return_value = jsonutils.dump_as_bytes(
+            {'result': [1, 'a']})
+        pool = workers.WorkerPool(2, 10)
+        self.assertEqual([1, 'a'], pool.call('echo', [1, 'a']))
+        self.assertEqual([1, 'a'], pool.call('echo', [1, 'a']))
+        self.assertEqual(1, mock_worker.call_count)
+        request = mock_worker.return_value.call.call_args[0][0]
+        self.assertEqual({'function': 'echo', 'args': [1, 'a']},
+                         jsonutils.loads(request))
+
+    @mock.patch.object(workers, '_Worker')
+    def test_pool_kills_silent_worker(self, mock_worker):
+        mock_worker.return_value.call.return_value = b''
+        pool = workers.WorkerPool(2, 10)
+        self.assertRaises(vnfm.ToscaParserFailed, pool.call, 'echo', [])
+        mock_worker.return_value.kill.assert_called_once_with()
+        self.assertRaises(vnfm.ToscaParserFailed, pool.call, 'echo', [])
+        self.assertEqual(2, mock_worker.call_count)
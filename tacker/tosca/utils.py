@@ -12,22 +12,31 @@
 #    under the License.
 
 import collections
+import contextlib
+import copy
 import os
 import re
 import sys
+import threading
 import yaml
 
 from oslo_log import log as logging
+from oslo_serialization import jsonutils
 from six import iteritems
+from toscaparser import imports as tosca_imports
 from toscaparser import properties
+from toscaparser.tosca_template import ToscaTemplate
 from toscaparser.utils import yamlparser
 
+from tacker.common import cache
 from tacker.common import log
 from tacker.common import utils
+from tacker.extensions import common_services as cs
 from tacker.extensions import vnfm
 
 from collections import OrderedDict
 
+COMPILED_VNFD_VERSION = 1
 FAILURE = 'tosca.policies.tacker.Failure'
 LOG = logging.getLogger(__name__)
 MONITORING = 'tosca.policies.tacker.Monitoring'
@@ -84,9 +93,80 @@ HEAT_RESOURCE_MAP = {
 }
 
 
+DEFS_PATH = os.path.dirname(os.path.abspath(__file__)) + '/lib/'
+DEFS_FILES = (DEFS_PATH + 'tacker_defs.yaml',
+              DEFS_PATH + 'tacker_nfv_defs.yaml')
+
+
+class TypeDefinitionCache(object):
+    """Parsed tacker type definition files shared by the process.
+
+    tosca-parser reads and parses every file imported by a template each
+    time a template is parsed. The tacker definition files are parsed once
+    and again only when their mtime changes, other files are loaded by
+    `loader`. Every caller gets its own copy of the definitions.
+    """
+
+    def __init__(self, loader, paths=DEFS_FILES):
+        self._loader = loader
+        self._paths = frozenset(os.path.realpath(path) for path in paths)
+        self._defs = {}   # real path => (mtime, parsed definitions)
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, path, a_file=True):
+        if not a_file:
+            return self._loader(path, a_file)
+        realpath = os.path.realpath(path)
+        if realpath not in self._paths:
+            return self._loader(path, a_file)
+        try:
+            mtime = os.stat(realpath).st_mtime
+        except OSError:
+            return self._loader(path, a_file)
+        cached = self._defs.get(realpath)
+        if cached is None or cached[0] != mtime:
+            self.misses += 1
+            cached = (mtime, self._loader(path, a_file))
+            self._defs[realpath] = cached
+        else:
+            self.hits += 1
+        return copy.deepcopy(cached[1])
+
+
+TYPE_DEFINITIONS = TypeDefinitionCache(tosca_imports.YAML_LOADER)
+_hook_lock = threading.Lock()
+_hook_users = 0   # parses running with the hook installed
+_replaced_loader = None
+
+
+@contextlib.contextmanager
+def type_definitions():
+    """Load the tacker type definitions from `TYPE_DEFINITIONS`.
+
+    tosca-parser loads the imported files through its module level
+    YAML_LOADER, the cache is installed there while templates are parsed
+    and the original loader is restored once the last parse is done.
+    """
+    global _hook_users, _replaced_loader
+    with _hook_lock:
+        if not _hook_users:
+            _replaced_loader = tosca_imports.YAML_LOADER
+            tosca_imports.YAML_LOADER = TYPE_DEFINITIONS.load
+        _hook_users += 1
+    try:
+        yield TYPE_DEFINITIONS
+    finally:
+        with _hook_lock:
+            _hook_users -= 1
+            if not _hook_users:
+                tosca_imports.YAML_LOADER = _replaced_loader
+                _replaced_loader = None
+
+
 @log.log
 def updateimports(template):
-    path = os.path.dirname(os.path.abspath(__file__)) + '/lib/'
+    path = DEFS_PATH
     defsfile = path + 'tacker_defs.yaml'
 
     if 'imports' in template:
@@ -137,6 +217,42 @@ def check_for_substitution_mappings(template, params):
             raise vnfm.InvalidSubstitutionMapping(requirement=req_name)
 
 
+def find_get_inputs(template):
+    """Index the get_input functions of a template in a single walk.
+
+    Returns a (path, mapping, key, input name) tuple per function, where
+    mapping[key] is the function and path the keys leading from the
+    template to mapping. Only the mappings of the template are walked.
+    """
+    sites = []
+    stack = [((), template)]
+    while stack:
+        path, mapping = stack.pop()
+        for key, value in iteritems(mapping):
+            if not isinstance(value, dict):
+                continue
+            if 'get_input' in value:
+                sites.append((path, mapping, key, value['get_input']))
+            else:
+                stack.append((path + (key,), value))
+    return sites
+
+
+def substitute_inputs(sites, params):
+    """Replace the get_input functions found by find_get_inputs.
+
+    The inputs missing from params are all reported before the template
+    is changed.
+    """
+    missing = set(str(name) for path, mapping, key, name in sites
+                  if name not in params)
+    if missing:
+        LOG.debug('Input values missing: %s', missing)
+        raise cs.InputValuesMissing(key=', '.join(sorted(missing)))
+    for path, mapping, key, name in sites:
+        mapping[key] = params[name]
+
+
 @log.log
 def get_vdu_monitoring(template):
     monitoring_dict = dict()
@@ -351,6 +467,89 @@ def get_mgmt_driver(template):
     return mgmt_driver
 
 
+def _compile_template(template):
+    topology = template.get('topology_template') or {}
+    return {
+        'version': COMPILED_VNFD_VERSION,
+        'template': template,
+        'policies': topology.get('policies') or [],
+        'substitution_mappings': topology.get('substitution_mappings'),
+    }
+
+
+def compile_vnfd(vnfd_yaml, tosca):
+    """Compile a VNFD validated by tosca-parser as `tosca`.
+
+    Returns the JSON stored in the compiled column of the VNFD, or None
+    when the template does not survive a JSON round trip.
+    """
+    template = yamlparser.simple_ordered_parse(vnfd_yaml)
+    if jsonutils.loads(jsonutils.dumps(template)) != template:
+        LOG.debug('VNFD is not JSON serializable, it is not compiled')
+        return None
+    compiled = _compile_template(template)
+    compiled['vdus'] = [nt.name for nt in findvdus(tosca)]
+    compiled['cps'] = [nt.name for nt in tosca.nodetemplates
+                       if nt.type_definition.is_derived_from(TACKERCP)]
+    compiled['mgmt_driver'] = get_mgmt_driver(tosca)
+    return jsonutils.dumps(compiled)
+
+
+def validate_vnfd(vnfd_yaml):
+    """Validate a VNFD with tosca-parser.
+
+    Returns the management driver and the compiled form of the VNFD.
+    """
+    vnfd_dict = yaml.safe_load(vnfd_yaml)
+    # Prepend the tacker_defs.yaml import file with the full
+    # path to the file
+    updateimports(vnfd_dict)
+
+    try:
+        with type_definitions():
+            tosca = ToscaTemplate(a_file=False, yaml_dict_tpl=vnfd_dict)
+    except Exception as e:
+        LOG.exception(_("tosca-parser error: %s"), str(e))
+        raise vnfm.ToscaParserFailed(error_msg_details=str(e))
+
+    return {'mgmt_driver': get_mgmt_driver(tosca),
+            'compiled': compile_vnfd(vnfd_yaml, tosca)}
+
+
+# vnfd_id => (updated_at, compiled vnfd)
+COMPILED_VNFDS = cache.LRUCache(128)
+
+
+def load_compiled_vnfd(vnfd):
+    """Return the compiled form of a VNFD dict.
+
+    VNFDs onboarded before they were compiled get the parts which only
+    need the template, parsed from their YAML. The result is shared by
+    the callers loading the same VNFD and must be treated as read-only.
+    """
+    vnfd_id = vnfd.get('id')
+    stamp = vnfd.get('updated_at') or vnfd.get('created_at')
+    cached = COMPILED_VNFDS.get(vnfd_id) if vnfd_id else None
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    compiled = _load_compiled_vnfd(vnfd)
+    if vnfd_id and compiled is not None:
+        COMPILED_VNFDS.put(vnfd_id, (stamp, compiled))
+    return compiled
+
+
+def _load_compiled_vnfd(vnfd):
+    compiled = vnfd.get('compiled')
+    if compiled:
+        compiled = jsonutils.loads(compiled, object_pairs_hook=OrderedDict)
+        if compiled.get('version') == COMPILED_VNFD_VERSION:
+            return compiled
+    vnfd_yaml = vnfd.get('attributes', {}).get('vnfd')
+    if vnfd_yaml is None:
+        return None
+    return _compile_template(yamlparser.simple_ordered_parse(vnfd_yaml) or {})
+
+
 def findvdus(template):
     vdus = []
     for nt in template.nodetemplates:
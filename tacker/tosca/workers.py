@@ -0,0 +1,176 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Worker processes parsing and translating TOSCA templates.
+
+tosca-parser and heat-translator are pure python, the eventlet hub of a
+tacker-server process is blocked while they handle a large template.
+With [tacker] tosca_workers set, the FUNCTIONS run in a bounded pool of
+worker processes instead. A worker reads a request and writes back its
+response as one line of JSON each.
+"""
+
+import collections
+import os
+import sys
+
+import eventlet
+from eventlet.green import subprocess
+from eventlet import semaphore
+from oslo_config import cfg
+from oslo_log import log as logging
+from oslo_serialization import jsonutils
+from oslo_utils import importutils
+import six
+
+from tacker.common import exceptions
+from tacker.common import utils
+from tacker.extensions import vnfm
+
+LOG = logging.getLogger(__name__)
+CONF = cfg.CONF
+
+OPTS = [
+    cfg.IntOpt('tosca_workers',
+               default=0,
+               help=_("Number of worker processes validating and "
+                      "translating TOSCA templates, 0 runs them in the "
+                      "tacker-server process")),
+    cfg.IntOpt('tosca_worker_timeout',
+               default=300,
+               help=_("Seconds a TOSCA worker process has to answer "
+                      "before it is killed")),
+]
+CONF.register_opts(OPTS, 'tacker')
+
+
+def config_opts():
+    return [('tacker', OPTS)]
+
+
+# name => function run by the workers, its arguments and result must be
+# JSON serializable
+FUNCTIONS = {
+    'validate_vnfd': 'tacker.tosca.utils.validate_vnfd',
+    'translate_tosca': ('tacker.vnfm.infra_drivers.openstack.'
+                        'translate_template.translate_tosca'),
+}
+
+_pool = None
+
+
+def call(function, *args):
+    """Run one of FUNCTIONS, in a worker process when they are enabled."""
+    global _pool
+    if CONF.tacker.tosca_workers <= 0:
+        return importutils.import_class(FUNCTIONS[function])(*args)
+    if _pool is None:
+        _pool = WorkerPool(CONF.tacker.tosca_workers,
+                           CONF.tacker.tosca_worker_timeout)
+    return _pool.call(function, list(args))
+
+
+def _make_error(name, message):
+    cls = getattr(vnfm, name, None)
+    if not (isinstance(cls, type) and
+            issubclass(cls, exceptions.TackerException)):
+        return vnfm.ToscaParserFailed(error_msg_details=message)
+    # the message was already formatted by the worker
+    error = cls.__new__(cls)
+    Exception.__init__(error, message)
+    error.msg = message
+    return error
+
+
+class _Worker(object):
+
+    def __init__(self):
+        self.process = utils.subprocess_popen(
+            [sys.executable, '-m', __name__],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def call(self, request):
+        self.process.stdin.write(request + b'\n')
+        self.process.stdin.flush()
+        return self.process.stdout.readline()
+
+    def kill(self):
+        try:
+            self.process.kill()
+        except OSError:
+            pass
+        self.process.wait()
+
+
+class WorkerPool(object):
+    """At most `size` worker processes, started on demand."""
+
+    def __init__(self, size, timeout):
+        self.timeout = timeout
+        self._slots = semaphore.Semaphore(size)
+        self._idle = []
+
+    def call(self, function, args):
+        """Run FUNCTIONS[function](*args) in a worker process.
+
+        The exceptions of tacker.extensions.vnfm raised by the function
+        are raised again, any other failure as ToscaParserFailed.
+        """
+        request = jsonutils.dump_as_bytes({'function': function,
+                                           'args': args})
+        with self._slots:
+            worker = self._idle.pop() if self._idle else _Worker()
+            response = None
+            try:
+                with eventlet.Timeout(self.timeout, False):
+                    response = worker.call(request)
+            finally:
+                if response:
+                    self._idle.append(worker)
+                else:
+                    worker.kill()
+        if not response:
+            LOG.error(_('TOSCA worker gave no answer to %s'), function)
+            raise vnfm.ToscaParserFailed(
+                error_msg_details=_('no answer from the TOSCA worker'))
+        response = jsonutils.loads(
+            response, object_pairs_hook=collections.OrderedDict)
+        if 'error' in response:
+            raise _make_error(**response['error'])
+        return response['result']
+
+
+def _run(request):
+    try:
+        function = importutils.import_class(FUNCTIONS[request['function']])
+        return {'result': function(*request['args'])}
+    except Exception as e:
+        return {'error': {'name': type(e).__name__,
+                          'message': six.text_type(e)}}
+
+
+def main():
+    # stdout is kept for the responses, whatever the parsers print goes
+    # to stderr
+    responses = os.fdopen(os.dup(sys.stdout.fileno()), 'wb')
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    requests = getattr(sys.stdin, 'buffer', sys.stdin)
+    for line in iter(requests.readline, b''):
+        request = jsonutils.loads(
+            line, object_pairs_hook=collections.OrderedDict)
+        responses.write(jsonutils.dump_as_bytes(_run(request)) + b'\n')
+        responses.flush()
+
+
+if __name__ == '__main__':
+    main()
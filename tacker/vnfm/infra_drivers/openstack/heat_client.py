@@ -11,20 +11,36 @@
 # under the License.
 
 import sys
+import time
 
 from heatclient import exc as heatException
+from oslo_config import cfg
 from oslo_log import log as logging
 
 from tacker.common import clients
 from tacker.extensions import vnfm
 
 LOG = logging.getLogger(__name__)
+CONF = cfg.CONF
+
+OPTS = [
+    cfg.IntOpt('resource_types_cache_ttl',
+               default=3600,
+               help=_("Seconds the resource type attributes probed on the "
+                      "Heat of a VIM are cached, 0 disables the cache")),
+]
+CONF.register_opts(OPTS, group='openstack_vim')
 
 
 class HeatClient(object):
-    def __init__(self, auth_attr, region_name=None):
+    # (vim, region_name) => {resource type: (expires at, attribute names)}
+    _resource_types = {}
+
+    def __init__(self, auth_attr, region_name=None, vim_id=None):
         # context, password are unused
-        self.heat = clients.OpenstackClients(auth_attr, region_name).heat
+        self.heat = clients.OpenstackClients(auth_attr, region_name,
+                                             vim_id=vim_id).heat
+        self._cache_key = (vim_id or auth_attr.get('auth_url'), region_name)
         self.stacks = self.heat.stacks
         self.resource_types = self.heat.resource_types
         self.resources = self.heat.resources
@@ -54,12 +70,31 @@ class HeatClient(object):
         return self.stacks.get(stack_id)
 
     def resource_attr_support(self, resource_name, property_name):
-        resource = self.resource_types.get(resource_name)
-        return property_name in resource['attributes']
-
-    def resource_get_list(self, stack_id, nested_depth=0):
+        return property_name in self._resource_attributes(resource_name)
+
+    def _resource_attributes(self, resource_name):
+        # the attributes only change when the Heat of the VIM is upgraded
+        types = self._resource_types.setdefault(self._cache_key, {})
+        now = time.time()
+        cached = types.get(resource_name)
+        if cached is None or cached[0] <= now:
+            resource = self.resource_types.get(resource_name)
+            cached = (now + CONF.openstack_vim.resource_types_cache_ttl,
+                      frozenset(resource['attributes']))
+            types[resource_name] = cached
+        return cached[1]
+
+    @classmethod
+    def invalidate_resource_types(cls, vim_id):
+        """Forget the resource types probed on the regions of a VIM."""
+        for key in list(cls._resource_types):
+            if key[0] == vim_id:
+                cls._resource_types.pop(key, None)
+
+    def resource_get_list(self, stack_id, nested_depth=0, with_detail=False):
         return self.heat.resources.list(stack_id,
-                                        nested_depth=nested_depth)
+                                        nested_depth=nested_depth,
+                                        with_detail=with_detail)
 
     def resource_signal(self, stack_id, rsc_name):
         return self.heat.resources.signal(stack_id, rsc_name)
@@ -16,17 +16,19 @@
 
 import time
 
-from heatclient import exc as heatException
+import eventlet
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
 import yaml
 
+from tacker.common import cache
 from tacker.common import log
 from tacker.common import utils
 from tacker.extensions import vnfm
 from tacker.vnfm.infra_drivers import abstract_driver
 from tacker.vnfm.infra_drivers.openstack import heat_client as hc
+from tacker.vnfm.infra_drivers.openstack import stack_poller
 from tacker.vnfm.infra_drivers.openstack import translate_template
 from tacker.vnfm.infra_drivers import scale_driver
 
@@ -43,13 +45,28 @@ OPTS = [
                default=10,
                help=_("Wait time (in seconds) between consecutive stack"
                       " create/delete retries")),
+    cfg.IntOpt('stack_poll_min_interval',
+               default=1,
+               help=_("Shortest wait time (in seconds) between two polls of "
+                      "the stacks being created or deleted on a VIM, the "
+                      "wait grows up to stack_retry_wait while none of "
+                      "them changes")),
+    cfg.IntOpt('mgmt_ip_fetch_pool_size',
+               default=10,
+               help=_("Number of members of a scaling group whose "
+                      "management IP addresses are fetched concurrently")),
+    cfg.IntOpt('scaling_group_cache_size',
+               default=1000,
+               help=_("Number of scaling groups whose members' "
+                      "management IP addresses are cached between scale "
+                      "events")),
 ]
 
 CONF.register_opts(OPTS, group='openstack_vim')
 
 
 def config_opts():
-    return [('openstack_vim', OPTS)]
+    return [('openstack_vim', OPTS + hc.OPTS)]
 
 
 # Global map of individual resource type and
@@ -67,6 +84,8 @@ heat_template_version: 2013-05-23
 """
 
 OUTPUT_PREFIX = 'mgmt_ip-'
+# attempts to get the details of a stack once it is created
+STACK_GET_RETRIES = 3
 ALARMING_POLICY = 'tosca.policies.tacker.Alarming'
 SCALING_POLICY = 'tosca.policies.tacker.Scaling'
 
@@ -79,10 +98,15 @@ class OpenStack(abstract_driver.DeviceAbstractDriver,
                 scale_driver.VnfScaleAbstractDriver):
     """Openstack infra driver for hosting vnfs"""
 
+    # scaling group stack id => {member stack id => mgmt ips}
+    _scaling_groups = None
+
     def __init__(self):
         super(OpenStack, self).__init__()
         self.STACK_RETRIES = cfg.CONF.openstack_vim.stack_retries
         self.STACK_RETRY_WAIT = cfg.CONF.openstack_vim.stack_retry_wait
+        self.STACK_POLL_MIN_INTERVAL = (
+            cfg.CONF.openstack_vim.stack_poll_min_interval)
 
     def get_type(self):
         return 'openstack'
@@ -98,7 +122,8 @@ class OpenStack(abstract_driver.DeviceAbstractDriver,
         LOG.debug(_('vnf %s'), vnf)
 
         region_name = vnf.get('placement_attr', {}).get('region_name', None)
-        heatclient = hc.HeatClient(auth_attr, region_name)
+        heatclient = hc.HeatClient(auth_attr, region_name,
+                                   vim_id=vnf.get('vim_id'))
 
         tth = translate_template.TOSCAToHOT(vnf, heatclient)
         tth.generate_hot()
@@ -126,30 +151,24 @@ class OpenStack(abstract_driver.DeviceAbstractDriver,
     def create_wait(self, plugin, context, vnf_dict, vnf_id, auth_attr):
         region_name = vnf_dict.get('placement_attr', {}).get(
             'region_name', None)
-        heatclient = hc.HeatClient(auth_attr, region_name)
+        heatclient = hc.HeatClient(auth_attr, region_name,
+                                   vim_id=vnf_dict.get('vim_id'))
 
         stack = heatclient.get(vnf_id)
         status = stack.stack_status
-        stack_retries = self.STACK_RETRIES
+        timed_out = False
         error_reason = None
-        while status == 'CREATE_IN_PROGRESS' and stack_retries > 0:
-            time.sleep(self.STACK_RETRY_WAIT)
-            try:
-                stack = heatclient.get(vnf_id)
-            except Exception:
-                LOG.warning(_("VNF Instance setup may not have "
-                              "happened because Heat API request failed "
-                              "while waiting for the stack %(stack)s to be "
-                              "created"), {'stack': vnf_id})
-                # continue to avoid temporary connection error to target
-                # VIM
-            status = stack.stack_status
-            LOG.debug(_('status: %s'), status)
-            stack_retries = stack_retries - 1
+        if status == 'CREATE_IN_PROGRESS':
+            polled_status = self._wait_stack(heatclient, vnf_id, status)
+            timed_out = polled_status is False
+            if not timed_out:
+                status = polled_status
+                # the stack summaries polled have no outputs
+                stack = self._get_stack(heatclient, vnf_id) or stack
 
         LOG.debug(_('stack status: %(stack)s %(status)s'),
                   {'stack': str(stack), 'status': status})
-        if stack_retries == 0 and status != 'CREATE_COMPLETE':
+        if timed_out and status != 'CREATE_COMPLETE':
             error_reason = _("Resource creation is not completed within"
                            " {wait} seconds as creation of stack {stack}"
                            " is not completed").format(
@@ -160,8 +179,12 @@ class OpenStack(abstract_driver.DeviceAbstractDriver,
                     {'reason': error_reason})
             raise vnfm.VNFCreateWaitFailed(reason=error_reason)
 
-        elif stack_retries != 0 and status != 'CREATE_COMPLETE':
-            error_reason = stack.stack_status_reason
+        elif status != 'CREATE_COMPLETE':
+            if stack.stack_status == status:
+                error_reason = stack.stack_status_reason
+            else:
+                error_reason = _("Stack {stack} is {status}").format(
+                    stack=vnf_id, status=status or 'gone')
             raise vnfm.VNFCreateWaitFailed(reason=error_reason)
 
         def _find_mgmt_ips(outputs):
@@ -181,6 +204,11 @@ class OpenStack(abstract_driver.DeviceAbstractDriver,
                                                        vnf_id,
                                                        group_names)
         else:
+            if stack.stack_status != status:
+                error_reason = _("Heat API request failed while reading "
+                                 "the outputs of stack {stack}").format(
+                                     stack=vnf_id)
+                raise vnfm.VNFCreateWaitFailed(reason=error_reason)
             mgmt_ips = _find_mgmt_ips(stack.outputs)
 
         if mgmt_ips:
@@ -191,7 +219,8 @@ class OpenStack(abstract_driver.DeviceAbstractDriver,
                auth_attr):
         region_name = vnf_dict.get('placement_attr', {}).get(
             'region_name', None)
-        heatclient = hc.HeatClient(auth_attr, region_name)
+        heatclient = hc.HeatClient(auth_attr, region_name,
+                                   vim_id=vnf_dict.get('vim_id'))
         heatclient.get(vnf_id)
 
         # update config attribute
@@ -220,42 +249,35 @@ class OpenStack(abstract_driver.DeviceAbstractDriver,
 
     @log.log
     def update_wait(self, plugin, context, vnf_id, auth_attr,
-                    region_name=None):
+                    region_name=None, vim_id=None):
         # do nothing but checking if the stack exists at the moment
-        heatclient = hc.HeatClient(auth_attr, region_name)
+        heatclient = hc.HeatClient(auth_attr, region_name, vim_id=vim_id)
         heatclient.get(vnf_id)
 
     @log.log
-    def delete(self, plugin, context, vnf_id, auth_attr, region_name=None):
-        heatclient = hc.HeatClient(auth_attr, region_name)
+    def delete(self, plugin, context, vnf_id, auth_attr, region_name=None,
+               vim_id=None):
+        heatclient = hc.HeatClient(auth_attr, region_name, vim_id=vim_id)
         heatclient.delete(vnf_id)
 
     @log.log
     def delete_wait(self, plugin, context, vnf_id, auth_attr,
-                    region_name=None):
-        heatclient = hc.HeatClient(auth_attr, region_name)
+                    region_name=None, vim_id=None):
+        heatclient = hc.HeatClient(auth_attr, region_name, vim_id=vim_id)
 
         stack = heatclient.get(vnf_id)
         status = stack.stack_status
         error_reason = None
-        stack_retries = self.STACK_RETRIES
-        while (status == 'DELETE_IN_PROGRESS' and stack_retries > 0):
-            time.sleep(self.STACK_RETRY_WAIT)
-            try:
-                stack = heatclient.get(vnf_id)
-            except heatException.HTTPNotFound:
+        timed_out = False
+        if status == 'DELETE_IN_PROGRESS':
+            polled_status = self._wait_stack(heatclient, vnf_id, status)
+            if polled_status is None:
                 return
-            except Exception:
-                LOG.warning(_("VNF Instance cleanup may not have "
-                              "happened because Heat API request failed "
-                              "while waiting for the stack %(stack)s to be "
-                              "deleted"), {'stack': vnf_id})
-                # Just like create wait, ignore the exception to
-                # avoid temporary connection error.
-            status = stack.stack_status
-            stack_retries = stack_retries - 1
-
-        if stack_retries == 0 and status != 'DELETE_COMPLETE':
+            timed_out = polled_status is False
+            if not timed_out:
+                status = polled_status
+
+        if timed_out and status != 'DELETE_COMPLETE':
             error_reason = _("Resource cleanup for vnf is"
                              " not completed within {wait} seconds as "
                              "deletion of Stack {stack} is "
@@ -264,13 +286,49 @@ class OpenStack(abstract_driver.DeviceAbstractDriver,
             LOG.warning(error_reason)
             raise vnfm.VNFDeleteWaitFailed(reason=error_reason)
 
-        if stack_retries != 0 and status != 'DELETE_COMPLETE':
+        if not timed_out and status != 'DELETE_COMPLETE':
             error_reason = _("vnf {vnf_id} deletion is not completed. "
                             "{stack_status}").format(vnf_id=vnf_id,
                             stack_status=status)
             LOG.warning(error_reason)
             raise vnfm.VNFDeleteWaitFailed(reason=error_reason)
 
+    def _wait_stack(self, heatclient, stack_id, status):
+        """Wait for a stack to leave `status`.
+
+        Returns the status the stack was polled in, None when it is gone
+        and False when it did not leave `status` in time.
+        """
+        poller = stack_poller.StackPoller.get_poller(
+            heatclient, self.STACK_POLL_MIN_INTERVAL, self.STACK_RETRY_WAIT)
+        stack = poller.wait(stack_id, status,
+                            self.STACK_RETRIES * self.STACK_RETRY_WAIT)
+        if not stack:
+            return stack
+        return stack.stack_status
+
+    def _get_stack(self, heatclient, stack_id):
+        """Get the details of a stack, None if Heat API keeps failing."""
+        for attempt in range(STACK_GET_RETRIES):
+            if attempt:
+                time.sleep(self.STACK_RETRY_WAIT)
+            try:
+                return heatclient.get(stack_id)
+            except Exception:
+                LOG.warning(_("Heat API request failed while getting the "
+                              "stack %(stack)s, attempt %(attempt)d of "
+                              "%(retries)d"),
+                            {'stack': stack_id, 'attempt': attempt + 1,
+                             'retries': STACK_GET_RETRIES})
+        return None
+
+    @classmethod
+    def _get_scaling_groups(cls):
+        if cls._scaling_groups is None:
+            cls._scaling_groups = cache.LRUCache(
+                cfg.CONF.openstack_vim.scaling_group_cache_size)
+        return cls._scaling_groups
+
     @classmethod
     def _find_mgmt_ips_from_groups(cls, heat_client, instance_id, group_names):
 
@@ -282,17 +340,52 @@ class OpenStack(abstract_driver.DeviceAbstractDriver,
 
             return mgmt_ips
 
+        def _get_members(group_id, cached):
+            # Get list of resources in scale group, with their attributes
+            # in the same request when none of them is known yet
+            members = list(heat_client.resource_get_list(
+                group_id, with_detail=not cached))
+            attributes = {}
+            for rsc in members:
+                if rsc.physical_resource_id in cached:
+                    attributes[rsc.physical_resource_id] = cached[
+                        rsc.physical_resource_id]
+                elif getattr(rsc, 'attributes', None) is not None:
+                    attributes[rsc.physical_resource_id] = _find_mgmt_ips(
+                        rsc.attributes)
+
+            def _get_attributes(rsc):
+                scale_rsc = heat_client.resource_get(group_id,
+                                                     rsc.resource_name)
+                return rsc, _find_mgmt_ips(scale_rsc.attributes)
+
+            missing = [rsc for rsc in members
+                       if rsc.physical_resource_id not in attributes]
+            pool = eventlet.GreenPool(
+                cfg.CONF.openstack_vim.mgmt_ip_fetch_pool_size)
+            for rsc, mgmt_ips in pool.imap(_get_attributes, missing):
+                attributes[rsc.physical_resource_id] = mgmt_ips
+            return members, attributes
+
         mgmt_ips = {}
+        scaling_groups = cls._get_scaling_groups()
         for group_name in group_names:
             # Get scale group
             grp = heat_client.resource_get(instance_id, group_name)
-            for rsc in heat_client.resource_get_list(grp.physical_resource_id):
-                # Get list of resources in scale group
-                scale_rsc = heat_client.resource_get(grp.physical_resource_id,
-                                                     rsc.resource_name)
-
-                # findout the mgmt ips from attributes
-                for k, v in _find_mgmt_ips(scale_rsc.attributes).items():
+            group_id = grp.physical_resource_id
+            members, attributes = _get_members(
+                group_id, scaling_groups.get(group_id, {}))
+            # the attributes of a member are final once it is created,
+            # members removed by a scale in are dropped
+            scaling_groups.put(group_id, dict(
+                (rsc.physical_resource_id,
+                 attributes[rsc.physical_resource_id])
+                for rsc in members
+                if rsc.resource_status.endswith('_COMPLETE')))
+
+            # findout the mgmt ips from attributes
+            for rsc in members:
+                for k, v in attributes[rsc.physical_resource_id].items():
                     if k not in mgmt_ips:
                         mgmt_ips[k] = [v]
                     else:
@@ -302,7 +395,8 @@ class OpenStack(abstract_driver.DeviceAbstractDriver,
 
     @log.log
     def scale(self, context, plugin, auth_attr, policy, region_name):
-        heatclient = hc.HeatClient(auth_attr, region_name)
+        heatclient = hc.HeatClient(auth_attr, region_name,
+                                   vim_id=policy['vnf'].get('vim_id'))
         policy_rsc = get_scaling_policy_name(policy_name=policy['id'],
                                              action=policy['action'])
         events = heatclient.resource_event_list(policy['instance_id'],
@@ -316,7 +410,8 @@ class OpenStack(abstract_driver.DeviceAbstractDriver,
     @log.log
     def scale_wait(self, context, plugin, auth_attr, policy, region_name,
                    last_event_id):
-        heatclient = hc.HeatClient(auth_attr, region_name)
+        heatclient = hc.HeatClient(auth_attr, region_name,
+                                   vim_id=policy['vnf'].get('vim_id'))
 
         # TODO(kanagaraj-manickam) make wait logic into separate utility method
         # and make use of it here and other actions like create and delete
@@ -381,7 +476,8 @@ class OpenStack(abstract_driver.DeviceAbstractDriver,
     def get_resource_info(self, plugin, context, vnf_info, auth_attr,
                           region_name=None):
         instance_id = vnf_info['instance_id']
-        heatclient = hc.HeatClient(auth_attr, region_name)
+        heatclient = hc.HeatClient(auth_attr, region_name,
+                                   vim_id=vnf_info.get('vim_id'))
         try:
             # nested_depth=2 is used to get VDU resources
             # in case of nested template
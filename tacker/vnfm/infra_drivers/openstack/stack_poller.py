@@ -0,0 +1,120 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import eventlet
+from eventlet import event
+from oslo_log import log as logging
+
+LOG = logging.getLogger(__name__)
+
+# ids of stacks listed by a single request
+LIST_BATCH_SIZE = 100
+
+
+class StackPoller(object):
+    """Poll the status of the stacks waited for on one Heat.
+
+    A single green thread lists the stacks of every waiter at each tick.
+    The interval between ticks starts at `min_interval`, doubles up to
+    `max_interval` while no stack changes and starts over when a stack
+    is waited for or finishes its action.
+    """
+
+    # (vim, region_name) => poller
+    _pollers = {}
+
+    def __init__(self, heatclient, min_interval, max_interval):
+        self.heatclient = heatclient
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._interval = min_interval
+        # stack id => [(status waited out, event)]
+        self._waiters = {}
+        self._thread = None
+
+    @classmethod
+    def get_poller(cls, heatclient, min_interval, max_interval):
+        key = heatclient._cache_key
+        poller = cls._pollers.get(key)
+        if poller is None:
+            poller = cls._pollers[key] = cls(heatclient, min_interval,
+                                             max_interval)
+        else:
+            # the credentials of the VIM may have been updated
+            poller.heatclient = heatclient
+        return poller
+
+    def wait(self, stack_id, status, timeout):
+        """Wait up to `timeout` seconds for a stack to leave `status`.
+
+        Returns the summary of the stack, None when it is gone and
+        False when it is still in `status` after `timeout` seconds.
+        """
+        waiter = (status, event.Event())
+        self._waiters.setdefault(stack_id, []).append(waiter)
+        self._interval = self.min_interval
+        if self._thread is None:
+            self._thread = eventlet.spawn(self._run)
+        result = False
+        with eventlet.Timeout(timeout, False):
+            result = waiter[1].wait()
+        if result is False:
+            self._remove(stack_id, waiter)
+        return result
+
+    def _remove(self, stack_id, waiter):
+        waiters = self._waiters.get(stack_id, [])
+        if waiter in waiters:
+            waiters.remove(waiter)
+        if not waiters:
+            self._waiters.pop(stack_id, None)
+
+    def _list(self, stack_ids):
+        stacks = {}
+        for i in range(0, len(stack_ids), LIST_BATCH_SIZE):
+            for stack in self.heatclient.stacks.list(
+                    filters={'id': stack_ids[i:i + LIST_BATCH_SIZE]},
+                    show_deleted=True):
+                stacks[stack.id] = stack
+        return stacks
+
+    def _poll(self):
+        stack_ids = list(self._waiters)
+        stacks = self._list(stack_ids)
+        changed = False
+        for stack_id in stack_ids:
+            stack = stacks.get(stack_id)
+            for waiter in list(self._waiters.get(stack_id, [])):
+                status, done = waiter
+                if stack is None or stack.stack_status != status:
+                    self._remove(stack_id, waiter)
+                    done.send(stack)
+                    changed = True
+        return changed
+
+    def _run(self):
+        while self._waiters:
+            eventlet.sleep(self._interval)
+            try:
+                changed = self._poll()
+            except Exception:
+                # continue to avoid temporary connection error to target
+                # VIM
+                LOG.warning(_("Heat API request failed while polling the "
+                              "stacks %s"), list(self._waiters))
+                changed = False
+            if changed:
+                self._interval = self.min_interval
+            else:
+                self._interval = min(self._interval * 2, self.max_interval)
+        self._thread = None
@@ -11,6 +11,7 @@
 # under the License.
 
 import copy
+import hashlib
 
 from oslo_config import cfg
 from oslo_log import log as logging
@@ -21,10 +22,15 @@ from toscaparser.utils import yamlparser
 from translator.hot import tosca_translator
 import yaml
 
+from tacker.common import cache
 from tacker.common import log
+from tacker import context as t_context
+from tacker.db.vnfm import hot_translations_db
 from tacker.extensions import common_services as cs
 from tacker.extensions import vnfm
 from tacker.tosca import utils as toscautils
+from tacker.tosca import workers
+from tacker import version
 
 from collections import OrderedDict
 
@@ -35,6 +41,19 @@ OPTS = [
     cfg.DictOpt('flavor_extra_specs',
                default={},
                help=_("Flavor Extra Specs")),
+    cfg.IntOpt('translation_cache_size',
+               default=128,
+               help=_("Number of HOT templates translated from VNFDs kept "
+                      "in memory, 0 disables the cache")),
+    cfg.BoolOpt('translation_cache_db',
+                default=False,
+                help=_("Share the HOT templates translated from VNFDs "
+                       "between the tacker servers through the database")),
+    cfg.IntOpt('translation_cache_db_size',
+               default=1000,
+               help=_("Number of HOT templates translated from VNFDs kept "
+                      "in the database, the oldest ones are deleted "
+                      "beyond it, 0 keeps them all")),
 ]
 
 CONF.register_opts(OPTS, group='openstack_vim')
@@ -54,14 +73,57 @@ def get_scaling_policy_name(action, policy_name):
     return '%s_scale_%s' % (policy_name, action)
 
 
+def translate_tosca(vnfd_dict, parsed_params, flavor_extra_specs,
+                    unsupported_props):
+    """Translate a VNFD to a HOT template.
+
+    Returns the HOT template with the monitoring policy and metadata of
+    the VDUs.
+    """
+    toscautils.updateimports(vnfd_dict)
+    if 'substitution_mappings' in str(vnfd_dict):
+        toscautils.check_for_substitution_mappings(vnfd_dict, parsed_params)
+
+    try:
+        with toscautils.type_definitions():
+            tosca = tosca_template.ToscaTemplate(
+                parsed_params=parsed_params, a_file=False,
+                yaml_dict_tpl=vnfd_dict)
+
+    except Exception as e:
+        LOG.debug("tosca-parser error: %s", str(e))
+        raise vnfm.ToscaParserFailed(error_msg_details=str(e))
+
+    metadata = toscautils.get_vdu_metadata(tosca)
+    monitoring_dict = toscautils.get_vdu_monitoring(tosca)
+    mgmt_ports = toscautils.get_mgmt_ports(tosca)
+    res_tpl = toscautils.get_resources_dict(tosca, flavor_extra_specs)
+    toscautils.post_process_template(tosca)
+    try:
+        translator = tosca_translator.TOSCATranslator(tosca, parsed_params)
+        heat_template_yaml = translator.translate()
+    except Exception as e:
+        LOG.debug("heat-translator error: %s", str(e))
+        raise vnfm.HeatTranslatorFailed(error_msg_details=str(e))
+    heat_template_yaml = toscautils.post_process_heat_template(
+        heat_template_yaml, mgmt_ports, metadata,
+        res_tpl, unsupported_props)
+
+    return heat_template_yaml, monitoring_dict, metadata
+
+
 class TOSCAToHOT(object):
     """Convert TOSCA template to HOT template."""
 
+    # translation id => (heat template, monitoring policy, vdu metadata)
+    _translations = None
+
     def __init__(self, vnf, heatclient):
         self.vnf = vnf
         self.heatclient = heatclient
         self.attributes = {}
         self.vnfd_yaml = None
+        self.compiled_vnfd = None
         self.unsupported_props = {}
         self.heat_template_yaml = None
         self.monitoring_dict = None
@@ -74,7 +136,8 @@ class TOSCAToHOT(object):
         self._get_vnfd()
         dev_attrs = self._update_fields()
 
-        vnfd_dict = yamlparser.simple_ordered_parse(self.vnfd_yaml)
+        # the compiled vnfd is shared, the translation updates the template
+        vnfd_dict = copy.deepcopy(self.compiled_vnfd['template'])
         LOG.debug('vnfd_dict %s', vnfd_dict)
         self._get_unsupported_resource_props(self.heatclient)
 
@@ -92,6 +155,7 @@ class TOSCAToHOT(object):
     @log.log
     def _get_vnfd(self):
         self.attributes = self.vnf['vnfd']['attributes'].copy()
+        self.compiled_vnfd = toscautils.load_compiled_vnfd(self.vnf['vnfd'])
         self.vnfd_yaml = self.attributes.pop('vnfd', None)
         if self.vnfd_yaml is None:
             # TODO(kangaraj-manickam) raise user level exception
@@ -281,8 +345,58 @@ class TOSCAToHOT(object):
                 unsupported_resource_props[res] = unsupported_props
         self.unsupported_props = unsupported_resource_props
 
+    def _get_translation_id(self, dev_attrs):
+        # identical inputs translate to the same HOT template, the tacker
+        # version covers the translation code and type definitions
+        inputs = [version.version_info.release_string(), self.vnfd_yaml,
+                  dev_attrs.get('param_values'), self.STACK_FLAVOR_EXTRA,
+                  self.unsupported_props]
+        return hashlib.sha256(jsonutils.dumps(
+            inputs, sort_keys=True).encode('utf-8')).hexdigest()
+
+    @classmethod
+    def _get_translations(cls):
+        if cls._translations is None:
+            cls._translations = cache.LRUCache(
+                cfg.CONF.openstack_vim.translation_cache_size)
+        return cls._translations
+
+    def _get_translation(self, translation_id):
+        translation = self._get_translations().get(translation_id)
+        if translation is None and cfg.CONF.openstack_vim.translation_cache_db:
+            translation = hot_translations_db.HotTranslationsDb(
+            ).get_translation(t_context.get_admin_context(), translation_id)
+            if translation is not None:
+                self._get_translations().put(translation_id, translation)
+        return translation
+
+    def _add_translation(self, translation_id, translation):
+        self._get_translations().put(translation_id, translation)
+        if cfg.CONF.openstack_vim.translation_cache_db:
+            hot_translations_db.HotTranslationsDb().add_translation(
+                t_context.get_admin_context(), translation_id, *translation,
+                vnfd_id=self.vnf.get('vnfd_id'),
+                max_rows=cfg.CONF.openstack_vim.translation_cache_db_size)
+
     @log.log
     def _generate_hot_from_tosca(self, vnfd_dict, dev_attrs):
+        translation_id = self._get_translation_id(dev_attrs)
+        translation = self._get_translation(translation_id)
+        if translation is not None:
+            LOG.debug('HOT template %s translated before', translation_id)
+            heat_template_yaml, monitoring_json, metadata_json = translation
+            self.heat_template_yaml = heat_template_yaml
+            self.monitoring_dict = jsonutils.loads(
+                monitoring_json, object_pairs_hook=OrderedDict)
+            self.metadata = jsonutils.loads(metadata_json)
+            return
+
+        self._translate_tosca(vnfd_dict, dev_attrs)
+        self._add_translation(translation_id, (
+            self.heat_template_yaml, jsonutils.dumps(self.monitoring_dict),
+            jsonutils.dumps(self.metadata)))
+
+    def _translate_tosca(self, vnfd_dict, dev_attrs):
         parsed_params = {}
         if 'param_values' in dev_attrs and dev_attrs['param_values'] != "":
             try:
@@ -291,40 +405,10 @@ class TOSCAToHOT(object):
                 LOG.debug("Params not Well Formed: %s", str(e))
                 raise vnfm.ParamYAMLNotWellFormed(error_msg_details=str(e))
 
-        toscautils.updateimports(vnfd_dict)
-        if 'substitution_mappings' in str(vnfd_dict):
-            toscautils.check_for_substitution_mappings(vnfd_dict,
-                parsed_params)
-
-        try:
-            tosca = tosca_template.ToscaTemplate(parsed_params=parsed_params,
-                                                 a_file=False,
-                                                 yaml_dict_tpl=vnfd_dict)
-
-        except Exception as e:
-            LOG.debug("tosca-parser error: %s", str(e))
-            raise vnfm.ToscaParserFailed(error_msg_details=str(e))
-
-        metadata = toscautils.get_vdu_metadata(tosca)
-        monitoring_dict = toscautils.get_vdu_monitoring(tosca)
-        mgmt_ports = toscautils.get_mgmt_ports(tosca)
-        res_tpl = toscautils.get_resources_dict(tosca,
-                                                self.STACK_FLAVOR_EXTRA)
-        toscautils.post_process_template(tosca)
-        try:
-            translator = tosca_translator.TOSCATranslator(tosca,
-                                                          parsed_params)
-            heat_template_yaml = translator.translate()
-        except Exception as e:
-            LOG.debug("heat-translator error: %s", str(e))
-            raise vnfm.HeatTranslatorFailed(error_msg_details=str(e))
-        heat_template_yaml = toscautils.post_process_heat_template(
-            heat_template_yaml, mgmt_ports, metadata,
-            res_tpl, self.unsupported_props)
-
-        self.heat_template_yaml = heat_template_yaml
-        self.monitoring_dict = monitoring_dict
-        self.metadata = metadata
+        (self.heat_template_yaml, self.monitoring_dict,
+         self.metadata) = workers.call(
+            'translate_tosca', vnfd_dict, parsed_params,
+            self.STACK_FLAVOR_EXTRA, self.unsupported_props)
 
     @log.log
     def _generate_hot_scaling(self, vnfd_dict,
@@ -15,10 +15,18 @@
 #    under the License.
 
 import abc
+import collections
+import functools
+import heapq
 import inspect
+import itertools
+import os
 import threading
 import time
+import uuid
 
+import eventlet
+from eventlet import semaphore
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
@@ -26,8 +34,10 @@ from oslo_utils import timeutils
 import six
 
 from tacker.common import driver_manager
+from tacker.common import hashring
 from tacker import context as t_context
 from tacker.db.common_services import common_services_db
+from tacker.db.common_services import monitor_members_db
 from tacker.plugins.common import constants
 from tacker.vnfm.infra_drivers.openstack import heat_client as hc
 from tacker.vnfm import vim_client
@@ -38,8 +48,71 @@ OPTS = [
     cfg.IntOpt('check_intvl',
                default=10,
                help=_("check interval for monitor")),
+    cfg.IntOpt('max_concurrency',
+               default=64,
+               help=_("maximum number of VNFs probed concurrently "
+                      "by the monitor")),
+    cfg.IntOpt('probe_timeout',
+               default=60,
+               help=_("seconds after which a single monitor probe is "
+                      "abandoned and reported as a failure, 0 disables "
+                      "the deadline")),
+    cfg.BoolOpt('rehydrate_on_start',
+                default=True,
+                help=_("resume monitoring of the ACTIVE VNFs with a "
+                       "monitoring policy when tacker-server starts")),
+    cfg.IntOpt('rehydrate_batch_size',
+               default=1000,
+               help=_("number of VNFs loaded per database query when "
+                      "monitoring is resumed at startup")),
+    cfg.IntOpt('failure_threshold',
+               default=1,
+               help=_("number of probes out of the latest failure_window "
+                      "probes of a VDU which must report an event before "
+                      "its action fires, can be overridden per monitoring "
+                      "policy")),
+    cfg.IntOpt('failure_window',
+               default=1,
+               help=_("number of latest probes of a VDU considered by "
+                      "failure_threshold, can be overridden per monitoring "
+                      "policy")),
+    cfg.IntOpt('action_hold_down',
+               default=0,
+               help=_("seconds during which no further action fires for a "
+                      "VDU after an action fired for it, doubled for every "
+                      "action fired before the VDU was healthy for a whole "
+                      "hold-down, 0 disables the hold-down")),
+    cfg.IntOpt('max_action_hold_down',
+               default=3600,
+               help=_("upper bound in seconds of the action hold-down")),
+    cfg.IntOpt('action_concurrency',
+               default=16,
+               help=_("maximum number of VNFs on which monitor actions, "
+                      "e.g. respawn, run concurrently")),
+    cfg.BoolOpt('sharding',
+                default=False,
+                help=_("share the monitoring of the VNFs and VIMs among "
+                       "all tacker-server processes using the same "
+                       "database instead of every process monitoring the "
+                       "resources it created")),
+    cfg.IntOpt('heartbeat_interval',
+               default=10,
+               help=_("seconds between two heartbeats of a monitor "
+                      "process when sharding is enabled")),
+    cfg.IntOpt('member_timeout',
+               default=30,
+               help=_("seconds without heartbeat after which a monitor "
+                      "process is considered gone and its VNFs and VIMs "
+                      "are taken over by the others")),
+    cfg.IntOpt('resync_interval',
+               default=60,
+               help=_("seconds between two reloads of the monitored VNFs "
+                      "and VIMs from the database when sharding is "
+                      "enabled, they are reloaded at once whenever a "
+                      "monitor process joins or leaves")),
 ]
 CONF.register_opts(OPTS, group='monitor')
+CONF.import_opt('host', 'tacker.common.config')
 
 
 def config_opts():
@@ -58,11 +131,245 @@ def _log_monitor_events(context, vnf_dict, evt_details):
                              details=evt_details)
 
 
+class MonitorMembership(object):
+    """Membership of the processes sharing the monitoring.
+
+    Every process announces itself with a heartbeat row in the database
+    and owns the VNFs and VIMs whose ids map to it on a consistent hash
+    ring of the live members. Listeners are notified when the members
+    change, and every `resync_interval` seconds, so that they can pick
+    up and drop resources accordingly.
+    """
+
+    _instance = None
+
+    @classmethod
+    def get_instance(cls):
+        if not cls._instance:
+            cls._instance = cls()
+            cls._instance.start()
+        return cls._instance
+
+    def __init__(self, member_id=None):
+        self.host = cfg.CONF.host
+        self.member_id = member_id or '%s:%d:%s' % (
+            self.host, os.getpid(), uuid.uuid4().hex[:8])
+        self._db = monitor_members_db.MonitorMembersDb()
+        self._ring = hashring.HashRing([self.member_id])
+        self._listeners = []
+        self._last_notify = 0
+
+    def start(self):
+        try:
+            self.heartbeat()
+        except Exception:
+            LOG.exception(_('monitor member %s failed to join'),
+                          self.member_id)
+        LOG.debug('Spawning monitor membership thread')
+        threading.Thread(target=self.__run__).start()
+
+    def __run__(self):
+        while(1):
+            time.sleep(cfg.CONF.monitor.heartbeat_interval)
+            try:
+                changed = self.heartbeat()
+            except Exception:
+                LOG.exception(_('monitor member %s failed to send its '
+                                'heartbeat'), self.member_id)
+                continue
+            if (changed or time.time() - self._last_notify >=
+                    cfg.CONF.monitor.resync_interval):
+                self._notify()
+
+    def heartbeat(self):
+        """Refresh our heartbeat and the ring of live members.
+
+        :returns: True if the members changed
+        """
+        context = t_context.get_admin_context()
+        timeout = cfg.CONF.monitor.member_timeout
+        self._db.heartbeat(context, self.member_id, self.host)
+        self._db.purge_members(context, timeout * 10)
+        members = set(self._db.get_live_members(context, timeout))
+        members.add(self.member_id)
+        if members == self._ring.members:
+            return False
+        LOG.info(_('monitor members changed from %(old)s to %(new)s'),
+                 {'old': sorted(self._ring.members),
+                  'new': sorted(members)})
+        self._ring = hashring.HashRing(members)
+        return True
+
+    def owns(self, resource_id):
+        return self._ring.get_member(resource_id) == self.member_id
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def _notify(self):
+        self._last_notify = time.time()
+        for callback in list(self._listeners):
+            try:
+                callback()
+            except Exception:
+                LOG.exception(_('monitor membership listener %s failed'),
+                              callback)
+
+
+class ActionExecutor(object):
+    """Run the actions fired by the monitor off the probing path.
+
+    The actions of a VNF are queued and run one after the other, the
+    actions of up to `concurrency` VNFs run in parallel. An action which
+    is already queued or running for a VNF is not queued a second time,
+    so a VNF failing every probe until it is respawned is respawned once.
+    """
+
+    def __init__(self, concurrency):
+        self._semaphore = semaphore.Semaphore(concurrency)
+        self._lock = threading.Lock()
+        self._queues = {}   # vnf_id => deque of (action, callback)
+        self._workers = {}   # vnf_id => green thread draining the queue
+        self._queued = 0
+
+    def submit(self, vnf_id, action, callback):
+        """Queue `callback(action)` for a VNF.
+
+        :returns: False if the action is already pending for the VNF
+        """
+        with self._lock:
+            queue = self._queues.setdefault(vnf_id, collections.deque())
+            if any(pending == action for pending, _cb in queue):
+                LOG.debug('action %(action)s already pending for vnf '
+                          '%(vnf_id)s', {'action': action, 'vnf_id': vnf_id})
+                return False
+            queue.append((action, callback))
+            self._queued += 1
+            if vnf_id not in self._workers:
+                self._workers[vnf_id] = eventlet.spawn(self._drain, vnf_id)
+        return True
+
+    def pending(self, vnf_id):
+        with self._lock:
+            return [action for action, _cb in self._queues.get(vnf_id, ())]
+
+    def queued(self):
+        """Return the number of actions queued or running."""
+        return self._queued
+
+    def _drain(self, vnf_id):
+        while True:
+            with self._lock:
+                queue = self._queues[vnf_id]
+                if not queue:
+                    del self._queues[vnf_id]
+                    del self._workers[vnf_id]
+                    return
+                # the running action stays queued to de-duplicate it
+                action, callback = queue[0]
+            try:
+                with self._semaphore:
+                    callback(action)
+            except Exception:
+                LOG.exception(_('monitor action %(action)s failed for vnf '
+                                '%(vnf_id)s'),
+                              {'action': action, 'vnf_id': vnf_id})
+            finally:
+                with self._lock:
+                    queue.popleft()
+                    self._queued -= 1
+
+    def wait(self):
+        """Wait until all the queued actions have run."""
+        while True:
+            with self._lock:
+                workers = list(self._workers.values())
+            if not workers:
+                return
+            for worker in workers:
+                worker.wait()
+
+
+class HostingVNF(object):
+    """Monitor record of a VNF.
+
+    Only what probing needs is kept for every monitored VNF: a summary of
+    the VNF, its management addresses and its probes. The full VNF, with
+    its VNFD and templates, is read from the database when an action
+    fires.
+    """
+
+    __slots__ = ('id', 'vnf', 'management_ip_addresses', 'monitoring_policy',
+                 'action_cb', 'infra_driver', 'boot_at', 'probes', 'dead')
+
+    SUMMARY_KEYS = ('id', 'tenant_id', 'name', 'vim_id', 'status',
+                    'mgmt_url')
+
+    def __init__(self, vnf_dict, action_cb, infra_driver=None):
+        self.id = vnf_dict['id']
+        self.vnf = dict((key, vnf_dict.get(key)) for key in
+                        self.SUMMARY_KEYS)
+        self.management_ip_addresses = jsonutils.loads(vnf_dict['mgmt_url'])
+        # only kept until the probes are made
+        self.monitoring_policy = jsonutils.loads(
+            vnf_dict['attributes']['monitoring_policy'])
+        self.action_cb = action_cb
+        self.infra_driver = infra_driver
+        self.boot_at = None
+        self.probes = None
+        self.dead = False
+
+
+class Probe(object):
+    """One monitor driver probing one VDU of a hosting VNF.
+
+    The events reported by the latest `window` probes are kept in a ring
+    buffer, an action fires once its event was reported `threshold` times
+    within the window.
+    """
+
+    __slots__ = ('hosting_vnf', 'vdu', 'driver', 'params', 'actions',
+                 'delay', 'interval', 'rtt', 'threshold', 'outcomes',
+                 'cursor')
+
+    def __init__(self, hosting_vnf, vdu, driver, params, actions, delay,
+                 interval, threshold=1, window=1):
+        self.hosting_vnf = hosting_vnf
+        self.vdu = vdu
+        self.driver = driver
+        self.params = params
+        self.actions = actions
+        self.delay = delay
+        self.interval = interval
+        self.rtt = None
+        self.threshold = max(min(threshold, window), 1)
+        # no buffer is needed when every event fires
+        self.outcomes = [None] * window if window > 1 else None
+        self.cursor = 0
+
+    def record(self, event):
+        """Record the event of a probe and tell whether it must fire."""
+        if self.outcomes is None:
+            return event is not None
+        self.outcomes[self.cursor] = event
+        self.cursor = (self.cursor + 1) % len(self.outcomes)
+        return (event is not None and
+                self.outcomes.count(event) >= self.threshold)
+
+    def reset(self):
+        if self.outcomes is not None:
+            self.outcomes = [None] * len(self.outcomes)
+
+
 class VNFMonitor(object):
     """VNF Monitor."""
 
     _instance = None
-    _hosting_vnfs = dict()   # vnf_id => dict of parameters
+    _hosting_vnfs = dict()   # vnf_id => HostingVNF
+    _schedule = []   # heap of (due time, sequence, probe)
+    # vnf_id => {(vdu, driver) => (hold-down end, hold-down duration)}
+    _hold_downs = dict()
+    _sequence = itertools.count()
     _status_check_intvl = 0
     _lock = threading.RLock()
 
@@ -89,95 +396,404 @@ class VNFMonitor(object):
         if check_intvl is None:
             check_intvl = cfg.CONF.monitor.check_intvl
         self._status_check_intvl = check_intvl
+        self._probe_timeout = cfg.CONF.monitor.probe_timeout
+        self._hold_down = cfg.CONF.monitor.action_hold_down
+        self._max_hold_down = cfg.CONF.monitor.max_action_hold_down
+        self._pool = eventlet.GreenPool(cfg.CONF.monitor.max_concurrency)
+        self._executor = ActionExecutor(cfg.CONF.monitor.action_concurrency)
+        self.last_sweep_duration = 0
+        self._wakeup = threading.Event()
+        self._membership = None
+        if cfg.CONF.monitor.sharding:
+            self._membership = MonitorMembership.get_instance()
         LOG.debug('Spawning VNF monitor thread')
         threading.Thread(target=self.__run__).start()
 
     def __run__(self):
         while(1):
-            time.sleep(self._status_check_intvl)
+            self._wakeup.wait(self._time_to_next_probe())
+            self._wakeup.clear()
 
-            with self._lock:
-                for hosting_vnf in self._hosting_vnfs.values():
-                    if hosting_vnf.get('dead', False):
-                        LOG.debug('monitor skips dead vnf %s', hosting_vnf)
-                        continue
+            probes = self._pop_due_probes()
+            if probes:
+                eventlet.spawn_n(self._run_scheduled_probes, probes)
 
-                    self.run_monitor(hosting_vnf)
+    def _time_to_next_probe(self):
+        with self._lock:
+            if not self._schedule:
+                return None
+            return max(self._schedule[0][0] - time.time(), 0)
+
+    def _schedule_probe(self, probe, due):
+        with self._lock:
+            heapq.heappush(self._schedule,
+                           (due, next(self._sequence), probe))
+        self._wakeup.set()
+
+    def _pop_due_probes(self):
+        now = time.time()
+        probes = []
+        with self._lock:
+            while self._schedule and self._schedule[0][0] <= now:
+                due, sequence, probe = heapq.heappop(self._schedule)
+                hosting_vnf = probe.hosting_vnf
+                # entries of deleted, dead or re-added vnfs are dropped
+                # lazily here instead of being searched for in the heap
+                if (hosting_vnf.dead or
+                        self._hosting_vnfs.get(hosting_vnf.id) is not
+                        hosting_vnf):
+                    continue
+                probes.append(probe)
+        return probes
+
+    def _run_scheduled_probes(self, probes):
+        start = time.time()
+        pending = set(probes)
+
+        def _reschedule(probe):
+            # every probe is due again on its own interval as soon as it
+            # completes, not once the slowest probe of the sweep does
+            if probe in pending:
+                pending.discard(probe)
+                self._schedule_probe(probe, start + probe.interval)
+
+        try:
+            self.run_sweep(probes, on_done=_reschedule)
+        finally:
+            for probe in list(pending):
+                _reschedule(probe)
+
+    def run_sweep(self, probes=None, on_done=None):
+        """Run the given probes, or all due probes, and wait for them.
+
+        Only the probes of this sweep are waited for, probes of concurrent
+        sweeps sharing the pool are not. `on_done` is called with every
+        probe as soon as it completes.
+        """
+        if probes is None:
+            # Only the snapshot is taken under the lock, the probes
+            # themselves run without it so that add/delete are never
+            # blocked on I/O.
+            with self._lock:
+                hosting_vnfs = list(self._hosting_vnfs.values())
+
+            probes = []
+            for hosting_vnf in hosting_vnfs:
+                if hosting_vnf.dead:
+                    LOG.debug('monitor skips dead vnf %s', hosting_vnf.id)
+                    continue
+
+                probes.extend(self._get_probes(hosting_vnf))
+
+        start = time.time()
+        probes_by_driver = collections.OrderedDict()
+        for probe in probes:
+            probes_by_driver.setdefault(probe.driver, []).append(probe)
+
+        # Every driver first gets the chance to handle all of its probes in
+        # one batch, the probes of drivers which decline are fanned out to
+        # the pool one by one.
+        batches = [eventlet.spawn(self._run_probe_batch, driver,
+                                  driver_probes, on_done)
+                   for driver, driver_probes in probes_by_driver.items()]
+        for batch in batches:
+            for thread in batch.wait():
+                thread.wait()
+
+        self.last_sweep_duration = time.time() - start
+        LOG.debug('monitor sweep of %(count)d probes took %(duration).3fs',
+                  {'count': len(probes),
+                   'duration': self.last_sweep_duration})
+        intvl = min([probe.interval for probe in probes] or
+                    [self._status_check_intvl])
+        if self.last_sweep_duration > intvl:
+            LOG.warning('monitor sweep took %(duration).3fs which is longer '
+                        'than check interval %(intvl)ss',
+                        {'duration': self.last_sweep_duration,
+                         'intvl': intvl})
 
     @staticmethod
-    def to_hosting_vnf(vnf_dict, action_cb):
-        return {
-            'id': vnf_dict['id'],
-            'management_ip_addresses': jsonutils.loads(
-                vnf_dict['mgmt_url']),
-            'action_cb': action_cb,
-            'vnf': vnf_dict,
-            'monitoring_policy': jsonutils.loads(
-                vnf_dict['attributes']['monitoring_policy'])
-        }
+    def to_hosting_vnf(vnf_dict, action_cb, infra_driver=None):
+        """Return the monitor record of a vnf.
+
+        `action_cb` is called with the record and the action to run when a
+        probe of the vnf fires an action.
+        """
+        return HostingVNF(vnf_dict, action_cb, infra_driver)
+
+    def owns(self, vnf_id):
+        """Whether this process is in charge of monitoring a vnf."""
+        return self._membership is None or self._membership.owns(vnf_id)
+
+    def get_hosting_vnf_ids(self):
+        with self._lock:
+            return list(self._hosting_vnfs)
 
     def add_hosting_vnf(self, new_vnf):
+        if not self.owns(new_vnf.id):
+            LOG.debug('vnf %s is monitored by another member', new_vnf.id)
+            return
         LOG.debug('Adding host %(id)s, Mgmt IP %(ips)s',
-                  {'id': new_vnf['id'],
-                   'ips': new_vnf['management_ip_addresses']})
-        new_vnf['boot_at'] = timeutils.utcnow()
+                  {'id': new_vnf.id,
+                   'ips': new_vnf.management_ip_addresses})
+        mon_policy_dict = jsonutils.dumps(new_vnf.monitoring_policy)
+        new_vnf.boot_at = timeutils.utcnow()
+        new_vnf.probes = self._make_probes(new_vnf)
         with self._lock:
-            self._hosting_vnfs[new_vnf['id']] = new_vnf
+            self._hosting_vnfs[new_vnf.id] = new_vnf
+
+        now = time.time()
+        for probe in new_vnf.probes:
+            self._schedule_probe(probe, now + probe.delay)
 
-        attrib_dict = new_vnf['vnf']['attributes']
-        mon_policy_dict = attrib_dict['monitoring_policy']
         evt_details = (("VNF added for monitoring. "
                         "mon_policy_dict = %s,") % (mon_policy_dict))
-        _log_monitor_events(t_context.get_admin_context(), new_vnf['vnf'],
+        _log_monitor_events(t_context.get_admin_context(), new_vnf.vnf,
                             evt_details)
 
+    def restore_hosting_vnfs(self, hosting_vnfs, spread=None, startup=True):
+        """Add hosting vnfs which were already running, e.g. at startup.
+
+        At startup their monitoring delay has passed long ago, so instead
+        of all being probed at once their first probes are spread evenly
+        over `spread` seconds, the check interval by default. Otherwise,
+        e.g. when vnfs created by another member are picked up, a probe is
+        not run before its monitoring delay has passed since the `boot_at`
+        of its hosting vnf, now if it is not set. Vnfs already monitored,
+        or owned by another member when sharding, are left untouched.
+        """
+        if spread is None:
+            spread = self._status_check_intvl
+        boot_at = timeutils.utcnow()
+        now = time.time()
+        restored = 0
+        hosting_vnfs = [hosting_vnf for hosting_vnf in hosting_vnfs
+                        if self.owns(hosting_vnf.id)]
+        with self._lock:
+            for index, hosting_vnf in enumerate(hosting_vnfs):
+                if hosting_vnf.id in self._hosting_vnfs:
+                    continue
+                if startup or hosting_vnf.boot_at is None:
+                    hosting_vnf.boot_at = boot_at
+                # seconds since the hosting vnf booted
+                booted = timeutils.delta_seconds(hosting_vnf.boot_at,
+                                                 boot_at)
+                hosting_vnf.probes = self._make_probes(hosting_vnf)
+                self._hosting_vnfs[hosting_vnf.id] = hosting_vnf
+                due = now + float(spread) * index / len(hosting_vnfs)
+                for probe in hosting_vnf.probes:
+                    if startup:
+                        probe.delay = 0
+                    heapq.heappush(self._schedule,
+                                   (max(due, now + probe.delay - booted),
+                                    next(self._sequence), probe))
+                restored += 1
+        self._wakeup.set()
+        LOG.info(_('Restored monitoring of %d VNFs'), restored)
+        return restored
+
     def delete_hosting_vnf(self, vnf_id):
         LOG.debug('deleting vnf_id %(vnf_id)s', {'vnf_id': vnf_id})
         with self._lock:
+            self._hold_downs.pop(vnf_id, None)
             hosting_vnf = self._hosting_vnfs.pop(vnf_id, None)
             if hosting_vnf:
+                # a sweep in flight may still hold a reference to it
+                hosting_vnf.dead = True
                 LOG.debug('deleting vnf_id %(vnf_id)s, Mgmt IP %(ips)s',
                           {'vnf_id': vnf_id,
-                           'ips': hosting_vnf['management_ip_addresses']})
+                           'ips': hosting_vnf.management_ip_addresses})
 
-    def run_monitor(self, hosting_vnf):
-        mgmt_ips = hosting_vnf['management_ip_addresses']
-        vdupolicies = hosting_vnf['monitoring_policy']['vdus']
+    def _make_probes(self, hosting_vnf):
+        """Return one probe per monitored (vdu, driver) of a hosting vnf.
+
+        The monitoring policy of the hosting vnf is released afterwards.
+        """
+        mgmt_ips = hosting_vnf.management_ip_addresses
+        vdupolicies = hosting_vnf.monitoring_policy['vdus']
 
-        vnf_delay = hosting_vnf['monitoring_policy'].get(
+        vnf_delay = hosting_vnf.monitoring_policy.get(
             'monitoring_delay', self.boot_wait)
 
+        probes = []
         for vdu in vdupolicies.keys():
-            if hosting_vnf.get('dead'):
-                return
-
             policy = vdupolicies[vdu]
             for driver in policy.keys():
                 params = policy[driver].get('monitoring_params', {})
 
-                vdu_delay = params.get('monitoring_delay', vnf_delay)
-
-                if not timeutils.is_older_than(
-                    hosting_vnf['boot_at'],
-                        vdu_delay):
-                        continue
-
-                actions = policy[driver].get('actions', {})
                 if 'mgmt_ip' not in params:
                     params['mgmt_ip'] = mgmt_ips[vdu]
 
-                driver_return = self.monitor_call(driver,
-                                                  hosting_vnf['vnf'],
-                                                  params)
+                probes.append(Probe(
+                    hosting_vnf, vdu, driver, params,
+                    policy[driver].get('actions', {}),
+                    int(params.get('monitoring_delay', vnf_delay)),
+                    int(params.get('monitoring_interval',
+                                   self._status_check_intvl)),
+                    int(params.get('failure_threshold',
+                                   cfg.CONF.monitor.failure_threshold)),
+                    int(params.get('failure_window',
+                                   cfg.CONF.monitor.failure_window))))
+        hosting_vnf.monitoring_policy = None
+        return probes
+
+    def _get_probes(self, hosting_vnf):
+        """Return the probes of a hosting vnf whose delay has passed."""
+        probes = hosting_vnf.probes
+        if probes is None:
+            probes = hosting_vnf.probes = self._make_probes(hosting_vnf)
+        return [probe for probe in probes
+                if timeutils.is_older_than(hosting_vnf.boot_at,
+                                           probe.delay)]
 
-                LOG.debug('driver_return %s', driver_return)
+    def run_monitor(self, hosting_vnf):
+        for probe in self._get_probes(hosting_vnf):
+            if hosting_vnf.dead:
+                return
 
-                if driver_return in actions:
-                    action = actions[driver_return]
-                    hosting_vnf['action_cb'](action)
+            self.run_probe(probe)
+
+    def run_probe(self, probe):
+        if probe.hosting_vnf.dead:
+            return
+
+        driver_return = self._monitor_call_with_deadline(
+            probe.driver, probe.hosting_vnf.vnf, probe.params)
+        self._handle_driver_return(probe, driver_return)
+
+    def _run_probe_batch(self, driver, probes, on_done=None):
+        """Run the probes of a driver.
+
+        :returns: the green threads of the probes fanned out to the pool
+        """
+        results = self._monitor_call_batch_with_deadline(driver, probes)
+        if results is None:
+            return [self._pool.spawn(self._run_pooled_probe, probe, on_done)
+                    for probe in probes]
+
+        for probe, (driver_return, rtt) in zip(probes, results):
+            probe.rtt = rtt
+            try:
+                self._handle_driver_return(probe, driver_return)
+            finally:
+                if on_done:
+                    on_done(probe)
+        return []
+
+    def _run_pooled_probe(self, probe, on_done=None):
+        try:
+            self.run_probe(probe)
+        except Exception:
+            LOG.exception(_('monitor probe %(driver)s of vnf %(id)s vdu '
+                            '%(vdu)s failed'),
+                          {'driver': probe.driver,
+                           'id': probe.hosting_vnf.id, 'vdu': probe.vdu})
+        finally:
+            if on_done:
+                on_done(probe)
+
+    def _handle_driver_return(self, probe, driver_return):
+        hosting_vnf = probe.hosting_vnf
+        LOG.debug('driver_return %s', driver_return)
+
+        if hosting_vnf.dead:
+            return
+
+        action = self._damp(probe, driver_return)
+        if action:
+            self._executor.submit(hosting_vnf.id, action,
+                                  functools.partial(self._run_action,
+                                                    hosting_vnf))
+
+    def _damp(self, probe, driver_return):
+        """Return the action a probe result fires, if any.
+
+        Actions only fire once the failure threshold of the probe is
+        crossed and not during the hold-down following the previous
+        action of the VDU.
+        """
+        event = driver_return if driver_return in probe.actions else None
+        fire = probe.record(event)
+        if event is not None and not fire:
+            LOG.debug('monitor event %(event)s of vnf %(id)s vdu %(vdu)s '
+                      'is below its threshold',
+                      {'event': event, 'id': probe.hosting_vnf.id,
+                       'vdu': probe.vdu})
+            return None
+
+        vnf_id = probe.hosting_vnf.id
+        key = (probe.vdu, probe.driver)
+        now = time.time()
+        with self._lock:
+            holds = self._hold_downs.get(vnf_id, {})
+            hold = holds.get(key)
+            if not fire:
+                # a VDU healthy for a whole hold-down is forgiven
+                if hold and now >= hold[0] + hold[1]:
+                    del holds[key]
+                    if not holds:
+                        del self._hold_downs[vnf_id]
+                return None
+            if hold and now < hold[0]:
+                LOG.info(_('monitor action %(action)s of vnf %(id)s vdu '
+                           '%(vdu)s held down for %(left)ds'),
+                         {'action': probe.actions[event], 'id': vnf_id,
+                          'vdu': probe.vdu, 'left': hold[0] - now})
+                return None
+            if self._hold_down:
+                duration = min(hold[1] * 2 if hold else self._hold_down,
+                               self._max_hold_down)
+                self._hold_downs.setdefault(vnf_id, {})[key] = (
+                    now + duration, duration)
+        probe.reset()
+        return probe.actions[event]
+
+    @staticmethod
+    def _run_action(hosting_vnf, action):
+        # the vnf may have been deleted or respawned while queued
+        if hosting_vnf.dead:
+            LOG.debug('monitor skips action %(action)s of dead vnf %(id)s',
+                      {'action': action, 'id': hosting_vnf.id})
+            return
+        hosting_vnf.action_cb(hosting_vnf, action)
+
+    def _monitor_call_batch_with_deadline(self, driver, probes):
+        timeout = eventlet.Timeout(self._probe_timeout or None)
+        try:
+            return self.monitor_call_batch(
+                driver, [(probe.hosting_vnf.vnf, probe.params)
+                         for probe in probes])
+        except eventlet.Timeout as e:
+            if e is not timeout:
+                raise
+            LOG.warning('monitor driver %(driver)s did not answer within '
+                        '%(timeout)ss for a batch of %(count)d probes',
+                        {'driver': driver, 'timeout': self._probe_timeout,
+                         'count': len(probes)})
+            return [('failure', None)] * len(probes)
+        finally:
+            timeout.cancel()
+
+    def _monitor_call_with_deadline(self, driver, vnf_dict, kwargs):
+        timeout = eventlet.Timeout(self._probe_timeout or None)
+        try:
+            return self.monitor_call(driver, vnf_dict, kwargs)
+        except eventlet.Timeout as e:
+            if e is not timeout:
+                raise
+            LOG.warning('monitor driver %(driver)s did not answer within '
+                        '%(timeout)ss for %(mgmt_ip)s',
+                        {'driver': driver, 'timeout': self._probe_timeout,
+                         'mgmt_ip': kwargs.get('mgmt_ip')})
+            return 'failure'
+        finally:
+            timeout.cancel()
 
     def mark_dead(self, vnf_id):
-        self._hosting_vnfs[vnf_id]['dead'] = True
+        with self._lock:
+            hosting_vnf = self._hosting_vnfs.get(vnf_id)
+            if hosting_vnf:
+                hosting_vnf.dead = True
 
     def _invoke(self, driver, **kwargs):
         method = inspect.stack()[1][3]
@@ -196,6 +812,9 @@ class VNFMonitor(object):
         return self._invoke(driver,
                             vnf=vnf_dict, kwargs=kwargs)
 
+    def monitor_call_batch(self, driver, probes):
+        return self._invoke(driver, probes=probes)
+
 
 class VNFAlarmMonitor(object):
     """VNF Alarm monitor"""
@@ -205,6 +824,29 @@ class VNFAlarmMonitor(object):
             help=_('Alarm monitoring driver to communicate with '
                    'Hosting VNF/logical service '
                    'instance tacker plugin will use')),
+        cfg.IntOpt(
+            'alarm_coalesce_window', default=30,
+            help=_('Seconds during which further alarms for the same VNF, '
+                   'monitoring policy and action are dropped after one '
+                   'was accepted, 0 disables the coalescing')),
+        cfg.BoolOpt(
+            'alarm_async_ingestion', default=False,
+            help=_('Answer the alarms with 202 as soon as they are queued '
+                   'and process them in the background instead of within '
+                   'the alarm request')),
+        cfg.IntOpt(
+            'alarm_workers', default=16,
+            help=_('Maximum number of VNFs whose queued alarms are '
+                   'processed concurrently, the alarms of a VNF are '
+                   'processed in order')),
+        cfg.IntOpt(
+            'alarm_queue_size', default=10000,
+            help=_('Maximum number of queued alarms, further alarms are '
+                   'answered with 503 until the queue drains')),
+        cfg.IntOpt(
+            'alarm_batch_size', default=1000,
+            help=_('Maximum number of alarms posted in a single request '
+                   'to the alarm batch URL')),
     ]
     cfg.CONF.register_opts(OPTS, 'tacker')
 
@@ -283,6 +925,54 @@ class VNFAlarmMonitor(object):
                             vnf=vnf_dict, kwargs=kwargs)
 
 
+class AlarmCoalescer(object):
+    """Collapses the alarms which would run the same action on a VNF.
+
+    An alarm for a (VNF, monitoring policy, action) is accepted once per
+    window, and an action in its cooldown drops the alarms of any
+    monitoring policy mapped to it.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        # key => time.time() until which the alarms for key are dropped
+        self._until = {}
+        self._purge_at = 1024
+
+    def _purge(self, now):
+        if len(self._until) < self._purge_at:
+            return
+        for key, until in list(self._until.items()):
+            if until <= now:
+                del self._until[key]
+        self._purge_at = max(1024, 2 * len(self._until))
+
+    def admit(self, vnf_id, policy_name, action_name):
+        """Return whether an alarm is to be processed."""
+        now = time.time()
+        if (self._until.get((vnf_id, policy_name, action_name), 0) > now or
+                self._until.get((vnf_id, None, action_name), 0) > now):
+            LOG.debug('Alarm %(policy)s for action %(action)s of VNF '
+                      '%(vnf)s coalesced',
+                      {'policy': policy_name, 'action': action_name,
+                       'vnf': vnf_id})
+            return False
+        self._purge(now)
+        if self.window > 0:
+            self._until[(vnf_id, policy_name, action_name)] = (
+                now + self.window)
+        return True
+
+    def release(self, vnf_id, policy_name, action_name):
+        """Accept again the alarms of an alarm which was not processed."""
+        self._until.pop((vnf_id, policy_name, action_name), None)
+
+    def cool_down(self, vnf_id, action_name, cooldown):
+        """Drop the alarms for an action during its cooldown."""
+        if cooldown > 0:
+            self._until[(vnf_id, None, action_name)] = time.time() + cooldown
+
+
 @six.add_metaclass(abc.ABCMeta)
 class ActionPolicy(object):
     @classmethod
@@ -341,7 +1031,8 @@ class ActionRespawnHeat(ActionPolicy):
             placement_attr = vnf_dict.get('placement_attr', {})
             region_name = placement_attr.get('region_name')
             heatclient = hc.HeatClient(auth_attr=vim_auth,
-                                       region_name=region_name)
+                                       region_name=region_name,
+                                       vim_id=vnf_dict.get('vim_id'))
             heatclient.delete(vnf_dict['instance_id'])
             LOG.debug(_("Heat stack %s delete initiated"), vnf_dict[
                 'instance_id'])
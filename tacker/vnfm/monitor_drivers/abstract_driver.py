@@ -69,13 +69,28 @@ class VNFMonitorAbstractDriver(extensions.PluginInterface):
         or return an event string like 'failure' or 'calls-capacity-reached'
         for specific VNF health condition.
 
-        :param vnf:
+        :param vnf: summary of the VNF holding its id, tenant_id, name,
+                    vim_id, status and mgmt_url
         :param kwargs:
         :returns: boolean
         :returns: True if VNF is healthy
         """
         pass
 
+    def monitor_call_batch(self, probes):
+        """Monitor many VDUs in a single call.
+
+        Drivers which can multiplex several targets over one transport
+        override this, the default asks the monitor to fall back to one
+        monitor_call per probe.
+
+        :param probes: list of (vnf, kwargs) tuples as given to monitor_call
+        :returns: None or a list holding a (result, rtt) tuple per probe in
+                  the same order, where result is what monitor_call would
+                  return and rtt the measured round trip time in seconds
+        """
+        return None
+
     def monitor_service_driver(self, plugin, context, vnf,
                                service_instance):
         # use same monitor driver to communicate with service
@@ -12,8 +12,14 @@
 #    under the License.
 #
 
+import collections
+import socket
+import time
+
+import eventlet
 from oslo_config import cfg
 from oslo_log import log as logging
+from six.moves import http_client
 import six.moves.urllib.error as urlerr
 import six.moves.urllib.request as urlreq
 
@@ -28,7 +34,24 @@ OPTS = [
     cfg.IntOpt('timeout', default=1,
                help=_('number of seconds to wait for a response')),
     cfg.IntOpt('port', default=80,
-               help=_('HTTP port number to send request'))
+               help=_('HTTP port number to send request')),
+    cfg.StrOpt('probe_mode', default='urllib',
+               choices=['urllib', 'keepalive'],
+               help=_('"urllib" opens a new connection for every request, '
+                      '"keepalive" keeps a persistent connection per '
+                      'management endpoint and probes all VNFs of a monitor '
+                      'sweep concurrently')),
+    cfg.IntOpt('concurrency', default=64,
+               help=_('maximum number of concurrent requests of a monitor '
+                      'sweep in keepalive mode')),
+    cfg.IntOpt('deadline', default=10,
+               help=_('number of seconds after which the requests of a '
+                      'monitor sweep are abandoned in keepalive mode, '
+                      'requests in flight count as failures and probes '
+                      'not started yet have no result')),
+    cfg.IntOpt('max_idle_connections', default=1024,
+               help=_('maximum number of idle persistent connections kept '
+                      'in keepalive mode'))
 ]
 cfg.CONF.register_opts(OPTS, 'monitor_http_ping')
 
@@ -51,6 +74,69 @@ class VNFMonitorHTTPPing(abstract_driver.VNFMonitorAbstractDriver):
         LOG.debug(_('monitor_url %s'), vnf)
         return vnf.get('monitor_url', '')
 
+    def __init__(self):
+        super(VNFMonitorHTTPPing, self).__init__()
+        # (mgmt_ip, port, timeout) => idle connection, oldest first
+        self._connections = collections.OrderedDict()
+
+    def _get_connection(self, key):
+        conn = self._connections.pop(key, None)
+        if conn is None:
+            mgmt_ip, port, timeout = key
+            conn = http_client.HTTPConnection(mgmt_ip, port,
+                                              timeout=timeout)
+        return conn
+
+    def _put_connection(self, key, conn):
+        self._connections[key] = conn
+        max_idle = cfg.CONF.monitor_http_ping.max_idle_connections
+        while len(self._connections) > max_idle:
+            self._connections.popitem(last=False)[1].close()
+
+    def _is_alive(self, mgmt_ip='', retry=5, timeout=5, port=80, path='/',
+                  method='GET', expected_status=None, **kwargs):
+        """Checks whether the server answers over a persistent connection.
+
+        The connection to each endpoint is kept open between probes. A
+        request is retried `retry` times on a fresh connection if it fails.
+        :param mgmt_ip: IP to check
+        :param retry: times to reconnect if the request fails
+        :param timeout: seconds to wait for connection and response
+        :param port: port number to check connectivity
+        :param path: path of the request
+        :param method: HTTP method, GET or HEAD
+        :param expected_status: status code of a healthy answer, any status
+                                below 400 is healthy if not given
+        :return: bool - True or 'failure' depending on pingability.
+        """
+        key = (mgmt_ip, int(port), float(timeout))
+        for retry_index in range(int(retry)):
+            conn = self._get_connection(key)
+            try:
+                conn.request(method.upper(), path)
+                response = conn.getresponse()
+                response.read()
+            except (http_client.HTTPException, socket.error) as e:
+                conn.close()
+                LOG.warning('Unable to reach to %(ip)s:%(port)s: %(error)s',
+                            {'ip': mgmt_ip, 'port': port, 'error': e})
+                continue
+
+            if response.will_close:
+                conn.close()
+            else:
+                self._put_connection(key, conn)
+            if expected_status is None:
+                healthy = response.status < 400
+            else:
+                healthy = response.status == int(expected_status)
+            if healthy:
+                return True
+            LOG.warning('Unexpected status %(status)s from %(ip)s:%(port)s',
+                        {'status': response.status, 'ip': mgmt_ip,
+                         'port': port})
+        return 'failure'
+
     def _is_pingable(self, mgmt_ip='', retry=5, timeout=5, port=80, **kwargs):
         """Checks whether the server is reachable by using urllib.
 
@@ -77,4 +163,37 @@ class VNFMonitorHTTPPing(abstract_driver.VNFMonitorAbstractDriver):
         if not kwargs['mgmt_ip']:
             return
 
+        if cfg.CONF.monitor_http_ping.probe_mode == 'keepalive':
+            return self._is_alive(**kwargs)
         return self._is_pingable(**kwargs)
+
+    def monitor_call_batch(self, probes):
+        if cfg.CONF.monitor_http_ping.probe_mode != 'keepalive':
+            return None
+
+        # probes that did not run before the deadline have no result
+        results = [(None, None)] * len(probes)
+        in_flight = set()
+
+        def _probe(index, kwargs):
+            in_flight.add(index)
+            start = time.time()
+            result = self._is_alive(**kwargs)
+            rtt = time.time() - start if result is True else None
+            results[index] = (result, rtt)
+            in_flight.discard(index)
+
+        pool = eventlet.GreenPool(cfg.CONF.monitor_http_ping.concurrency)
+        threads = []
+        with eventlet.Timeout(cfg.CONF.monitor_http_ping.deadline, False):
+            for index, (vnf, kwargs) in enumerate(probes):
+                if not kwargs.get('mgmt_ip'):
+                    continue
+                threads.append(pool.spawn(_probe, index, kwargs))
+            pool.waitall()
+        for thread in threads:
+            thread.kill()
+        # only the probes still waiting for an answer count as failures
+        for index in in_flight:
+            results[index] = ('failure', None)
+        return results
@@ -12,9 +12,13 @@
 #    under the License.
 #
 
+import socket
+
+import eventlet
 from oslo_config import cfg
 from oslo_log import log as logging
 
+from tacker.agent.linux import icmp
 from tacker.agent.linux import utils as linux_utils
 from tacker.common import log
 from tacker.vnfm.monitor_drivers import abstract_driver
@@ -27,7 +31,13 @@ OPTS = [
     cfg.StrOpt('timeout', default='1',
                help=_('number of seconds to wait for a response')),
     cfg.StrOpt('interval', default='1',
-               help=_('number of seconds to wait between packets'))
+               help=_('number of seconds to wait between packets')),
+    cfg.StrOpt('probe_mode', default='subprocess',
+               choices=['subprocess', 'socket'],
+               help=_('"subprocess" runs one ping command per management '
+                      'IP, "socket" sends the echo requests of all '
+                      'management IPs of a monitor sweep over a shared '
+                      'ICMP socket'))
 ]
 cfg.CONF.register_opts(OPTS, 'monitor_ping')
 
@@ -50,6 +60,18 @@ class VNFMonitorPing(abstract_driver.VNFMonitorAbstractDriver):
         LOG.debug(_('monitor_url %s'), vnf)
         return vnf.get('monitor_url', '')
 
+    def _use_socket(self):
+        return (cfg.CONF.monitor_ping.probe_mode == 'socket' and
+                not getattr(self, '_socket_unavailable', False))
+
+    def _ping_batch(self, mgmt_ips, count=5, timeout=1, interval='0.2'):
+        """Ping all IP addresses over shared ICMP sockets.
+
+        :returns: dict of IP address to round trip time, None if unreachable
+        """
+        return icmp.ICMPProber().probe(mgmt_ips, count=count,
+                                       timeout=timeout, interval=interval)
+
     def _is_pingable(self, mgmt_ip="", count=5, timeout=1, interval='0.2',
                      **kwargs):
         """Checks whether an IP address is reachable by pinging.
@@ -60,6 +82,18 @@ class VNFMonitorPing(abstract_driver.VNFMonitorAbstractDriver):
         :param ip: IP to check
         :return: bool - True or string 'failure' depending on pingability.
         """
+        if self._use_socket():
+            try:
+                rtt = self._ping_batch([mgmt_ip], count, timeout,
+                                       interval)[mgmt_ip]
+            except socket.error as e:
+                self._disable_socket(e)
+            else:
+                if rtt is None:
+                    LOG.warning("Cannot ping ip address: %s", mgmt_ip)
+                    return 'failure'
+                return True
+
         ping_cmd = ['ping',
                     '-c', count,
                     '-W', timeout,
@@ -73,9 +107,48 @@ class VNFMonitorPing(abstract_driver.VNFMonitorAbstractDriver):
             LOG.warning("Cannot ping ip address: %s", mgmt_ip)
             return 'failure'
 
+    def _disable_socket(self, error):
+        LOG.error("Cannot open ICMP socket, falling back to ping "
+                  "subprocesses: %s", error)
+        self._socket_unavailable = True
+
     @log.log
     def monitor_call(self, vnf, kwargs):
         if not kwargs['mgmt_ip']:
             return
 
         return self._is_pingable(**kwargs)
+
+    def monitor_call_batch(self, probes):
+        if not self._use_socket():
+            return None
+
+        # probes sharing the same parameters are sent over one socket
+        groups = {}
+        for index, (vnf, kwargs) in enumerate(probes):
+            if not kwargs.get('mgmt_ip'):
+                continue
+            key = (kwargs.get('count', 5), kwargs.get('timeout', 1),
+                   kwargs.get('interval', '0.2'))
+            groups.setdefault(key, []).append(index)
+
+        pile = eventlet.GreenPile()
+        for (count, timeout, interval), indexes in groups.items():
+            mgmt_ips = [probes[index][1]['mgmt_ip'] for index in indexes]
+            pile.spawn(self._ping_batch, mgmt_ips, count, timeout, interval)
+
+        results = [(None, None)] * len(probes)
+        try:
+            for indexes, rtts in zip(list(groups.values()), pile):
+                for index in indexes:
+                    mgmt_ip = probes[index][1]['mgmt_ip']
+                    rtt = rtts.get(mgmt_ip)
+                    if rtt is None:
+                        LOG.warning("Cannot ping ip address: %s", mgmt_ip)
+                        results[index] = ('failure', None)
+                    else:
+                        results[index] = (True, rtt)
+        except socket.error as e:
+            self._disable_socket(e)
+            return None
+        return results
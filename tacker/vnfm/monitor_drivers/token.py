@@ -11,8 +11,16 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import time
+
+import eventlet
+from eventlet import semaphore
 from keystoneauth1.identity import v3
 from keystoneauth1 import session
+from oslo_log import log as logging
+from oslo_utils import timeutils
+
+LOG = logging.getLogger(__name__)
 
 
 class Token(object):
@@ -25,13 +33,107 @@ class Token(object):
         self.user_domain_name = user_domain_name
         self.project_domain_name = project_domain_name
 
-    def create_token(self):
+    def _make_session(self):
         auth = v3.Password(auth_url=self.auth_url,
                            username=self.username,
                            password=self.password,
                            project_name=self.project_name,
                            user_domain_name=self.user_domain_name,
                            project_domain_name=self.project_domain_name)
-        sess = session.Session(auth=auth)
+        return session.Session(auth=auth)
+
+    def create_token(self):
+        sess = self._make_session()
         token_id = sess.auth.get_token(sess)
         return token_id
+
+
+class CachedToken(Token):
+    """Token shared between requests and refreshed before it expires.
+
+    The token is reused until `refresh_margin` seconds before its expiry,
+    at most half its lifetime. A greenthread authenticates again ahead of
+    that point, so callers only wait for Keystone on the very first call,
+    when the background refresh could not get a new token in time or
+    after the token was rejected.
+    """
+
+    def __init__(self, username, password, project_name,
+                 auth_url, user_domain_name, project_domain_name,
+                 refresh_margin=300, retry_interval=30):
+        super(CachedToken, self).__init__(
+            username, password, project_name, auth_url,
+            user_domain_name, project_domain_name)
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+        self._lock = semaphore.Semaphore()
+        self._token_id = None
+        # time.time() after which the token must not be handed out
+        self._valid_until = 0
+        self._refresher = None
+        self.stats = {'hits': 0, 'misses': 0, 'refreshes': 0,
+                      'failures': 0}
+
+    def _valid(self):
+        return self._token_id is not None and time.time() < self._valid_until
+
+    def create_token(self):
+        if self._valid():
+            self.stats['hits'] += 1
+            return self._token_id
+        with self._lock:
+            # another greenthread may have authenticated meanwhile
+            if self._valid():
+                self.stats['hits'] += 1
+                return self._token_id
+            self.stats['misses'] += 1
+            self._authenticate()
+            return self._token_id
+
+    def invalidate(self, token_id=None):
+        """Drop the token, e.g. after it has been rejected.
+
+        If `token_id` is given the token is only dropped if it is still the
+        cached one, so that a token refreshed meanwhile is kept.
+        """
+        if token_id is not None and token_id != self._token_id:
+            return
+        self._token_id = None
+        self._valid_until = 0
+
+    def _authenticate(self):
+        sess = self._make_session()
+        access = sess.auth.get_access(sess)
+        lifetime = timeutils.delta_seconds(
+            timeutils.utcnow(), timeutils.normalize_time(access.expires))
+        self._token_id = access.auth_token
+        # a margin beyond the lifetime would make short lived tokens
+        # never reused and refreshed back to back
+        margin = min(self.refresh_margin, lifetime / 2.0)
+        self._valid_until = time.time() + lifetime - margin
+        LOG.debug('Token for %(user)s valid for %(lifetime)d seconds, '
+                  'stats %(stats)s',
+                  {'user': self.username, 'lifetime': lifetime,
+                   'stats': self.stats})
+        # refresh half way through the remaining validity
+        self._schedule_refresh(max((self._valid_until - time.time()) / 2,
+                                   self.retry_interval))
+
+    def _schedule_refresh(self, delay):
+        if self._refresher is not None:
+            self._refresher.cancel()
+        self._refresher = eventlet.spawn_after(delay, self._refresh)
+
+    def _refresh(self):
+        self._refresher = None
+        with self._lock:
+            try:
+                self._authenticate()
+                self.stats['refreshes'] += 1
+            except Exception:
+                self.stats['failures'] += 1
+                LOG.exception(_('Failed to refresh the token for %s'),
+                              self.username)
+                # keep serving the current token while it is valid
+                if self._valid():
+                    self._schedule_refresh(self.retry_interval)
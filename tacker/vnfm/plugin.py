@@ -14,20 +14,24 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import functools
 import inspect
 import six
+import time
 import yaml
 
 import eventlet
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_utils import excutils
-from toscaparser.tosca_template import ToscaTemplate
 
 from tacker.api.v1 import attributes
+from tacker.common import cache
 from tacker.common import driver_manager
 from tacker.common import exceptions
 from tacker.common import utils
+from tacker import context as t_context
 from tacker.db.vnfm import vnfm_db
 from tacker.extensions import vnfm
 from tacker.plugins.common import constants
@@ -36,6 +40,7 @@ from tacker.vnfm import monitor
 from tacker.vnfm import vim_client
 
 from tacker.tosca import utils as toscautils
+from tacker.tosca import workers
 
 LOG = logging.getLogger(__name__)
 CONF = cfg.CONF
@@ -115,6 +120,10 @@ class VNFMPlugin(vnfm_db.VNFMPluginDb, VNFMMgmtMixin):
         cfg.ListOpt(
             'infra_driver', default=['noop', 'openstack'],
             help=_('Hosting vnf drivers tacker plugin will use')),
+        cfg.IntOpt(
+            'policy_cache_size', default=1024,
+            help=_('Number of VNFDs whose parsed policies are cached, '
+                   '0 disables the cache')),
     ]
     cfg.CONF.register_opts(OPTS, 'tacker')
     supported_extension_aliases = ['vnfm']
@@ -129,6 +138,18 @@ class VNFMPlugin(vnfm_db.VNFMPluginDb, VNFMMgmtMixin):
             cfg.CONF.tacker.infra_driver)
         self._vnf_monitor = monitor.VNFMonitor(self.boot_wait)
         self._vnf_alarm_monitor = monitor.VNFAlarmMonitor()
+        self._alarm_coalescer = monitor.AlarmCoalescer(
+            cfg.CONF.tacker.alarm_coalesce_window)
+        self._alarm_executor = monitor.ActionExecutor(
+            cfg.CONF.tacker.alarm_workers)
+        # vnfd_id => (updated_at, parsed policies of the vnfd template)
+        self._policy_cache = cache.LRUCache(
+            cfg.CONF.tacker.policy_cache_size)
+        if cfg.CONF.monitor.rehydrate_on_start:
+            self.spawn_n(self._rehydrate_vnf_monitor)
+        if cfg.CONF.monitor.sharding:
+            monitor.MonitorMembership.get_instance().add_listener(
+                self._resync_vnf_monitor)
 
     def spawn_n(self, function, *args, **kwargs):
         self._pool.spawn_n(function, *args, **kwargs)
@@ -169,25 +190,29 @@ class VNFMPlugin(vnfm_db.VNFMPluginDb, VNFMMgmtMixin):
         return super(VNFMPlugin, self).create_vnfd(
             context, vnfd)
 
+    def update_vnfd(self, context, vnfd_id, vnfd):
+        vnfd_dict = super(VNFMPlugin, self).update_vnfd(context, vnfd_id,
+                                                        vnfd)
+        self._policy_cache.pop(vnfd_id)
+        return vnfd_dict
+
+    def delete_vnfd(self, context, vnfd_id, soft_delete=True):
+        super(VNFMPlugin, self).delete_vnfd(context, vnfd_id,
+                                            soft_delete=soft_delete)
+        self._policy_cache.pop(vnfd_id)
+
     def _parse_template_input(self, vnfd):
         vnfd_dict = vnfd['vnfd']
         vnfd_yaml = vnfd_dict['attributes'].get('vnfd')
         if vnfd_yaml is None:
             return
 
+        # the compiled VNFD is only ever produced here
+        vnfd_dict.pop('compiled', None)
         inner_vnfd_dict = yaml.safe_load(vnfd_yaml)
         LOG.debug(_('vnfd_dict: %s'), inner_vnfd_dict)
 
-        # Prepend the tacker_defs.yaml import file with the full
-        # path to the file
-        toscautils.updateimports(inner_vnfd_dict)
-
-        try:
-            tosca = ToscaTemplate(a_file=False,
-                                  yaml_dict_tpl=inner_vnfd_dict)
-        except Exception as e:
-            LOG.exception(_("tosca-parser error: %s"), str(e))
-            raise vnfm.ToscaParserFailed(error_msg_details=str(e))
+        validated = workers.call('validate_vnfd', vnfd_yaml)
 
         if ('description' not in vnfd_dict or
                 vnfd_dict['description'] == ''):
@@ -199,31 +224,104 @@ class VNFMPlugin(vnfm_db.VNFMPluginDb, VNFMMgmtMixin):
             vnfd_dict['name'] = inner_vnfd_dict['metadata'].get(
                 'template_name', '')
 
-        vnfd_dict['mgmt_driver'] = toscautils.get_mgmt_driver(
-            tosca)
+        vnfd_dict['mgmt_driver'] = validated['mgmt_driver']
+        if validated['compiled']:
+            vnfd_dict['compiled'] = validated['compiled']
         LOG.debug(_('vnfd %s'), vnfd)
 
-    def add_vnf_to_monitor(self, vnf_dict, infra_driver):
+    def _make_hosting_vnf(self, vnf_dict, infra_driver):
         dev_attrs = vnf_dict['attributes']
         mgmt_url = vnf_dict['mgmt_url']
         if 'monitoring_policy' in dev_attrs and mgmt_url:
-            def action_cb(action):
-                action_cls = monitor.ActionPolicy.get_policy(action,
-                                                             infra_driver)
-                if action_cls:
-                    action_cls.execute_action(self, hosting_vnf['vnf'])
+            return self._vnf_monitor.to_hosting_vnf(
+                vnf_dict, self._vnf_monitor_action, infra_driver)
 
-            hosting_vnf = self._vnf_monitor.to_hosting_vnf(
-                vnf_dict, action_cb)
+    def _vnf_monitor_action(self, hosting_vnf, action):
+        action_cls = monitor.ActionPolicy.get_policy(
+            action, hosting_vnf.infra_driver)
+        if not action_cls:
+            return
+        # the monitor only keeps a summary of the vnf
+        try:
+            vnf_dict = self.get_vnf(t_context.get_admin_context(),
+                                    hosting_vnf.id)
+        except vnfm.VNFNotFound:
+            LOG.warning(_('vnf %(vnf_id)s is gone, monitor action '
+                          '%(action)s skipped'),
+                        {'vnf_id': hosting_vnf.id, 'action': action})
+            return
+        action_cls.execute_action(self, vnf_dict)
+
+    def add_vnf_to_monitor(self, vnf_dict, infra_driver):
+        hosting_vnf = self._make_hosting_vnf(vnf_dict, infra_driver)
+        if hosting_vnf:
             LOG.debug('hosting_vnf: %s', hosting_vnf)
             self._vnf_monitor.add_hosting_vnf(hosting_vnf)
 
+    def _rehydrate_vnf_monitor(self, vnf_ids=None, startup=True):
+        """Resume monitoring of the VNFs which were monitored before.
+
+        Unless at startup, the VNFs keep their monitoring delay counted
+        from their last update, i.e. from when they became ACTIVE.
+        """
+        context = t_context.get_admin_context()
+        start = time.time()
+        hosting_vnfs = []
+        try:
+            for vnf_dict, infra_driver in self._get_monitored_vnfs(
+                    context, cfg.CONF.monitor.rehydrate_batch_size,
+                    vnf_ids=vnf_ids):
+                try:
+                    hosting_vnf = self._make_hosting_vnf(vnf_dict,
+                                                         infra_driver)
+                except (ValueError, KeyError, TypeError):
+                    LOG.warning(_('Cannot resume monitoring of vnf %s'),
+                                vnf_dict['id'])
+                    continue
+                if hosting_vnf:
+                    if not startup:
+                        hosting_vnf.boot_at = (vnf_dict.get('updated_at') or
+                                               vnf_dict.get('created_at'))
+                    hosting_vnfs.append(hosting_vnf)
+        except Exception:
+            LOG.exception(_('Failed to load the VNFs to monitor'))
+            return
+
+        restored = self._vnf_monitor.restore_hosting_vnfs(hosting_vnfs,
+                                                          startup=startup)
+        LOG.debug('monitor rehydration of %(count)d vnfs took '
+                  '%(duration).3fs',
+                  {'count': restored, 'duration': time.time() - start})
+
+    def _resync_vnf_monitor(self):
+        """Align the monitored VNFs with the ones owned by this member.
+
+        Called when sharding is enabled, it drops the VNFs which were
+        deleted or moved to another member and loads the VNFs which
+        were created by, or moved from, another member.
+        """
+        context = t_context.get_admin_context()
+        # VNFs being updated, scaled or respawned stay monitored meanwhile
+        vnf_ids = self._get_monitored_vnf_ids(
+            context, [constants.ACTIVE, constants.PENDING_UPDATE,
+                      constants.PENDING_SCALE_IN,
+                      constants.PENDING_SCALE_OUT, constants.DEAD])
+        owned = set(vnf_id for vnf_id in vnf_ids
+                    if self._vnf_monitor.owns(vnf_id))
+        monitored = set(self._vnf_monitor.get_hosting_vnf_ids())
+        for vnf_id in monitored - owned:
+            self._vnf_monitor.delete_hosting_vnf(vnf_id)
+        if owned - monitored:
+            self._rehydrate_vnf_monitor(owned - monitored, startup=False)
+        LOG.debug('monitor resync dropped %(dropped)d and added up to '
+                  '%(added)d vnfs',
+                  {'dropped': len(monitored - owned),
+                   'added': len(owned - monitored)})
+
     def add_alarm_url_to_vnf(self, context, vnf_dict):
-        vnfd_yaml = vnf_dict['vnfd']['attributes'].get('vnfd', '')
-        vnfd_dict = yaml.safe_load(vnfd_yaml)
-        if vnfd_dict and vnfd_dict.get('tosca_definitions_version'):
-            polices = vnfd_dict['topology_template'].get('policies', [])
-            for policy_dict in polices:
+        compiled = toscautils.load_compiled_vnfd(vnf_dict['vnfd'])
+        if compiled and compiled['template'].get('tosca_definitions_version'):
+            for policy_dict in compiled['policies']:
                 name, policy = list(policy_dict.items())[0]
                 if policy['type'] in constants.POLICY_ALARMING:
                     alarm_url =\
@@ -403,7 +501,7 @@ class VNFMPlugin(vnfm_db.VNFMPluginDb, VNFMMgmtMixin):
             self._vnf_manager.invoke(
                 driver_name, 'update_wait', plugin=self,
                 context=context, vnf_id=instance_id, auth_attr=vim_auth,
-                region_name=region_name)
+                region_name=region_name, vim_id=vnf_dict.get('vim_id'))
             self.mgmt_call(context, vnf_dict, kwargs)
         except exceptions.MgmtDriverException as e:
             LOG.error(_('VNF configuration failed'))
@@ -466,7 +564,8 @@ class VNFMPlugin(vnfm_db.VNFMPluginDb, VNFMMgmtMixin):
                     context=context,
                     vnf_id=instance_id,
                     auth_attr=auth_attr,
-                    region_name=region_name)
+                    region_name=region_name,
+                    vim_id=vnf_dict.get('vim_id'))
             except Exception as e_:
                 e = e_
                 vnf_dict['status'] = constants.ERROR
@@ -497,7 +596,8 @@ class VNFMPlugin(vnfm_db.VNFMPluginDb, VNFMMgmtMixin):
                                          context=context,
                                          vnf_id=instance_id,
                                          auth_attr=vim_auth,
-                                         region_name=region_name)
+                                         region_name=region_name,
+                                         vim_id=vnf_dict.get('vim_id'))
         except Exception as e:
             # TODO(yamahata): when the devaice is already deleted. mask
             # the error, and delete row in db
@@ -646,13 +746,21 @@ class VNFMPlugin(vnfm_db.VNFMPluginDb, VNFMMgmtMixin):
         p['id'] = p['name']
         return p
 
+    def _get_vnfd_policies(self, vnfd):
+        stamp = vnfd.get('updated_at') or vnfd.get('created_at')
+        cached = self._policy_cache.get(vnfd['id'])
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        policies = toscautils.load_compiled_vnfd(vnfd)['policies']
+        self._policy_cache.put(vnfd['id'], (stamp, policies))
+        return policies
+
     def get_vnf_policies(
             self, context, vnf_id, filters=None, fields=None):
         vnf = self.get_vnf(context, vnf_id)
-        vnfd_tmpl = yaml.safe_load(vnf['vnfd']['attributes']['vnfd'])
         policy_list = []
 
-        polices = vnfd_tmpl['topology_template'].get('policies', [])
+        polices = self._get_vnfd_policies(vnf['vnfd'])
         for policy_dict in polices:
             for name, policy in policy_dict.items():
                 def _add(policy):
@@ -756,6 +864,10 @@ class VNFMPlugin(vnfm_db.VNFMPluginDb, VNFMMgmtMixin):
         return trigger
 
     def _handle_vnf_monitoring(self, context, trigger):
+        """Run the action of an alarm.
+
+        :returns: False if the action was skipped
+        """
         vnf_dict = trigger['vnf']
         if trigger['action_name'] in constants.DEFAULT_ALARM_ACTIONS:
             action = trigger['action_name']
@@ -775,7 +887,7 @@ class VNFMPlugin(vnfm_db.VNFMPluginDb, VNFMMgmtMixin):
                              " %(status)s for vnf: %(vnfid)s"),
                              {"status": vnf_dict['status'],
                               "vnfid": vnf_dict['id']})
-                    return
+                    return False
                 action = 'scaling'
                 scale = {}
                 scale.setdefault('scale', {})
@@ -787,21 +899,101 @@ class VNFMPlugin(vnfm_db.VNFMPluginDb, VNFMMgmtMixin):
                                                              infra_driver)
                 if action_cls:
                     action_cls.execute_action(self, vnf_dict, scale)
+                    cooldown = (bckend_policy.get('properties') or
+                                {}).get('cooldown')
+                    if cooldown:
+                        self._alarm_coalescer.cool_down(
+                            vnf_dict['id'], trigger['action_name'],
+                            int(cooldown))
+        return True
 
     def create_vnf_trigger(
             self, context, vnf_id, trigger):
-        trigger_ = self.get_vnf_trigger(
-            context, vnf_id, trigger['trigger']['policy_name'])
-        trigger_.update({'action_name': trigger['trigger']['action_name']})
-        trigger_.update({'params': trigger['trigger']['params']})
-        bk_policy, bk_action = self._validate_alarming_policy(
-            context, vnf_id, trigger_)
-        if bk_policy:
-            trigger_.update({'bckend_policy': bk_policy,
-                             'bckend_action': bk_action})
-        self._handle_vnf_monitoring(context, trigger_)
+        policy_name = trigger['trigger']['policy_name']
+        action_name = trigger['trigger']['action_name']
+        if not self._alarm_coalescer.admit(vnf_id, policy_name, action_name):
+            return trigger['trigger']
+        try:
+            trigger_ = self.get_vnf_trigger(context, vnf_id, policy_name)
+            trigger_.update({'action_name': action_name})
+            trigger_.update({'params': trigger['trigger']['params']})
+            bk_policy, bk_action = self._validate_alarming_policy(
+                context, vnf_id, trigger_)
+            if bk_policy:
+                trigger_.update({'bckend_policy': bk_policy,
+                                 'bckend_action': bk_action})
+            if not self._handle_vnf_monitoring(context, trigger_):
+                # the alarm ran nothing, do not drop the next ones
+                self._alarm_coalescer.release(vnf_id, policy_name,
+                                              action_name)
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                self._alarm_coalescer.release(vnf_id, policy_name,
+                                              action_name)
         return trigger['trigger']
 
+    def enqueue_vnf_trigger(self, vnf_id, trigger):
+        """Queue an alarm to be processed by create_vnf_trigger.
+
+        The alarms of a VNF are processed in order, an alarm identical to
+        one already queued for the VNF is dropped.
+
+        :returns: False if the alarm queue is full
+        """
+        if (self._alarm_executor.queued() >=
+                cfg.CONF.tacker.alarm_queue_size):
+            LOG.warning(_('Alarm queue full, alarm for vnf %s rejected'),
+                        vnf_id)
+            return False
+        self._alarm_executor.submit(
+            vnf_id, trigger,
+            functools.partial(self._create_queued_vnf_trigger, vnf_id))
+        return True
+
+    def _create_queued_vnf_trigger(self, vnf_id, trigger):
+        context = t_context.get_admin_context()
+        try:
+            self.create_vnf_trigger(context, vnf_id, trigger)
+        except exceptions.TackerException as e:
+            LOG.warning(_('Queued alarm %(trigger)s for vnf %(vnf_id)s '
+                          'rejected: %(error)s'),
+                        {'trigger': trigger, 'vnf_id': vnf_id, 'error': e})
+
+    def create_vnf_triggers(self, triggers):
+        """Process a batch of alarms.
+
+        The alarms of a VNF are processed in order, the alarms of up to
+        alarm_workers VNFs concurrently.
+
+        :param triggers: list of (vnf_id, trigger) pairs
+        :returns: the exception raised for each alarm, None on success
+        """
+        errors = [None] * len(triggers)
+        indexes_by_vnf = collections.OrderedDict()
+        for index, (vnf_id, trigger) in enumerate(triggers):
+            indexes_by_vnf.setdefault(vnf_id, []).append(index)
+
+        def _create_vnf_triggers(indexes):
+            # the database session of a context is not shared between
+            # green threads
+            context = t_context.get_admin_context()
+            for index in indexes:
+                vnf_id, trigger = triggers[index]
+                try:
+                    self.create_vnf_trigger(context, vnf_id, trigger)
+                except Exception as e:
+                    if not isinstance(e, exceptions.TackerException):
+                        LOG.exception(_('Alarm %(trigger)s for vnf '
+                                        '%(vnf_id)s failed'),
+                                      {'trigger': trigger, 'vnf_id': vnf_id})
+                    errors[index] = e
+
+        pool = eventlet.GreenPool(cfg.CONF.tacker.alarm_workers)
+        for indexes in indexes_by_vnf.values():
+            pool.spawn_n(_create_vnf_triggers, indexes)
+        pool.waitall()
+        return errors
+
     def get_vnf_resources(self, context, vnf_id, fields=None, filters=None):
         vnf_info = self.get_vnf(context, vnf_id)
         infra_driver, vim_auth = self._get_infra_driver(context, vnf_info)